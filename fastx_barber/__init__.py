@@ -4,7 +4,7 @@
 """
 
 from fastx_barber import const
-from fastx_barber import bedio, io, scriptio, seqio
+from fastx_barber import bedio, gzio, io, scriptio, seqio, shm
 from fastx_barber import flag, match, qual, trim
 
 from importlib.metadata import version
@@ -18,9 +18,11 @@ __all__ = [
     "__version__",
     "const",
     "bedio",
+    "gzio",
     "io",
     "scriptio",
     "seqio",
+    "shm",
     "flag",
     "match",
     "qual",
@@ -63,8 +63,89 @@ class FastxExtensions(Enum):
         return any(value in v for v in self._value2member_map_)
 
 
+class FastxParsers(Enum):
+    """Fastx parser engines
+
+    Extends:
+        Enum
+
+    Variables:
+        BIOPYTHON {str} -- Biopython text iterators
+        MMAP {str} -- bytes-level scanner over memory-mapped input
+    """
+
+    BIOPYTHON = "biopython"
+    MMAP = "mmap"
+
+
+class ChunkTransports(Enum):
+    """Chunk transports from reader to workers
+
+    Extends:
+        Enum
+
+    Variables:
+        PICKLE {str} -- records are parsed by the reader and pickled to workers
+        RANGES {str} -- record-aligned byte ranges, parsed by the workers
+        SHM {str} -- raw records in shared memory, parsed by the workers
+    """
+
+    PICKLE = "pickle"
+    RANGES = "ranges"
+    SHM = "shm"
+
+
+class ExecutionBackends(Enum):
+    """How chunks are processed in parallel
+
+    Extends:
+        Enum
+
+    Variables:
+        PROCESSES {str} -- worker processes, chunks and results are pickled
+        THREADS {str} -- worker threads, sharing chunks, patterns and writers
+    """
+
+    PROCESSES = "processes"
+    THREADS = "threads"
+
+
+class OutputModes(Enum):
+    """How chunk outputs reach the final output files
+
+    Extends:
+        Enum
+
+    Variables:
+        MERGE {str} -- workers write temporary chunk files, merged at the end
+        STREAM {str} -- workers return compressed chunk data, appended in order
+        DIRECT {str} -- chunks are processed in-process, writing to the outputs
+    """
+
+    MERGE = "merge"
+    STREAM = "stream"
+    DIRECT = "direct"
+
+
+class QualityTrimMethods(Enum):
+    """How the low quality end of a read is found
+
+    Extends:
+        Enum
+
+    Variables:
+        SCAN {str} -- trim consecutive bases with qscore below the threshold
+        BWA {str} -- trim where the cumulative sum of (threshold - qscore) is
+                     maximal, as BWA does
+    """
+
+    SCAN = "scan"
+    BWA = "bwa"
+
+
 QFLAG_START = "q"
 DEFAULT_PHRED_OFFSET = 33
+LENGTH_HISTOGRAM_SIZE = 512
 
 PATTERN_EXAMPLE = "^(?<UMI>.{8})(?<BC>.{8})(?<CS>GATC){s<2}"
 
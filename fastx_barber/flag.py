@@ -6,14 +6,23 @@
 from abc import ABCMeta, abstractmethod
 from collections import defaultdict
 from fastx_barber.const import FastxFormats, FlagData, FlagStatsType, QFLAG_START
-from fastx_barber.match import ANPMatch
+from fastx_barber.match import ANPBatchMatch, RecordMatch
 from fastx_barber.seqio import SimpleFastxRecord
 import logging
 import os
 import pandas as pd  # type: ignore
 import regex as re  # type: ignore
 from rich.progress import track  # type: ignore
-from typing import Any, Dict, List, Match, Optional, Pattern, Tuple, Type, Union
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Type,
+)
 
 
 class FlagStats(object):
@@ -26,6 +35,10 @@ class FlagStats(object):
         self.__stats = defaultdict(lambda: defaultdict(lambda: 0))
         self._flags_for_stats = flags_for_stats
 
+    @property
+    def flags_for_stats(self) -> Optional[List[str]]:
+        return self._flags_for_stats
+
     def update(self, flags: Dict[str, FlagData]) -> None:
         if self._flags_for_stats is None:
             return
@@ -139,9 +152,13 @@ class ABCFlagExtractor(ABCFlagBase):
     def flagstats(self):
         return self._flagstats
 
+    def reset_stats(self) -> None:
+        """Starts collecting flagstats anew, for the same flags"""
+        self._flagstats = FlagStats(self._flagstats.flags_for_stats)
+
     @abstractmethod
     def extract_selected(
-        self, record: Any, match: Union[ANPMatch, Match, None]
+        self, record: Any, match: Optional[RecordMatch]
     ) -> Dict[str, FlagData]:
         """Extract selected flags
 
@@ -161,7 +178,7 @@ class ABCFlagExtractor(ABCFlagBase):
 
     @abstractmethod
     def extract_all(
-        self, record: Any, match: Union[ANPMatch, Match, None]
+        self, record: Any, match: Optional[RecordMatch]
     ) -> Dict[str, FlagData]:
         """Extract all flags
 
@@ -228,7 +245,7 @@ class FastaFlagExtractor(ABCFlagExtractor):
         super(FastaFlagExtractor, self).__init__(selected_flags, flags_for_stats)
 
     def extract_selected(
-        self, record: SimpleFastxRecord, match: Union[ANPMatch, Match, None]
+        self, record: SimpleFastxRecord, match: Optional[RecordMatch]
     ) -> Dict[str, FlagData]:
         assert match is not None
         flag_data: Dict[str, FlagData] = {}
@@ -240,19 +257,48 @@ class FastaFlagExtractor(ABCFlagExtractor):
         return flag_data
 
     def extract_all(
-        self, record: SimpleFastxRecord, match: Union[ANPMatch, Match, None]
+        self, record: SimpleFastxRecord, match: Optional[RecordMatch]
     ) -> Dict[str, FlagData]:
         if match is None:
             return {}
         flag_data: Dict[str, FlagData] = {}
-        for gid in range(len(match.groups())):
-            flag = self.__extract_single_flag(match, gid)
-            flag_data.update([flag])
+        for gid, flag in enumerate(match.groupdict().items()):
+            flag_data.update([self.__extract_single_flag(match, gid, flag)])
         return flag_data
 
+    def extract_all_batch(
+        self, records: Sequence[SimpleFastxRecord], batch_match: ANPBatchMatch
+    ) -> List[Dict[str, FlagData]]:
+        """Extract all flags from a batch of records, column-wise
+
+        Arguments:
+            records {Sequence[SimpleFastxRecord]} -- records from where to extract
+            batch_match {ANPBatchMatch} -- results of matching the records
+
+        Returns:
+            List[Dict[str, FlagData]] -- flag data of each matched record
+        """
+        columns = self._extract_columns(records, batch_match)
+        names = [name for name, _, _ in columns]
+        spans = [span for _, _, span in columns]
+        return [
+            {
+                name: (value, start, end)
+                for name, value, (start, end) in zip(names, row, spans)
+            }
+            for row in zip(*[values for _, values, _ in columns])
+        ]
+
+    def _extract_columns(
+        self, records: Sequence[SimpleFastxRecord], batch_match: ANPBatchMatch
+    ) -> List[Tuple[str, List[str], Tuple[int, int]]]:
+        """Flag names, values (of matched records) and spans."""
+        values = batch_match.extract([record[1] for record in records])
+        return [(name, values[name], span) for name, span in batch_match.groups]
+
     def __extract_single_flag(
         self,
-        match: Union[ANPMatch, Match],
+        match: RecordMatch,
         gid: int,
         flag: Optional[Tuple[str, str]] = None,
     ) -> Tuple[str, FlagData]:
@@ -284,7 +330,7 @@ class FastqFlagExtractor(FastaFlagExtractor):
         super(FastqFlagExtractor, self).__init__(selected_flags, flags_for_stats)
 
     def extract_selected(
-        self, record: SimpleFastxRecord, match: Union[ANPMatch, Match, None]
+        self, record: SimpleFastxRecord, match: Optional[RecordMatch]
     ) -> Dict[str, FlagData]:
         assert match is not None
         name, seq, qual = record
@@ -295,7 +341,7 @@ class FastqFlagExtractor(FastaFlagExtractor):
         return flag_data
 
     def extract_all(
-        self, record: SimpleFastxRecord, match: Union[ANPMatch, Match, None]
+        self, record: SimpleFastxRecord, match: Optional[RecordMatch]
     ) -> Dict[str, FlagData]:
         assert match is not None
         name, seq, qual = record
@@ -305,6 +351,22 @@ class FastqFlagExtractor(FastaFlagExtractor):
             flag_data = self.__add_qual_flags(flag_data, qual)
         return flag_data
 
+    def _extract_columns(
+        self, records: Sequence[SimpleFastxRecord], batch_match: ANPBatchMatch
+    ) -> List[Tuple[str, List[str], Tuple[int, int]]]:
+        columns = super(FastqFlagExtractor, self)._extract_columns(records, batch_match)
+        if self.extract_qual_flags:
+            quals = batch_match.extract(
+                [record[2] for record in records if record[2] is not None]
+            )
+            columns.extend(
+                [
+                    (f"{QFLAG_START}{name}", quals[name], span)
+                    for name, span in batch_match.groups
+                ]
+            )
+        return columns
+
     def __add_qual_flags(
         self, flag_data: Dict[str, FlagData], qual: str
     ) -> Dict[str, FlagData]:
@@ -365,6 +427,10 @@ class FastxFlagReader(ABCFlagReader):
     def flagstats(self):
         return self._flagstats
 
+    def reset_stats(self) -> None:
+        """Starts collecting flagstats anew, for the same flags"""
+        self._flagstats = FlagStats(self._flagstats.flags_for_stats)
+
     def read(self, record: SimpleFastxRecord) -> Optional[Dict[str, FlagData]]:
         header = record[0]
         if self._comment_space in header:
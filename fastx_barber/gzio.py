@@ -0,0 +1,601 @@
+"""
+@author: Gabriele Girelli
+@contact: gigi.ga90@gmail.com
+"""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import io
+import mmap
+import os
+import queue
+import threading
+from typing import (
+    Callable,
+    Deque,
+    IO,
+    Iterable,
+    Iterator,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+import zlib
+
+GZIP_WBITS = zlib.MAX_WBITS | 16
+GZIP_MAGIC = b"\x1f\x8b\x08"
+INFLATE_READ_SIZE = 256 * 1024
+INFLATE_QUEUE_SIZE = 32
+INFLATE_BATCH_SIZE = 4 * 1024 * 1024
+INFLATE_PROBE_SIZE = 4 * INFLATE_BATCH_SIZE
+BGZF_BLOCK_SIZE = 0xFF00
+BGZF_HEADER = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+BGZF_EOF = BGZF_HEADER + b"\x1b\x00\x03\x00" + b"\x00" * 8
+
+BytesBuffer = Union[bytes, mmap.mmap]
+
+
+class BackgroundInflater(object):
+    """Inflates a gzip file on a dedicated thread
+
+    Decompressed byte blocks are handed to the consumer through a bounded queue,
+    so that inflating overlaps with record splitting and chunk dispatch.
+    Multi-member gzip files are supported.
+
+    Variables:
+        _path {str} -- path to gzip file
+        _read_size {int} -- compressed bytes read at once
+        _queue {queue.Queue} -- decompressed blocks, exceptions, or None at the end
+        _stop {threading.Event} -- set when the consumer stops iterating
+        _thread {Optional[threading.Thread]} -- started on first iteration
+    """
+
+    _path: str
+    _read_size: int
+    _queue: queue.Queue
+    _stop: threading.Event
+    _thread: Optional[threading.Thread] = None
+
+    def __init__(
+        self,
+        path: str,
+        read_size: int = INFLATE_READ_SIZE,
+        queue_size: int = INFLATE_QUEUE_SIZE,
+    ):
+        super(BackgroundInflater, self).__init__()
+        self._path = path
+        self._read_size = read_size
+        self._queue = queue.Queue(queue_size)
+        self._stop = threading.Event()
+
+    def __iter__(self) -> Iterator[bytes]:
+        assert self._thread is None, "a gzip file can be iterated only once."
+        self._thread = threading.Thread(target=self.__inflate, daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                block = self._queue.get()
+                if block is None:
+                    break
+                if isinstance(block, BaseException):
+                    raise block
+                yield block
+        finally:
+            self.close()
+
+    def __put(self, item: Union[bytes, BaseException, None]) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __inflate(self) -> None:
+        try:
+            with open(self._path, "rb") as IH:
+                for block in inflate_stream(IH, self._read_size):
+                    if not self.__put(block):
+                        return
+            self.__put(None)
+        except Exception as e:
+            self.__put(e)
+
+    def close(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+def inflate_stream(
+    IH: IO[bytes], read_size: int = INFLATE_READ_SIZE
+) -> Iterator[bytes]:
+    """Inflates a (multi-member) gzip stream read from a binary handle.
+
+    Arguments:
+        IH {IO[bytes]} -- binary handle
+
+    Keyword Arguments:
+        read_size {int} -- compressed bytes read at once (default: {INFLATE_READ_SIZE})
+
+    Raises:
+        EOFError -- if the stream ends in the middle of a gzip member
+    """
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    started = False
+    data = IH.read(read_size)
+    while 0 != len(data):
+        if not started and 0 == len(data.lstrip(b"\x00")):
+            data += IH.read()
+            if 0 == len(data.lstrip(b"\x00")):
+                break  # trailing zero padding
+        started = True
+        block = decompressor.decompress(data)
+        if 0 != len(block):
+            yield block
+        if decompressor.eof:
+            data = decompressor.unused_data
+            if 0 == len(data):
+                data = IH.read(read_size)
+            decompressor = zlib.decompressobj(GZIP_WBITS)
+            started = False
+        else:
+            data = IH.read(read_size)
+    if started:
+        raise EOFError(
+            "Compressed file ended before the end-of-stream marker was reached"
+        )
+
+
+def inflate_bytes(buf: BytesBuffer, start: int = 0, end: Optional[int] = None) -> bytes:
+    """Inflates the gzip members found between start and end of a buffer."""
+    return b"".join(inflate_stream(io.BytesIO(buf[start:end])))
+
+
+def get_bgzf_block_size(buf: BytesBuffer, pos: int) -> Optional[int]:
+    """Reads the size of the BGZF block starting at pos.
+
+    Arguments:
+        buf {BytesBuffer} -- compressed buffer
+        pos {int} -- block start
+
+    Returns:
+        Optional[int] -- total block size, None if no BGZF header is found at pos
+    """
+    header = buf[pos : pos + 18]
+    if 18 > len(header) or GZIP_MAGIC != header[:3] or not header[3] & 4:
+        return None
+    xlen = int.from_bytes(header[10:12], "little")
+    extra = buf[pos + 12 : pos + 12 + xlen]
+    offset = 0
+    while offset + 4 <= len(extra):
+        slen = int.from_bytes(extra[offset + 2 : offset + 4], "little")
+        if b"BC" == extra[offset : offset + 2] and 2 == slen:
+            return int.from_bytes(extra[offset + 4 : offset + 6], "little") + 1
+        offset += 4 + slen
+    return None
+
+
+def is_member_start(buf: BytesBuffer, pos: int) -> bool:
+    """Checks whether a plausible gzip member starts at pos.
+
+    The header flags, extra flags and OS fields are checked, then a few bytes
+    are inflated to confirm that a valid deflate stream follows.
+    """
+    header = buf[pos : pos + 10]
+    if 10 > len(header) or GZIP_MAGIC != header[:3]:
+        return False
+    if header[3] & 0xE0 or header[8] not in (0, 2, 4) or 13 < header[9] < 255:
+        return False
+    try:
+        zlib.decompressobj(GZIP_WBITS).decompress(buf[pos : pos + 1024])
+    except zlib.error:
+        return False
+    return True
+
+
+def is_multi_member(buf: BytesBuffer, window: int) -> bool:
+    """Checks from its start whether a gzip buffer holds multiple members.
+
+    BGZF files are recognized by the header of their first block, other files
+    by a second member starting within the first window bytes, so that
+    single-member files are not scanned as a whole.
+
+    Arguments:
+        buf {BytesBuffer} -- compressed buffer
+        window {int} -- bytes to search for a second member
+
+    Returns:
+        bool -- whether a second member is found
+    """
+    if get_bgzf_block_size(buf, 0) is not None:
+        return True
+    end = window + len(GZIP_MAGIC) - 1
+    pos = buf.find(GZIP_MAGIC, 1, end)
+    while -1 != pos:
+        if is_member_start(buf, pos):
+            return True
+        pos = buf.find(GZIP_MAGIC, pos + 1, end)
+    return False
+
+
+def iter_member_offsets(buf: BytesBuffer) -> Iterator[int]:
+    """Yields the offsets of (candidate) gzip member starts.
+
+    BGZF blocks are walked through their header, other multi-member files are
+    scanned for gzip magic bytes. The latter can rarely produce false positives,
+    which inflation detects later on.
+
+    Arguments:
+        buf {BytesBuffer} -- compressed buffer
+
+    Yields:
+        int -- member start offset
+    """
+    pos = 0
+    while pos < len(buf):
+        yield pos
+        block_size = get_bgzf_block_size(buf, pos)
+        if block_size is not None:
+            pos += block_size
+            continue
+        pos = buf.find(GZIP_MAGIC, pos + 1)
+        while -1 != pos and not is_member_start(buf, pos):
+            pos = buf.find(GZIP_MAGIC, pos + 1)
+        if -1 == pos:
+            break
+
+
+def iter_member_batches(
+    buf: BytesBuffer, batch_size: int = INFLATE_BATCH_SIZE
+) -> Iterator[Tuple[int, int]]:
+    """Groups consecutive gzip members in batches of about batch_size bytes.
+
+    Arguments:
+        buf {BytesBuffer} -- compressed buffer
+
+    Keyword Arguments:
+        batch_size {int} -- compressed bytes per batch (default: {INFLATE_BATCH_SIZE})
+
+    Yields:
+        Tuple[int, int] -- batch start and end
+    """
+    start = 0
+    for offset in iter_member_offsets(buf):
+        if offset - start >= batch_size:
+            yield (start, offset)
+            start = offset
+    if start < len(buf):
+        yield (start, len(buf))
+
+
+class ParallelInflater(object):
+    """Inflates a multi-member gzip file (e.g., BGZF) on a thread pool
+
+    Members are grouped in batches that are inflated concurrently and yielded in
+    order. A batch ending on a false member boundary fails to inflate, and is
+    then inflated sequentially up to the start of a later batch that is a real
+    member boundary. Files that do not look multi-member from their first
+    INFLATE_PROBE_SIZE bytes (see is_multi_member) are inflated by a
+    BackgroundInflater instead.
+
+    Variables:
+        _path {str} -- path to gzip file
+        _threads {int} -- number of inflating threads
+        _batch_size {int} -- compressed bytes per batch
+    """
+
+    _path: str
+    _threads: int
+    _batch_size: int
+
+    def __init__(self, path: str, threads: int, batch_size: int = INFLATE_BATCH_SIZE):
+        super(ParallelInflater, self).__init__()
+        assert 0 < threads, "at least one thread is needed to inflate."
+        self._path = path
+        self._threads = threads
+        self._batch_size = batch_size
+
+    def __iter__(self) -> Iterator[bytes]:
+        with open(self._path, "rb") as IH:
+            if 0 == os.fstat(IH.fileno()).st_size:
+                return
+            with mmap.mmap(IH.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if not is_multi_member(buf, INFLATE_PROBE_SIZE):
+                    yield from BackgroundInflater(self._path)
+                    return
+                yield from self.__inflate(
+                    buf, iter_member_batches(buf, self._batch_size)
+                )
+
+    def __inflate(
+        self, buf: mmap.mmap, batches: Iterator[Tuple[int, int]]
+    ) -> Iterator[bytes]:
+        futures: Deque[Tuple[Tuple[int, int], Future]] = deque()
+        with ThreadPoolExecutor(self._threads) as pool:
+
+            def submit() -> None:
+                batch = next(batches, None)
+                if batch is not None:
+                    futures.append((batch, pool.submit(inflate_bytes, buf, *batch)))
+
+            try:
+                for _ in range(2 * self._threads):
+                    submit()
+                while 0 != len(futures):
+                    (start, end), future = futures.popleft()
+                    submit()
+                    try:
+                        block = future.result()
+                    except (EOFError, zlib.error):
+                        yield from self.__recover(buf, start, futures, submit)
+                        continue
+                    yield block
+            finally:
+                for _, future in futures:
+                    future.cancel()
+
+    @staticmethod
+    def __recover(
+        buf: mmap.mmap,
+        start: int,
+        futures: Deque[Tuple[Tuple[int, int], Future]],
+        submit: Callable[[], None],
+    ) -> Iterator[bytes]:
+        """Inflates members from start, until one ends at the start of a pending
+        batch, cancelling the batches that start before that.
+
+        Raises:
+            EOFError -- if the buffer ends in the middle of a gzip member
+        """
+        pos = start
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        started = False
+        while pos < len(buf):
+            if not started:
+                while 0 != len(futures) and futures[0][0][0] < pos:
+                    futures.popleft()[1].cancel()
+                    submit()
+                if 0 != len(futures) and futures[0][0][0] == pos:
+                    return
+            data = buf[pos : pos + INFLATE_READ_SIZE]
+            if not started and 0 == len(data.lstrip(b"\x00")):
+                if 0 == len(buf[pos:].lstrip(b"\x00")):
+                    return  # trailing zero padding
+            started = True
+            block = decompressor.decompress(data)
+            if 0 != len(block):
+                yield block
+            pos += len(data) - len(decompressor.unused_data)
+            if decompressor.eof:
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+                started = False
+        if started:
+            raise EOFError(
+                "Compressed file ended before the end-of-stream marker was reached"
+            )
+
+
+class BlockReader(io.RawIOBase):
+    """Readable raw stream over an iterable of byte blocks"""
+
+    _blocks: Iterator[bytes]
+    _buffer: bytes = b""
+    _offset: int = 0
+
+    def __init__(self, blocks: Iterable[bytes]):
+        super(BlockReader, self).__init__()
+        self._blocks = iter(blocks)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while self._offset >= len(self._buffer):
+            try:
+                self._buffer = next(self._blocks)
+            except StopIteration:
+                return 0
+            self._offset = 0
+        size = min(len(b), len(self._buffer) - self._offset)
+        b[:size] = self._buffer[self._offset : self._offset + size]
+        self._offset += size
+        return size
+
+    def close(self) -> None:
+        if hasattr(self._blocks, "close"):
+            self._blocks.close()  # type: ignore
+        super(BlockReader, self).close()
+
+
+def open_gzip_blocks(path: str, threads: int = 1) -> Iterator[bytes]:
+    """Iterates over the decompressed blocks of a gzip file.
+
+    Arguments:
+        path {str} -- path to gzip file
+
+    Keyword Arguments:
+        threads {int} -- inflating threads, used for multi-member files (default: {1})
+
+    Returns:
+        Iterator[bytes] -- decompressed blocks
+    """
+    if 1 < threads:
+        return iter(ParallelInflater(path, threads))
+    return iter(BackgroundInflater(path))
+
+
+def open_gzip_text(path: str, threads: int = 1) -> TextIO:
+    """Opens a gzip file in text mode, inflating it on background thread(s)."""
+    return io.TextIOWrapper(
+        io.BufferedReader(BlockReader(open_gzip_blocks(path, threads)))
+    )
+
+
+def compress_bgzf_block(data: bytes, compress_level: int = 6) -> bytes:
+    """Compresses up to BGZF_BLOCK_SIZE bytes into a BGZF block."""
+    assert BGZF_BLOCK_SIZE >= len(data), "data does not fit in a BGZF block."
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    cdata = compressor.compress(data) + compressor.flush()
+    return b"".join(
+        (
+            BGZF_HEADER,
+            (len(cdata) + 25).to_bytes(2, "little"),
+            cdata,
+            zlib.crc32(data).to_bytes(4, "little"),
+            len(data).to_bytes(4, "little"),
+        )
+    )
+
+
+def truncate_bgzf_eof(path: str) -> bool:
+    """Removes the BGZF end-of-file marker block from a file, if present.
+
+    Arguments:
+        path {str} -- path to BGZF file
+
+    Returns:
+        bool -- whether the marker was found and removed
+    """
+    if not os.path.isfile(path):
+        return False
+    with open(path, "r+b") as OH:
+        return truncate_bgzf_eof_handle(OH)
+
+
+def truncate_bgzf_eof_handle(OH: IO[bytes]) -> bool:
+    """Removes the BGZF end-of-file marker block from a seekable handle.
+
+    The handle is left positioned at its (new) end.
+
+    Arguments:
+        OH {IO[bytes]} -- binary handle, open for reading and writing
+
+    Returns:
+        bool -- whether the marker was found and removed
+    """
+    size = OH.seek(0, os.SEEK_END)
+    if len(BGZF_EOF) > size:
+        return False
+    OH.seek(size - len(BGZF_EOF))
+    if BGZF_EOF != OH.read():
+        return False
+    OH.seek(size - len(BGZF_EOF))
+    OH.truncate()
+    return True
+
+
+class BgzfWriter(io.RawIOBase):
+    """Writable raw stream compressing data into BGZF blocks
+
+    Blocks are compressed on a thread pool when more than one thread is
+    requested, and written in order. The BGZF end-of-file marker is written on
+    close. In append mode, the marker of an existing file is removed first.
+    Either a path or an open binary handle can be provided, the latter is written
+    from its current position and closed with the writer.
+
+    Variables:
+        _OH {IO} -- output buffer handle
+        _compress_level {int} -- gzip compression level
+        _threads {int} -- number of compressing threads
+        _buffer {bytearray} -- data not yet compressed
+        _futures {Deque[Future]} -- blocks being compressed
+        _pool {Optional[ThreadPoolExecutor]} -- started with the first block
+    """
+
+    _OH: IO
+    _compress_level: int
+    _threads: int
+    _buffer: bytearray
+    _futures: Deque[Future]
+    _pool: Optional[ThreadPoolExecutor] = None
+
+    def __init__(
+        self,
+        path: Union[str, IO[bytes]],
+        mode: str = "wb",
+        compress_level: int = 6,
+        threads: int = 1,
+    ):
+        super(BgzfWriter, self).__init__()
+        assert mode in ("wb", "ab"), f"unsupported BGZF writing mode: '{mode}'."
+        assert 0 < threads, "at least one thread is needed to compress."
+        if not isinstance(path, str):
+            self._OH = path
+            if "ab" == mode:
+                truncate_bgzf_eof_handle(self._OH)
+        else:
+            if "ab" == mode:
+                truncate_bgzf_eof(path)
+            self._OH = open(path, mode)
+        self._compress_level = compress_level
+        self._threads = threads
+        self._buffer = bytearray()
+        self._futures = deque()
+
+    @property
+    def name(self) -> str:
+        return self._OH.name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buffer += b
+        while BGZF_BLOCK_SIZE <= len(self._buffer):
+            self.__submit(bytes(self._buffer[:BGZF_BLOCK_SIZE]))
+            del self._buffer[:BGZF_BLOCK_SIZE]
+        return len(b)
+
+    def __submit(self, data: bytes) -> None:
+        if 1 == self._threads:
+            self._OH.write(compress_bgzf_block(data, self._compress_level))
+            return
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self._threads)
+        self._futures.append(
+            self._pool.submit(compress_bgzf_block, data, self._compress_level)
+        )
+        while 2 * self._threads < len(self._futures):
+            self._OH.write(self._futures.popleft().result())
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if 0 != len(self._buffer):
+            self.__submit(bytes(self._buffer))
+            self._buffer.clear()
+        while 0 != len(self._futures):
+            self._OH.write(self._futures.popleft().result())
+        if self._pool is not None:
+            self._pool.shutdown()
+        self._OH.write(BGZF_EOF)
+        self._OH.close()
+        super(BgzfWriter, self).close()
+
+
+def open_bgzf_text(
+    path: Union[str, IO[bytes]],
+    mode: str = "wt",
+    compress_level: int = 6,
+    threads: int = 1,
+) -> TextIO:
+    """Opens a BGZF file for writing in text mode.
+
+    Arguments:
+        path {Union[str, IO[bytes]]} -- path to BGZF file, or binary handle
+
+    Keyword Arguments:
+        mode {str} -- either "wt" or "at" (default: {"wt"})
+        compress_level {int} -- gzip compression level (default: {6})
+        threads {int} -- compressing threads (default: {1})
+
+    Returns:
+        TextIO -- text handle
+    """
+    assert mode in ("wt", "at"), f"unsupported BGZF text mode: '{mode}'."
+    raw = BgzfWriter(path, mode.replace("t", "b"), compress_level, threads)
+    return io.TextIOWrapper(io.BufferedWriter(raw, BGZF_BLOCK_SIZE))
@@ -3,14 +3,30 @@
 @contact: gigi.ga90@gmail.com
 """
 
+from collections import OrderedDict
+import errno
+from fastx_barber.gzio import BGZF_EOF
 import glob
 import os
+import queue
 from rich.progress import track  # type: ignore
 import tempfile
-from typing import Optional, Tuple
+import threading
+from typing import Callable, Dict, IO, Optional, Set, Tuple
 
 
 DTEMP_PREFIX = "fbarber_tmp."
+COPY_BUFFER_SIZE = 1024 * 1024
+COPY_FALLBACK_ERRNOS = (
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.EBADF,
+    errno.ETXTBSY,
+)
+STREAM_QUEUE_SIZE = 8
+STREAM_MAX_OPEN_HANDLES = 128
 
 
 def check_tmp_dir(path: Optional[str] = None) -> str:
@@ -42,6 +58,108 @@ def is_gzipped(path: str) -> Tuple[str, str, bool]:
     return (base, ext, gzipped)
 
 
+def _copy_in_kernel(copy: Callable[[int], int], length: int) -> int:
+    """Copies data with a system call, as long as the file systems support it.
+
+    Arguments:
+        copy {Callable[[int], int]} -- system call wrapper, called with the number
+                                       of bytes to copy, returns the bytes copied
+        length {int} -- number of bytes to copy
+
+    Returns:
+        int -- number of bytes left to copy, e.g., if the system call is not
+               supported, possibly after copying part of the data
+    """
+    while 0 < length:
+        try:
+            copied = copy(length)
+        except OSError as e:
+            if e.errno not in COPY_FALLBACK_ERRNOS:
+                raise
+            break
+        if 0 == copied:
+            break
+        length -= copied
+    return length
+
+
+def _copy_file_range(OH: IO, CH: IO, length: int) -> int:
+    return _copy_in_kernel(
+        lambda n: os.copy_file_range(CH.fileno(), OH.fileno(), n),  # type: ignore
+        length,
+    )
+
+
+def _sendfile(OH: IO, CH: IO, length: int) -> int:
+    return _copy_in_kernel(
+        lambda n: os.sendfile(OH.fileno(), CH.fileno(), None, n), length
+    )
+
+
+def _copy_stream(OH: IO, CH: IO, length: int) -> int:
+    while 0 < length:
+        data = CH.read(min(length, COPY_BUFFER_SIZE))
+        if 0 == len(data):
+            break
+        OH.write(data)
+        length -= len(data)
+    return length
+
+
+def copy_file_data(OH: IO, CH: IO, length: int) -> None:
+    """Copies data between unbuffered binary file handles.
+
+    Copies length bytes from the current position of CH to the current position
+    of OH. The copy happens in the kernel (os.copy_file_range, or os.sendfile)
+    when possible, falling back to copying the rest through a fixed-size buffer.
+
+    Arguments:
+        OH {IO} -- unbuffered binary output handle
+        CH {IO} -- unbuffered binary input handle
+        length {int} -- number of bytes to copy
+    """
+    copy_funs = [_copy_stream]
+    if hasattr(os, "sendfile"):
+        copy_funs.insert(0, _sendfile)
+    if hasattr(os, "copy_file_range"):
+        copy_funs.insert(0, _copy_file_range)
+    for copy_fun in copy_funs:
+        length = copy_fun(OH, CH, length)
+        if 0 == length:
+            return
+    assert 0 == length, f"could not copy all data from '{CH.name}'."
+
+
+def copy_chunk(OH: IO, CH: IO) -> bool:
+    """Copies a chunk into an output buffer.
+
+    BGZF end-of-file marker blocks are not copied, so that a single one can be
+    written at the end of the merged output.
+
+    Arguments:
+        OH {IO} -- unbuffered binary output handle
+        CH {IO} -- unbuffered binary chunk handle
+
+    Returns:
+        bool -- whether the chunk ended with a BGZF end-of-file marker
+    """
+    size = os.fstat(CH.fileno()).st_size
+    is_bgzf = False
+    if len(BGZF_EOF) <= size:
+        CH.seek(size - len(BGZF_EOF))
+        is_bgzf = BGZF_EOF == CH.read(len(BGZF_EOF))
+        CH.seek(0)
+    copy_file_data(OH, CH, size - len(BGZF_EOF) if is_bgzf else size)
+    return is_bgzf
+
+
+def open_append(path: str) -> IO:
+    """Opens a file for appending without O_APPEND, which kernel copies reject."""
+    OH = open(path, "r+b" if os.path.isfile(path) else "wb", buffering=0)
+    OH.seek(0, os.SEEK_END)
+    return OH
+
+
 class ChunkMerger(object):
     _do_remove: bool = True
     _tempdir: Optional[tempfile.TemporaryDirectory]
@@ -67,7 +185,8 @@ class ChunkMerger(object):
     def __merge_simple(
         self, path: str, last_chunk_id: int, desc: Optional[str] = None
     ) -> None:
-        with open(path, "wb") as OH:
+        with open(path, "wb", buffering=0) as OH:
+            is_bgzf = False
             for cid in track(
                 range(1, last_chunk_id + 1), description=desc, transient=False
             ):
@@ -76,16 +195,19 @@ class ChunkMerger(object):
                     chunk_path = os.path.join(self._tempdir.name, chunk_path)
                 if not os.path.isfile(chunk_path):
                     continue
-                with open(chunk_path, "rb") as CH:
-                    OH.write(CH.read())
+                with open(chunk_path, "rb", buffering=0) as CH:
+                    is_bgzf |= copy_chunk(OH, CH)
                 if self._do_remove:
                     os.remove(chunk_path)
+            if is_bgzf:
+                OH.write(BGZF_EOF)
 
     def __merge_split(
         self, path: str, last_chunk_id: int, desc: Optional[str] = None
     ) -> None:
         output_dir = os.path.dirname(path)
         output_base = os.path.basename(path)
+        bgzf_outputs: Set[str] = set()
         for cid in track(
             range(1, last_chunk_id + 1), description=desc, transient=False
         ):
@@ -97,20 +219,137 @@ class ChunkMerger(object):
                 split_value = (
                     os.path.basename(fname).split("_split.")[1].split(".tmp.chunk")[0]
                 )
-                with open(
-                    os.path.join(
-                        output_dir,
-                        f"{self._split_by}_split.{split_value}.{output_base}",
-                    ),
-                    "ab",
-                ) as OH:
-                    with open(fname, "rb") as CH:
-                        OH.write(CH.read())
+                output_path = os.path.join(
+                    output_dir, f"{self._split_by}_split.{split_value}.{output_base}"
+                )
+                with open_append(output_path) as OH:
+                    with open(fname, "rb", buffering=0) as CH:
+                        if copy_chunk(OH, CH):
+                            bgzf_outputs.add(output_path)
                     if self._do_remove:
                         os.remove(fname)
+        for output_path in bgzf_outputs:
+            with open(output_path, "ab") as OH:
+                OH.write(BGZF_EOF)
 
     def do(self, path: str, last_chunk_id: int, desc: Optional[str] = None) -> None:
         if self._split_by is None:
             self.__merge_simple(path, last_chunk_id, desc)
         else:
             self.__merge_split(path, last_chunk_id, desc)
+
+
+class OrderedChunkWriter(object):
+    """Appends chunk outputs to the output files, in chunk id order
+
+    Chunk outputs are (compressed) data by output path, e.g., as captured by the
+    workers. Outputs received out of order wait in a reorder buffer until all
+    previous chunks are received, and are then handed to a dedicated writer
+    thread through a bounded queue. The reorder buffer is bounded by how many
+    chunks the caller keeps in flight.
+
+    Output files are truncated when first written, and a single BGZF end-of-file
+    marker is written at the end of BGZF outputs. Open output handles are kept in
+    a least-recently-used pool.
+
+    Variables:
+        _next_chunk_id {int} -- id of the next chunk to be written
+        _pending {Dict[int, Dict[str, bytes]]} -- reorder buffer, by chunk id
+        _queue {queue.Queue} -- outputs to be written, in order
+        _handles {OrderedDict[str, IO]} -- open output handles, by path
+        _opened {Set[str]} -- outputs written so far
+        _bgzf_outputs {Set[str]} -- outputs that need a BGZF end-of-file marker
+        _thread {threading.Thread} -- writer thread
+        _error {Optional[BaseException]} -- error raised by the writer thread
+    """
+
+    _next_chunk_id: int
+    _pending: Dict[int, Dict[str, bytes]]
+    _queue: queue.Queue
+    _handles: "OrderedDict[str, IO]"
+    _opened: Set[str]
+    _bgzf_outputs: Set[str]
+    _thread: threading.Thread
+    _error: Optional[BaseException] = None
+
+    def __init__(self, first_chunk_id: int = 1, queue_size: int = STREAM_QUEUE_SIZE):
+        super(OrderedChunkWriter, self).__init__()
+        self._next_chunk_id = first_chunk_id
+        self._pending = {}
+        self._queue = queue.Queue(queue_size)
+        self._handles = OrderedDict()
+        self._opened = set()
+        self._bgzf_outputs = set()
+        self._thread = threading.Thread(target=self.__write, daemon=True)
+        self._thread.start()
+
+    @property
+    def next_chunk_id(self) -> int:
+        return self._next_chunk_id
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def put(self, cid: int, outputs: Dict[str, bytes]) -> None:
+        """Adds the outputs of a chunk.
+
+        Arguments:
+            cid {int} -- chunk id
+            outputs {Dict[str, bytes]} -- chunk data, by output path
+        """
+        assert self._next_chunk_id <= cid, f"chunk #{cid} was already written."
+        assert cid not in self._pending, f"chunk #{cid} was already received."
+        if self._error is not None:
+            raise self._error
+        self._pending[cid] = outputs
+        while self._next_chunk_id in self._pending:
+            self._queue.put(self._pending.pop(self._next_chunk_id))
+            self._next_chunk_id += 1
+
+    def __get_handle(self, path: str) -> IO:
+        if path in self._handles:
+            self._handles.move_to_end(path)
+            return self._handles[path]
+        if len(self._handles) >= STREAM_MAX_OPEN_HANDLES:
+            self._handles.popitem(last=False)[1].close()
+        if path in self._opened:
+            OH = open(path, "ab")
+        else:
+            OH = open(path, "wb")
+            self._opened.add(path)
+        self._handles[path] = OH
+        return OH
+
+    def __write(self) -> None:
+        while True:
+            outputs = self._queue.get()
+            if outputs is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                for path, data in outputs.items():
+                    OH = self.__get_handle(path)
+                    if data.endswith(BGZF_EOF):
+                        self._bgzf_outputs.add(path)
+                        OH.write(memoryview(data)[: -len(BGZF_EOF)])
+                    else:
+                        OH.write(data)
+            except BaseException as e:
+                self._error = e
+
+    def close(self) -> None:
+        """Writes all received outputs and closes the output files.
+
+        Outputs still waiting for previous chunks are discarded.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        while 0 != len(self._handles):
+            self._handles.popitem(last=False)[1].close()
+        if self._error is not None:
+            raise self._error
+        for path in self._bgzf_outputs:
+            with open(path, "ab") as OH:
+                OH.write(BGZF_EOF)
@@ -4,9 +4,31 @@
 """
 
 from abc import ABCMeta, abstractmethod
+from collections import Counter, OrderedDict
+from fastx_barber.pattern import (
+    get_exact_pattern,
+    get_literal_prefix,
+    get_max_span,
+    get_slicing_plan,
+    SlicingPlan,
+)
 from fastx_barber.seqio import SimpleFastxRecord
+import numpy as np  # type: ignore
+import regex as re  # type: ignore
 from rich.progress import track  # type: ignore
-from typing import Any, Dict, Iterator, List, Match, Optional, Pattern, Tuple, Union
+from typing import (
+    Any,
+    cast,
+    Dict,
+    Iterator,
+    List,
+    Match,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 
 class ANPMatch(object):
@@ -82,6 +104,75 @@ class ANPMatch(object):
         return dict(zip(self.__names[1:], self.__groups[1:]))
 
 
+class ANPBatchMatch(object):
+    """Matches of an AlphaNumericPattern to a batch of sequences
+
+    As alphanumeric patterns are fixed offsets from the start of a sequence,
+    the matched prefixes of a batch are stored as the rows of a fixed-width
+    byte matrix, and group values are extracted column-wise.
+
+    Variables:
+        _matched {np.ndarray} -- whether each sequence matched
+        _groups {List[Tuple[str, Tuple[int, int]]]} -- group names and spans
+        _length {int} -- pattern length
+    """
+
+    _matched: np.ndarray
+    _groups: List[Tuple[str, Tuple[int, int]]]
+    _length: int
+
+    def __init__(
+        self,
+        matched: np.ndarray,
+        groups: List[Tuple[str, Tuple[int, int]]],
+        length: int,
+    ):
+        super(ANPBatchMatch, self).__init__()
+        self._matched = matched
+        self._groups = groups
+        self._length = length
+
+    @property
+    def matched(self) -> np.ndarray:
+        return self._matched
+
+    @property
+    def groups(self) -> List[Tuple[str, Tuple[int, int]]]:
+        return self._groups
+
+    @property
+    def length(self) -> int:
+        return self._length
+
+    def __len__(self) -> int:
+        return len(self._matched)
+
+    def extract(self, strings: Sequence[str]) -> Dict[str, List[str]]:
+        """Slices the group spans out of the matched strings.
+
+        Arguments:
+            strings {Sequence[str]} -- strings of the batch (e.g., sequences or
+                                       qualities), in the order they were matched
+
+        Returns:
+            Dict[str, List[str]] -- values of each group, for matched strings only
+        """
+        assert len(strings) == len(self._matched)
+        prefixes = "".join(
+            [s[: self._length] for s, m in zip(strings, self._matched.tolist()) if m]
+        )
+        matrix = np.frombuffer(prefixes.encode("ascii"), dtype=np.uint8).reshape(
+            int(self._matched.sum()), self._length
+        )
+        values: Dict[str, List[str]] = {}
+        for name, (start, end) in self._groups:
+            column = np.ascontiguousarray(matrix[:, start:end])
+            values[name] = (
+                column.view(f"S{end - start}").ravel().astype(f"U{end - start}")
+            ).tolist()
+        return values
+
+
 class AlphaNumericPattern(object):
     _pattern: str
     _length: int
@@ -104,6 +195,26 @@ class AlphaNumericPattern(object):
             query[: self._length], (0, self._length), self._groups, self._pattern
         )
 
+    @property
+    def length(self) -> int:
+        return self._length
+
+    @property
+    def groups(self) -> List[Tuple[str, Tuple[int, int]]]:
+        return self._groups
+
+    def match_batch(self, queries: Sequence[str]) -> ANPBatchMatch:
+        """Matches a batch of sequences at once, without per-sequence matches.
+
+        Arguments:
+            queries {Sequence[str]} -- sequences to match
+
+        Returns:
+            ANPBatchMatch -- matches of the batch
+        """
+        lengths = np.fromiter(map(len, queries), dtype=np.int64, count=len(queries))
+        return ANPBatchMatch(lengths >= self._length, self._groups, self._length)
+
     @staticmethod
     def remove_leading_digits(pattern: str) -> str:
         while pattern[0].isdigit():
@@ -152,6 +263,282 @@ class AlphaNumericPattern(object):
         return self.to_regex(self._pattern)
 
 
+class SlicedMatch(object):
+    """Match of a SlicingPattern
+
+    Same interface as ANPMatch, but group values are only sliced out of the query
+    when requested, so that matching stays cheap.
+
+    Variables:
+        _query {str} -- matched query
+        _pattern {SlicingPattern} -- matched pattern
+    """
+
+    __slots__ = ("_query", "_pattern")
+
+    _query: str
+    _pattern: "SlicingPattern"
+
+    def __init__(self, query: str, pattern: "SlicingPattern"):
+        self._query = query
+        self._pattern = pattern
+
+    @property
+    def lastindex(self) -> Optional[int]:
+        return len(self._pattern.names) or None
+
+    @property
+    def lastgroup(self) -> Optional[str]:
+        return self._pattern.names[-1] if 0 != len(self._pattern.names) else None
+
+    @property
+    def pos(self) -> int:
+        return 0
+
+    @property
+    def re(self) -> str:
+        return self._pattern.pattern
+
+    def span(self, i: Optional[int] = None) -> Tuple[int, int]:
+        return self._pattern.spans[0 if i is None else i]
+
+    def group(self, i: Optional[int] = None) -> str:
+        start, end = self.span(i)
+        return self._query[start:end]
+
+    def groups(self) -> List[str]:
+        return [self._query[s:e] for s, e in self._pattern.spans[1:]]
+
+    def start(self, i: Optional[int] = None) -> int:
+        return self.span(i)[0]
+
+    def end(self, i: Optional[int] = None) -> int:
+        return self.span(i)[1]
+
+    def groupdict(self) -> Dict[str, str]:
+        return dict(zip(self._pattern.names, self.groups()))
+
+
+class SlicingPattern(object):
+    """Regular expression of fixed structure, matched by slicing
+
+    Matches are found by comparing the literals of the pattern at their fixed
+    positions, without running the regex engine. See get_slicing_plan.
+
+    Variables:
+        _pattern {str} -- regular expression
+        _plan {SlicingPlan} -- slicing plan of the regular expression
+    """
+
+    _pattern: str
+    _plan: SlicingPlan
+    _names: List[str]
+    _spans: List[Tuple[int, int]]
+
+    def __init__(self, pattern: str, plan: SlicingPlan):
+        super(SlicingPattern, self).__init__()
+        self._pattern = pattern
+        self._plan = plan
+        self._names = [name for name, _ in plan.groups]
+        self._spans = [(0, plan.length)] + [span for _, span in plan.groups]
+
+    @property
+    def pattern(self) -> str:
+        return self._pattern
+
+    @property
+    def plan(self) -> SlicingPlan:
+        return self._plan
+
+    @property
+    def names(self) -> List[str]:
+        return self._names
+
+    @property
+    def spans(self) -> List[Tuple[int, int]]:
+        """Spans of the whole match and of each group"""
+        return self._spans
+
+    def match(self, query: str) -> Optional[SlicedMatch]:
+        length = self._plan.length
+        if len(query) < length or (self._plan.anchored_end and len(query) != length):
+            return None
+        for start, literal in self._plan.literals:
+            if not query.startswith(literal, start):
+                return None
+        return SlicedMatch(query, self)
+
+    def match_batch(self, queries: Sequence[str]) -> ANPBatchMatch:
+        """Matches a batch of sequences at once, comparing literals column-wise.
+
+        Arguments:
+            queries {Sequence[str]} -- sequences to match
+
+        Returns:
+            ANPBatchMatch -- matches of the batch
+        """
+        length = self._plan.length
+        lengths = np.fromiter(map(len, queries), dtype=np.int64, count=len(queries))
+        matched = lengths == length if self._plan.anchored_end else lengths >= length
+        candidates = np.flatnonzero(matched)
+        if 0 == len(self._plan.literals) or 0 == len(candidates):
+            return ANPBatchMatch(matched, self._plan.groups, length)
+
+        prefixes = "".join([queries[i][:length] for i in candidates.tolist()])
+        matrix = np.frombuffer(prefixes.encode("ascii"), dtype=np.uint8).reshape(
+            len(candidates), length
+        )
+        candidate_matched = np.ones(len(candidates), dtype=bool)
+        for start, literal in self._plan.literals:
+            expected = np.frombuffer(literal.encode("ascii"), dtype=np.uint8)
+            candidate_matched &= np.all(
+                matrix[:, start : start + len(literal)] == expected, axis=1
+            )
+        matched[candidates] = candidate_matched
+        return ANPBatchMatch(matched, self._plan.groups, length)
+
+
+class CachedMatch(object):
+    """Match of a regular expression, as stored in a FastxMatcher cache
+
+    Same interface as ANPMatch, with the spans and values of the groups copied
+    out of the regex match, so that they can be shared by records with the same
+    prefix.
+
+    Variables:
+        _re {str} -- matched pattern
+        _spans {Tuple[Tuple[int, int], ...]} -- span of each group (0: whole match)
+        _values {Tuple[Optional[str], ...]} -- value of each group (0: whole match)
+        _names {Tuple[str, ...]} -- named groups, in order
+        _lastindex {Optional[int]} -- index of the last matched group
+        _lastgroup {Optional[str]} -- name of the last matched group
+    """
+
+    __slots__ = ("_re", "_spans", "_values", "_names", "_lastindex", "_lastgroup")
+
+    _re: str
+    _spans: Tuple[Tuple[int, int], ...]
+    _values: Tuple[Optional[str], ...]
+    _names: Tuple[str, ...]
+    _lastindex: Optional[int]
+    _lastgroup: Optional[str]
+
+    def __init__(self, match: Match):
+        n_groups = len(match.groups())
+        self._re = match.re.pattern
+        self._spans = tuple(match.span(i) for i in range(n_groups + 1))
+        self._values = (match.group(0),) + match.groups()
+        self._names = tuple(match.groupdict().keys())
+        self._lastindex = match.lastindex
+        self._lastgroup = match.lastgroup
+
+    @property
+    def lastindex(self) -> Optional[int]:
+        return self._lastindex
+
+    @property
+    def lastgroup(self) -> Optional[str]:
+        return self._lastgroup
+
+    @property
+    def pos(self) -> int:
+        return 0
+
+    @property
+    def re(self) -> str:
+        return self._re
+
+    def span(self, i: Optional[int] = None) -> Tuple[int, int]:
+        return self._spans[0 if i is None else i]
+
+    def group(self, i: Optional[int] = None) -> Optional[str]:
+        return self._values[0 if i is None else i]
+
+    def groups(self) -> List[Optional[str]]:
+        return list(self._values[1:])
+
+    def start(self, i: Optional[int] = None) -> int:
+        return self.span(i)[0]
+
+    def end(self, i: Optional[int] = None) -> int:
+        return self.span(i)[1]
+
+    def groupdict(self) -> Dict[str, Optional[str]]:
+        return dict(zip(self._names, self._values[1:]))
+
+
+def get_pattern_engine(
+    pattern: Union[AlphaNumericPattern, Pattern]
+) -> Union[AlphaNumericPattern, SlicingPattern, Pattern]:
+    """Retrieves the fastest equivalent of a pattern for matching.
+
+    Regular expressions of fixed structure (and default flags) are matched by
+    slicing, anything else by the regex engine.
+
+    Arguments:
+        pattern {Union[AlphaNumericPattern, Pattern]} -- pattern
+
+    Returns:
+        Union[AlphaNumericPattern, SlicingPattern, Pattern] -- pattern to match with
+    """
+    if isinstance(pattern, AlphaNumericPattern):
+        return pattern
+    if re.compile("").flags != pattern.flags:
+        return pattern
+    plan = get_slicing_plan(pattern.pattern)
+    if plan is None:
+        return pattern
+    return SlicingPattern(pattern.pattern, plan)
+
+
+def get_exact_version(
+    pattern: Union[AlphaNumericPattern, Pattern]
+) -> Optional[Pattern]:
+    """Retrieves the exact version of a fuzzy pattern, if any.
+
+    See fastx_barber.pattern.get_exact_pattern for when a fuzzy pattern has an
+    exact version. Not available with flags that change how fuzzy patterns
+    match (BESTMATCH, ENHANCEMATCH and POSIX).
+
+    Arguments:
+        pattern {Union[AlphaNumericPattern, Pattern]} -- pattern
+
+    Returns:
+        Optional[Pattern] -- pattern to match with first
+    """
+    if isinstance(pattern, AlphaNumericPattern):
+        return None
+    if 0 != pattern.flags & (re.BESTMATCH | re.ENHANCEMATCH | re.POSIX):
+        return None
+    exact_pattern = get_exact_pattern(pattern.pattern)
+    if exact_pattern is None:
+        return None
+    return re.compile(exact_pattern, pattern.flags)
+
+
+def get_match_window(pattern: Union[AlphaNumericPattern, Pattern]) -> Optional[int]:
+    """Retrieves the number of leading characters a pattern can match, if bounded.
+
+    See fastx_barber.pattern.get_max_span for which patterns are bounded. Patterns
+    compiled with IGNORECASE are not, as full case-folding can match a single
+    character to more than one.
+
+    Arguments:
+        pattern {Union[AlphaNumericPattern, Pattern]} -- pattern
+
+    Returns:
+        Optional[int] -- maximum match span, or None if unbounded
+    """
+    if isinstance(pattern, AlphaNumericPattern):
+        return pattern.length
+    if 0 != pattern.flags & re.IGNORECASE:
+        return None
+    return get_max_span(pattern.pattern)
+
+
+RecordMatch = Union[ANPMatch, SlicedMatch, CachedMatch, Match]
+
+
 class ABCMatcher(metaclass=ABCMeta):
     """Record matcher abstract base class
 
@@ -182,8 +569,13 @@ class ABCMatcher(metaclass=ABCMeta):
     def unmatched_count(self) -> int:
         return self._unmatched_count
 
+    def reset(self) -> None:
+        """Resets matched and unmatched record counts"""
+        self._matched_count = 0
+        self._unmatched_count = 0
+
     @abstractmethod
-    def do(self, record: Any) -> Tuple[Union[Optional[ANPMatch], Match], bool]:
+    def do(self, record: Any) -> Tuple[Optional[RecordMatch], bool]:
         """Match a record with the provided pattern
 
         Decorators:
@@ -199,14 +591,227 @@ class ABCMatcher(metaclass=ABCMeta):
 
 
 class FastxMatcher(ABCMatcher):
-    def __init__(self, pattern: Union[AlphaNumericPattern, Pattern]):
+    """Fastx record matcher
+
+    Fuzzy patterns with an exact version (see get_exact_version) are matched in
+    two stages: exactly first, and fuzzily only if the exact match fails.
+
+    Regular expressions are matched only against the first characters of a
+    record (endpos) that they can span (see get_match_window), or against as many
+    as specified with match_window. In the latter case, the results are those
+    of the regex engine, as if records were match_window characters long.
+
+    With a timeout, records that the regex engine can't match within that many
+    seconds (at each stage) are considered unmatched, and counted separately.
+
+    With a cache size, the results of the regex engine (spans and values of the
+    groups, or no match) are kept for the cache_size most recently matched record
+    prefixes, i.e., the first match_window characters of the records. Records with
+    a cached prefix skip the regex engine. The cache is used only when the match
+    window is bounded, as the results depend on the prefix only, and survives reset.
+
+    With concurrent, the regex engine releases the GIL while matching, so that
+    matchers in other threads can run at the same time. A matcher keeps per-record
+    state (counts, timeout flag, cache) and must not be shared between threads:
+    the threads backend builds one per worker thread (see scriptio.init_worker).
+
+    Extends:
+        ABCMatcher
+
+    Variables:
+        _engine {Union[AlphaNumericPattern, SlicingPattern, Pattern]} -- pattern
+                                                                      to match with
+        _exact_pattern {Optional[Pattern]} -- exact version of the pattern
+        _endpos {Optional[int]} -- match window, for the regex engine
+        _timeout {Optional[float]} -- match timeout, for the regex engine
+        _match_kwargs {Dict[str, Any]} -- keyword arguments of regex matching
+        _exact_count {int} -- number of records matched by the exact version
+        _fuzzy_count {int} -- number of records passed to the fuzzy pattern
+        _timeout_count {int} -- number of records that timed out
+        _timed_out {bool} -- whether the last record timed out
+        _cache_size {int} -- maximum number of cached prefixes (0: no cache)
+        _cache {OrderedDict[str, Optional[CachedMatch]]} -- match results, by prefix
+        _cache_hits {int} -- number of records matched from the cache
+        _cache_misses {int} -- number of records passed to the regex engine
+    """
+
+    _engine: Union[AlphaNumericPattern, SlicingPattern, Pattern]
+    _exact_pattern: Optional[Pattern]
+    _endpos: Optional[int] = None
+    _timeout: Optional[float] = None
+    _match_kwargs: Dict[str, Any]
+    _exact_count: int = 0
+    _fuzzy_count: int = 0
+    _timeout_count: int = 0
+    _timed_out: bool = False
+    _cache_size: int = 0
+    _cache: "OrderedDict[str, Optional[CachedMatch]]"
+    _cache_hits: int = 0
+    _cache_misses: int = 0
+
+    def __init__(
+        self,
+        pattern: Union[AlphaNumericPattern, Pattern],
+        match_window: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cache_size: int = 0,
+        concurrent: bool = False,
+    ):
+        """Init matcher class
+
+        Arguments:
+            pattern {Union[AlphaNumericPattern, Pattern]} -- pattern to be matched
+
+        Keyword Arguments:
+            match_window {Optional[int]} -- number of leading characters of a record
+                                            to match regular expressions against;
+                                            all of them if 0, and as many as the
+                                            pattern can span if None
+                                            (default: {None})
+            timeout {Optional[float]} -- seconds to match a record with the regex
+                                         engine, before giving up (default: {None})
+            cache_size {int} -- number of record prefixes whose match results are
+                                cached, with the regex engine (default: {0})
+            concurrent {bool} -- release the GIL while matching with the regex
+                                 engine (default: {False})
+        """
         super(FastxMatcher, self).__init__(pattern)
+        assert match_window is None or 0 <= match_window
+        assert timeout is None or 0 < timeout
+        assert 0 <= cache_size
+        self._engine = get_pattern_engine(pattern) if match_window is None else pattern
+        self._exact_pattern = get_exact_version(pattern)
+        if not isinstance(self._engine, (AlphaNumericPattern, SlicingPattern)):
+            self._endpos = (
+                get_match_window(pattern) if match_window is None else match_window
+            )
+            if 0 == self._endpos:
+                self._endpos = None
+            self._timeout = timeout
+            if self._endpos is not None:
+                self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._match_kwargs = {}
+        if self._endpos is not None:
+            self._match_kwargs["endpos"] = self._endpos
+        if self._timeout is not None:
+            self._match_kwargs["timeout"] = self._timeout
+        if concurrent and not isinstance(
+            self._engine, (AlphaNumericPattern, SlicingPattern)
+        ):
+            self._match_kwargs["concurrent"] = True
 
-    def do(
-        self, record: SimpleFastxRecord
-    ) -> Tuple[Union[Optional[ANPMatch], Match], bool]:
+    @property
+    def match_window(self) -> Optional[int]:
+        """Number of leading characters regular expressions are matched against"""
+        return self._endpos
+
+    @property
+    def timeout(self) -> Optional[float]:
+        """Seconds to match a record with the regex engine, before giving up"""
+        return self._timeout
+
+    @property
+    def timed_out(self) -> bool:
+        """Whether matching the last record timed out"""
+        return self._timed_out
+
+    @property
+    def cache_size(self) -> int:
+        """Maximum number of cached record prefixes (0 if the cache is not used)"""
+        return self._cache_size
+
+    @property
+    def is_two_stage(self) -> bool:
+        """Whether records are matched exactly first, and fuzzily on failure"""
+        return self._exact_pattern is not None
+
+    @property
+    def stats(self) -> Counter:
+        """Number of records per matching path (e.g., exact or fuzzy), of records
+        that timed out, and of cache hits and misses"""
+        stats: Counter = Counter()
+        if self.is_two_stage:
+            stats["exact"] = self._exact_count
+            stats["fuzzy"] = self._fuzzy_count
+        if self._timeout is not None:
+            stats["timeout"] = self._timeout_count
+        if 0 != self._cache_size:
+            stats["cache_hit"] = self._cache_hits
+            stats["cache_miss"] = self._cache_misses
+        return stats
+
+    def reset(self) -> None:
+        """Resets record counts"""
+        super(FastxMatcher, self).reset()
+        self._exact_count = 0
+        self._fuzzy_count = 0
+        self._timeout_count = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    @property
+    def pattern_stats(self) -> Counter:
+        """Number of matched and timed out records, by pattern id (always 0)"""
+        return Counter(
+            {(0, "matched"): self.matched_count, (0, "timeout"): self._timeout_count}
+        )
+
+    @property
+    def is_sliced(self) -> bool:
+        """Whether the pattern is matched by slicing, instead of the regex engine"""
+        return isinstance(self._engine, SlicingPattern)
+
+    @property
+    def can_batch(self) -> bool:
+        """Whether whole batches of records can be matched at once (do_batch)"""
+        return isinstance(self._engine, (AlphaNumericPattern, SlicingPattern))
+
+    def do(self, record: SimpleFastxRecord) -> Tuple[Optional[RecordMatch], bool]:
         name, seq, _ = record
-        match = self._pattern.match(seq)
+        if 0 != self._cache_size:
+            return self.__do_cached(seq)
+        return self.__match(seq)
+
+    def __do_cached(self, seq: str) -> Tuple[Optional[RecordMatch], bool]:
+        prefix = seq[: self._endpos]
+        if prefix in self._cache:
+            self._cache.move_to_end(prefix)
+            self._cache_hits += 1
+            self._timed_out = False
+            cached_match = self._cache[prefix]
+            if cached_match is None:
+                self._unmatched_count += 1
+                return (None, False)
+            self._matched_count += 1
+            return (cached_match, True)
+        self._cache_misses += 1
+        match, matched = self.__match(seq)
+        if not self._timed_out:
+            if len(self._cache) >= self._cache_size:
+                self._cache.popitem(last=False)
+            self._cache[prefix] = CachedMatch(cast(Match, match)) if matched else None
+        return (match, matched)
+
+    def __match(self, seq: str) -> Tuple[Optional[RecordMatch], bool]:
+        match: Optional[RecordMatch] = None
+        self._timed_out = False
+        try:
+            if self._exact_pattern is not None:
+                match = self._exact_pattern.match(seq, **self._match_kwargs)
+                if match is None:
+                    self._fuzzy_count += 1
+                else:
+                    self._exact_count += 1
+            if match is None:
+                match = (
+                    self._engine.match(seq)
+                    if 0 == len(self._match_kwargs)
+                    else cast(Pattern, self._engine).match(seq, **self._match_kwargs)
+                )
+        except TimeoutError:
+            self._timed_out = True
+            self._timeout_count += 1
         matched = match is not None
         if matched:
             self._matched_count += 1
@@ -214,6 +819,241 @@ class FastxMatcher(ABCMatcher):
             self._unmatched_count += 1
         return (match, matched)
 
+    def dispatch(
+        self, record: SimpleFastxRecord
+    ) -> Tuple[Optional[RecordMatch], Optional[int]]:
+        """Match a record, as FastxMultiMatcher.dispatch with a single pattern
+
+        Arguments:
+            record {SimpleFastxRecord} -- record to be matched
+
+        Returns:
+            Tuple[Optional[RecordMatch], Optional[int]] --
+                match and pattern id (0, or None if unmatched)
+        """
+        match, matched = self.do(record)
+        return (match, 0 if matched else None)
+
+    def do_batch(self, records: Sequence[SimpleFastxRecord]) -> ANPBatchMatch:
+        """Match a batch of records with the provided fixed-structure pattern
+
+        Either an alphanumeric pattern, or a regular expression matched by slicing.
+
+        Arguments:
+            records {Sequence[SimpleFastxRecord]} -- records to be matched
+
+        Returns:
+            ANPBatchMatch -- matches of the batch
+        """
+        assert isinstance(
+            self._engine, (AlphaNumericPattern, SlicingPattern)
+        ), "batch matching requires a fixed-structure pattern."
+        batch_match = self._engine.match_batch([record[1] for record in records])
+        matched_count = int(batch_match.matched.sum())
+        self._matched_count += matched_count
+        self._unmatched_count += len(records) - matched_count
+        return batch_match
+
+
+def get_pattern_prefix(pattern: Union[AlphaNumericPattern, Pattern]) -> str:
+    """Retrieves the literal string that any match of a pattern starts with.
+
+    See fastx_barber.pattern.get_literal_prefix for details.
+
+    Arguments:
+        pattern {Union[AlphaNumericPattern, Pattern]} -- pattern
+
+    Returns:
+        str -- literal prefix, empty if none
+    """
+    if isinstance(pattern, AlphaNumericPattern):
+        return ""
+    if 0 != pattern.flags & re.IGNORECASE:
+        return ""
+    return get_literal_prefix(pattern.pattern)
+
+
+class PrefixIndex(object):
+    """Index of patterns by literal prefix
+
+    Selects the patterns that a query can match, based on their literal prefixes.
+    Patterns without a literal prefix are always selected.
+
+    Variables:
+        _prefixes {Dict[int, Dict[str, List[int]]]} -- pattern ids, by prefix
+                                                       length and prefix
+        _unprefixed {List[int]} -- ids of patterns without literal prefix
+    """
+
+    _prefixes: Dict[int, Dict[str, List[int]]]
+    _unprefixed: List[int]
+
+    def __init__(self, prefixes: List[str]):
+        """Init prefix index
+
+        Arguments:
+            prefixes {List[str]} -- literal prefix of each pattern (or empty)
+        """
+        super(PrefixIndex, self).__init__()
+        self._prefixes = {}
+        self._unprefixed = []
+        for pattern_id, prefix in enumerate(prefixes):
+            if "" == prefix:
+                self._unprefixed.append(pattern_id)
+            else:
+                self._prefixes.setdefault(len(prefix), {}).setdefault(
+                    prefix, []
+                ).append(pattern_id)
+
+    def select(self, query: str) -> List[int]:
+        """Selects the patterns that a query can match.
+
+        Arguments:
+            query {str} -- query string
+
+        Returns:
+            List[int] -- pattern ids, sorted
+        """
+        selected = list(self._unprefixed)
+        for length, by_prefix in self._prefixes.items():
+            selected.extend(by_prefix.get(query[:length], []))
+        if len(selected) != len(self._unprefixed):
+            selected.sort()
+        return selected
+
+
+class FastxMultiMatcher(object):
+    """Fastx record matcher, for multiple patterns
+
+    Each record is assigned to the first pattern that it matches, trying only the
+    patterns that the record prefix can match (see PrefixIndex). Records that
+    time out with a pattern are considered unmatched, without trying the next
+    patterns.
+
+    Variables:
+        _matchers {List[FastxMatcher]} -- matcher of each pattern
+        _index {PrefixIndex} -- index of the patterns by literal prefix
+        _unmatched_count {int} -- number of unmatched records
+    """
+
+    _matchers: List[FastxMatcher]
+    _index: PrefixIndex
+    _unmatched_count: int = 0
+
+    def __init__(
+        self,
+        patterns: Sequence[Union[AlphaNumericPattern, Pattern]],
+        match_window: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cache_size: int = 0,
+        concurrent: bool = False,
+    ):
+        """Init multi-pattern matcher class
+
+        Arguments:
+            patterns {Sequence[Union[AlphaNumericPattern, Pattern]]} -- patterns to
+                                                                        be matched,
+                                                                        by priority
+
+        Keyword Arguments:
+            match_window {Optional[int]} -- see FastxMatcher (default: {None})
+            timeout {Optional[float]} -- see FastxMatcher (default: {None})
+            cache_size {int} -- see FastxMatcher, for each pattern (default: {0})
+            concurrent {bool} -- see FastxMatcher (default: {False})
+        """
+        super(FastxMultiMatcher, self).__init__()
+        self._matchers = [
+            FastxMatcher(p, match_window, timeout, cache_size, concurrent)
+            for p in patterns
+        ]
+        self._index = PrefixIndex([get_pattern_prefix(p) for p in patterns])
+
+    @property
+    def matched_count(self) -> int:
+        return sum(matcher.matched_count for matcher in self._matchers)
+
+    @property
+    def unmatched_count(self) -> int:
+        return self._unmatched_count
+
+    @property
+    def can_batch(self) -> bool:
+        return False
+
+    @property
+    def pattern_stats(self) -> Counter:
+        """Number of matched and timed out records, by pattern id"""
+        pattern_stats: Counter = Counter()
+        for pattern_id, matcher in enumerate(self._matchers):
+            for (_, key), count in matcher.pattern_stats.items():
+                pattern_stats[(pattern_id, key)] = count
+        return pattern_stats
+
+    @property
+    def stats(self) -> Counter:
+        """Number of records per matching path (e.g., exact or fuzzy), and of
+        records that timed out, over all patterns"""
+        return sum((matcher.stats for matcher in self._matchers), Counter())
+
+    def reset(self) -> None:
+        """Resets record counts"""
+        for matcher in self._matchers:
+            matcher.reset()
+        self._unmatched_count = 0
+
+    def dispatch(
+        self, record: SimpleFastxRecord
+    ) -> Tuple[Optional[RecordMatch], Optional[int]]:
+        """Match a record with the first pattern it matches
+
+        Arguments:
+            record {SimpleFastxRecord} -- record to be matched
+
+        Returns:
+            Tuple[Optional[RecordMatch], Optional[int]] --
+                match and id of the matched pattern (None if unmatched)
+        """
+        for pattern_id in self._index.select(record[1]):
+            matcher = self._matchers[pattern_id]
+            match, matched = matcher.do(record)
+            if matched:
+                return (match, pattern_id)
+            if matcher.timed_out:
+                break
+        self._unmatched_count += 1
+        return (None, None)
+
+    def do(self, record: SimpleFastxRecord) -> Tuple[Optional[RecordMatch], bool]:
+        match, pattern_id = self.dispatch(record)
+        return (match, pattern_id is not None)
+
+
+def get_fastx_matcher(
+    patterns: Sequence[Union[AlphaNumericPattern, Pattern]],
+    match_window: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cache_size: int = 0,
+    concurrent: bool = False,
+) -> Union[FastxMatcher, FastxMultiMatcher]:
+    """Retrieves a matcher for one or more patterns.
+
+    Arguments:
+        patterns {Sequence[Union[AlphaNumericPattern, Pattern]]} -- patterns
+
+    Keyword Arguments:
+        match_window {Optional[int]} -- see FastxMatcher (default: {None})
+        timeout {Optional[float]} -- see FastxMatcher (default: {None})
+        cache_size {int} -- see FastxMatcher (default: {0})
+        concurrent {bool} -- see FastxMatcher (default: {False})
+
+    Returns:
+        Union[FastxMatcher, FastxMultiMatcher] -- matcher
+    """
+    assert 0 != len(patterns), "at least one pattern is required."
+    if 1 == len(patterns):
+        return FastxMatcher(patterns[0], match_window, timeout, cache_size, concurrent)
+    return FastxMultiMatcher(patterns, match_window, timeout, cache_size, concurrent)
+
 
 def search_needle(
     record: SimpleFastxRecord, needle: str, offset: int = 0
@@ -0,0 +1,631 @@
+"""
+@author: Gabriele Girelli
+@contact: gigi.ga90@gmail.com
+"""
+
+from enum import Enum
+import regex as re  # type: ignore
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+ESCAPED_CHARACTERS: Dict[str, str] = {
+    "n": "\n",
+    "t": "\t",
+    "r": "\r",
+    "f": "\f",
+    "v": "\v",
+    "a": "\a",
+}
+
+
+class UnsupportedPatternError(Exception):
+    """Raised when a pattern uses syntax that the analyzer does not handle."""
+
+    pass
+
+
+class NodeKinds(Enum):
+    """Kinds of regular expression nodes
+
+    Extends:
+        Enum
+
+    Variables:
+        LITERAL {str} -- a single character
+        ANY {str} -- any character (.)
+        CLASS {str} -- a character class, e.g., [ACGT] or \\d
+        ANCHOR {str} -- a zero-width assertion, e.g., ^, $ or \\b
+        GROUP {str} -- a (capturing or not) group
+        LOOKAROUND {str} -- a lookahead or lookbehind
+    """
+
+    LITERAL = "literal"
+    ANY = "any"
+    CLASS = "class"
+    ANCHOR = "anchor"
+    GROUP = "group"
+    LOOKAROUND = "lookaround"
+
+
+class PatternNode(object):
+    """Node of a parsed regular expression
+
+    Variables:
+        kind {NodeKinds} -- node kind
+        text {str} -- source of literals, classes and anchors
+        name {Optional[str]} -- group name, for named groups
+        capturing {bool} -- whether the group is capturing
+        alternatives {List[List[PatternNode]]} -- group content
+        min_repeat {int} -- minimum number of repetitions
+        max_repeat {Optional[int]} -- maximum number of repetitions (None: any)
+        fuzzy {Optional[str]} -- fuzzy constraints, without braces
+        fuzzy_span {Optional[Tuple[int, int]]} -- fuzzy constraints position
+                                                  in the pattern, with braces
+    """
+
+    kind: NodeKinds
+    text: str
+    name: Optional[str]
+    capturing: bool
+    alternatives: List[List["PatternNode"]]
+    min_repeat: int
+    max_repeat: Optional[int]
+    fuzzy: Optional[str]
+    fuzzy_span: Optional[Tuple[int, int]]
+
+    def __init__(
+        self,
+        kind: NodeKinds,
+        text: str = "",
+        name: Optional[str] = None,
+        capturing: bool = False,
+        alternatives: Optional[List[List["PatternNode"]]] = None,
+    ):
+        super(PatternNode, self).__init__()
+        self.kind = kind
+        self.text = text
+        self.name = name
+        self.capturing = capturing
+        self.alternatives = [] if alternatives is None else alternatives
+        self.min_repeat = 1
+        self.max_repeat = 1
+        self.fuzzy = None
+        self.fuzzy_span = None
+
+    @property
+    def is_repeated(self) -> bool:
+        return 1 != self.min_repeat or 1 != self.max_repeat
+
+    @property
+    def is_fixed_repeat(self) -> bool:
+        return self.min_repeat == self.max_repeat
+
+
+class PatternParser(object):
+    """Parser of (a subset of) the regex module syntax
+
+    Supports literals, wildcards, character classes, anchors, (named, capturing,
+    non-capturing and atomic) groups, lookarounds, alternation, quantifiers and
+    fuzzy constraints. Raises UnsupportedPatternError on anything else
+    (e.g., backreferences or inline flags).
+
+    Variables:
+        _pattern {str} -- pattern to parse
+        _pos {int} -- current position
+    """
+
+    _pattern: str
+    _pos: int
+
+    def __init__(self, pattern: str):
+        super(PatternParser, self).__init__()
+        self._pattern = pattern
+        self._pos = 0
+
+    def parse(self) -> List[List[PatternNode]]:
+        """Parses the pattern.
+
+        Returns:
+            List[List[PatternNode]] -- top-level alternatives
+        """
+        self._pos = 0
+        alternatives = self.__parse_alternatives()
+        if self._pos != len(self._pattern):
+            raise UnsupportedPatternError(f"unexpected ')' at {self._pos}")
+        return alternatives
+
+    def __peek(self, size: int = 1) -> str:
+        return self._pattern[self._pos : self._pos + size]
+
+    def __parse_alternatives(self) -> List[List[PatternNode]]:
+        alternatives = [self.__parse_sequence()]
+        while "|" == self.__peek():
+            self._pos += 1
+            alternatives.append(self.__parse_sequence())
+        return alternatives
+
+    def __parse_sequence(self) -> List[PatternNode]:
+        nodes: List[PatternNode] = []
+        while self._pos < len(self._pattern) and self.__peek() not in "|)":
+            node = self.__parse_atom()
+            self.__parse_suffixes(node)
+            nodes.append(node)
+        return nodes
+
+    def __parse_atom(self) -> PatternNode:
+        c = self.__peek()
+        if "(" == c:
+            return self.__parse_group()
+        if "[" == c:
+            return self.__parse_class()
+        if "\\" == c:
+            return self.__parse_escape()
+        self._pos += 1
+        if "." == c:
+            return PatternNode(NodeKinds.ANY, c)
+        if c in "^$":
+            return PatternNode(NodeKinds.ANCHOR, c)
+        if c in "*+?{":
+            raise UnsupportedPatternError(f"nothing to repeat at {self._pos - 1}")
+        return PatternNode(NodeKinds.LITERAL, c)
+
+    def __parse_group(self) -> PatternNode:
+        start = self._pos
+        node: PatternNode
+        if self.__peek(4) in ("(?<=", "(?<!"):
+            node = PatternNode(NodeKinds.LOOKAROUND, self.__peek(4))
+            self._pos += 4
+        elif self.__peek(3) in ("(?=", "(?!"):
+            node = PatternNode(NodeKinds.LOOKAROUND, self.__peek(3))
+            self._pos += 3
+        elif self.__peek(3) == "(?<" or self.__peek(4) == "(?P<":
+            self._pos = self._pattern.index("<", self._pos) + 1
+            name_end = self._pattern.find(">", self._pos)
+            if -1 == name_end:
+                raise UnsupportedPatternError(f"unterminated group name at {start}")
+            node = PatternNode(
+                NodeKinds.GROUP,
+                name=self._pattern[self._pos : name_end],
+                capturing=True,
+            )
+            self._pos = name_end + 1
+        elif self.__peek(3) in ("(?:", "(?>"):
+            node = PatternNode(NodeKinds.GROUP)
+            self._pos += 3
+        elif "(?" == self.__peek(2):
+            raise UnsupportedPatternError(f"unsupported group at {start}")
+        else:
+            node = PatternNode(NodeKinds.GROUP, capturing=True)
+            self._pos += 1
+        node.alternatives = self.__parse_alternatives()
+        if ")" != self.__peek():
+            raise UnsupportedPatternError(f"unterminated group at {start}")
+        self._pos += 1
+        return node
+
+    def __parse_class(self) -> PatternNode:
+        end = self._pos + 1
+        if "^" == self._pattern[end : end + 1]:
+            end += 1
+        if "]" == self._pattern[end : end + 1]:
+            end += 1
+        while end < len(self._pattern) and "]" != self._pattern[end]:
+            end += 2 if "\\" == self._pattern[end] else 1
+        if end >= len(self._pattern):
+            raise UnsupportedPatternError(f"unterminated class at {self._pos}")
+        node = PatternNode(NodeKinds.CLASS, self._pattern[self._pos : end + 1])
+        self._pos = end + 1
+        return node
+
+    def __parse_escape(self) -> PatternNode:
+        text = self.__peek(2)
+        if 2 != len(text):
+            raise UnsupportedPatternError("trailing backslash")
+        self._pos += 2
+        c = text[1]
+        if c in "dDwWsS":
+            return PatternNode(NodeKinds.CLASS, text)
+        if c in "bBAZG":
+            return PatternNode(NodeKinds.ANCHOR, text)
+        if c in ESCAPED_CHARACTERS:
+            return PatternNode(NodeKinds.LITERAL, ESCAPED_CHARACTERS[c])
+        if c.isalnum():
+            raise UnsupportedPatternError(f"unsupported escape '{text}'")
+        return PatternNode(NodeKinds.LITERAL, c)
+
+    def __parse_suffixes(self, node: PatternNode) -> None:
+        while self.__peek() in ("*", "+", "?", "{"):
+            if "{" == self.__peek():
+                self.__parse_braces(node)
+                continue
+            if node.is_repeated or node.fuzzy is not None:
+                raise UnsupportedPatternError(f"multiple repeat at {self._pos}")
+            node.min_repeat, node.max_repeat = {
+                "*": (0, None),
+                "+": (1, None),
+                "?": (0, 1),
+            }[self.__peek()]
+            self._pos += 1
+            self.__skip_repeat_mode()
+        if node.kind is NodeKinds.ANCHOR and node.is_repeated:
+            raise UnsupportedPatternError("repeated anchor")
+
+    def __parse_braces(self, node: PatternNode) -> None:
+        start = self._pos
+        end = self._pattern.find("}", start)
+        if -1 == end:
+            raise UnsupportedPatternError(f"unterminated braces at {start}")
+        content = self._pattern[start + 1 : end]
+        self._pos = end + 1
+        repeat = re.fullmatch(r"(\d*)(,?)(\d*)", content)
+        if repeat is not None and "" != content and "," != content:
+            if node.is_repeated or node.fuzzy is not None:
+                raise UnsupportedPatternError(f"multiple repeat at {start}")
+            low, comma, high = repeat.groups()
+            node.min_repeat = int(low) if "" != low else 0
+            if "" == comma:
+                node.max_repeat = node.min_repeat
+            else:
+                node.max_repeat = int(high) if "" != high else None
+            self.__skip_repeat_mode()
+        elif re.match(r"[\d\s<=+,sdie]*[sdie]", content) is not None:
+            if node.fuzzy is not None:
+                raise UnsupportedPatternError(f"multiple fuzzy constraints at {start}")
+            node.fuzzy = content
+            node.fuzzy_span = (start, end + 1)
+        else:
+            raise UnsupportedPatternError(f"unsupported braces at {start}")
+
+    def __skip_repeat_mode(self) -> None:
+        if self.__peek() in ("?", "+"):
+            self._pos += 1
+
+
+def parse_pattern(pattern: str) -> Optional[List[List[PatternNode]]]:
+    """Parses a pattern, if its syntax is supported.
+
+    Arguments:
+        pattern {str} -- regular expression
+
+    Returns:
+        Optional[List[List[PatternNode]]] -- top-level alternatives, or None
+    """
+    try:
+        return PatternParser(pattern).parse()
+    except UnsupportedPatternError:
+        return None
+
+
+class SlicingPlan(NamedTuple):
+    """Matching plan of a fixed-structure pattern
+
+    Variables:
+        length {int} -- match length
+        literals {List[Tuple[int, str]]} -- literal strings and their positions
+        groups {List[Tuple[str, Tuple[int, int]]]} -- named group spans
+        anchored_end {bool} -- whether the match must end with the query ($)
+    """
+
+    length: int
+    literals: List[Tuple[int, str]]
+    groups: List[Tuple[str, Tuple[int, int]]]
+    anchored_end: bool
+
+
+def is_fixed_atom(node: PatternNode) -> bool:
+    """Whether a node is a literal or wildcard, repeated a fixed number of times."""
+    return (
+        node.kind in (NodeKinds.LITERAL, NodeKinds.ANY)
+        and node.is_fixed_repeat
+        and node.fuzzy is None
+    )
+
+
+def get_slicing_plan(pattern: str) -> Optional[SlicingPlan]:
+    """Compiles a fixed-structure pattern into a slicing plan.
+
+    Fixed-structure patterns are anchored sequences of literals and wildcards (.),
+    repeated a fixed number of times, optionally in named (non-nested) groups,
+    without alternation nor fuzzy constraints. E.g.,
+    ^(?<UMI>.{8})(?<BC>.{8})(?<CS>GATC)
+
+    Arguments:
+        pattern {str} -- regular expression
+
+    Returns:
+        Optional[SlicingPlan] -- plan, or None if the pattern is not supported
+    """
+    alternatives = parse_pattern(pattern)
+    if alternatives is None or 1 != len(alternatives):
+        return None
+    nodes = alternatives[0]
+    if 0 != len(nodes) and NodeKinds.ANCHOR is nodes[0].kind and "^" == nodes[0].text:
+        nodes = nodes[1:]
+    anchored_end = (
+        0 != len(nodes) and NodeKinds.ANCHOR is nodes[-1].kind and "$" == nodes[-1].text
+    )
+    if anchored_end:
+        nodes = nodes[:-1]
+
+    position = 0
+    literals: List[Tuple[int, str]] = []
+    groups: List[Tuple[str, Tuple[int, int]]] = []
+
+    def add_atom(node: PatternNode) -> None:
+        nonlocal position
+        if NodeKinds.LITERAL is node.kind:
+            literals.append((position, node.text * node.min_repeat))
+        position += node.min_repeat
+
+    for node in nodes:
+        if is_fixed_atom(node):
+            add_atom(node)
+        elif (
+            NodeKinds.GROUP is node.kind
+            and node.name is not None
+            and not node.is_repeated
+            and node.fuzzy is None
+            and 1 == len(node.alternatives)
+            and all(is_fixed_atom(n) for n in node.alternatives[0])
+        ):
+            group_start = position
+            for child in node.alternatives[0]:
+                add_atom(child)
+            groups.append((node.name, (group_start, position)))
+        else:
+            return None
+
+    merged_literals: List[Tuple[int, str]] = []
+    for start, literal in literals:
+        if 0 != len(merged_literals):
+            last_start, last_literal = merged_literals[-1]
+            if last_start + len(last_literal) == start:
+                merged_literals[-1] = (last_start, last_literal + literal)
+                continue
+        merged_literals.append((start, literal))
+    return SlicingPlan(position, merged_literals, groups, anchored_end)
+
+
+def has_fuzzy(node: PatternNode) -> bool:
+    """Whether a node, or any node it contains, has fuzzy constraints."""
+    return node.fuzzy is not None or any(
+        has_fuzzy(child) for alternative in node.alternatives for child in alternative
+    )
+
+
+def has_choice(node: PatternNode) -> bool:
+    """Whether a node, or any node it contains, can match in more than one way.
+
+    I.e., whether it is repeated a variable number of times or it alternates.
+    """
+    return (
+        not node.is_fixed_repeat
+        or 1 < len(node.alternatives)
+        or any(has_choice(child) for alt in node.alternatives for child in alt)
+    )
+
+
+def get_exact_pattern(pattern: str) -> Optional[str]:
+    """Derives the exact version of a fuzzy pattern, by dropping its fuzzy
+    constraints.
+
+    The exact version is returned only when, on any query it matches, the fuzzy
+    pattern finds the very same match. This holds when nothing before (or
+    within) the fuzzy items can match in more than one way, as the regex module
+    tries an exact match of fuzzy items first. E.g., the exact version of
+    ^(?<UMI>.{8})(?<CS>GATC){s<2}(?<BC>.+) is ^(?<UMI>.{8})(?<CS>GATC)(?<BC>.+)
+
+    Arguments:
+        pattern {str} -- regular expression
+
+    Returns:
+        Optional[str] -- exact pattern, or None if the pattern is not fuzzy or
+                         not supported
+    """
+    alternatives = parse_pattern(pattern)
+    if alternatives is None or 1 != len(alternatives):
+        return None
+
+    fuzzy_spans: List[Tuple[int, int]] = []
+    choice_seen = False
+
+    def visit(nodes: List[PatternNode]) -> bool:
+        nonlocal choice_seen
+        for node in nodes:
+            if node.fuzzy is not None:
+                if choice_seen or has_choice(node) or NodeKinds.LOOKAROUND is node.kind:
+                    return False
+                assert node.fuzzy_span is not None
+                fuzzy_spans.append(node.fuzzy_span)
+                if not visit(node.alternatives[0] if node.alternatives else []):
+                    return False
+            elif not has_fuzzy(node):
+                choice_seen |= has_choice(node)
+            elif NodeKinds.LOOKAROUND is node.kind or has_choice(node):
+                return False
+            elif not visit(node.alternatives[0]):
+                return False
+        return True
+
+    if not visit(alternatives[0]) or 0 == len(fuzzy_spans):
+        return None
+    exact_pattern = ""
+    position = 0
+    for start, end in sorted(fuzzy_spans):
+        exact_pattern += pattern[position:start]
+        position = end
+    return exact_pattern + pattern[position:]
+
+
+def get_max_insertions(constraints: str) -> Optional[int]:
+    """Computes the maximum number of insertions allowed by fuzzy constraints.
+
+    Constraints can limit errors of one type (e.g., i<=2 or 1<=e<3), or their cost
+    (e.g., 2i+2d+1s<=4). Insertions are allowed only if constrained by i or e.
+
+    Arguments:
+        constraints {str} -- fuzzy constraints, without braces
+
+    Returns:
+        Optional[int] -- maximum number of insertions, or None if unbounded
+
+    Raises:
+        UnsupportedPatternError -- if the constraints cannot be parsed
+    """
+    max_insertions: Optional[int] = None
+    allows_insertions = False
+    for constraint in re.sub(r"\s", "", constraints).split(","):
+        limit = re.fullmatch(r"(?:\d+<=?)?([deis])(?:(<=?)(\d+))?", constraint)
+        cost = re.fullmatch(r"((?:\d*[deis]\+)*\d*[deis])(<=?)(\d+)", constraint)
+        if limit is not None:
+            error_type, operator, bound = limit.groups()
+            if error_type not in "ie":
+                continue
+            allows_insertions = True
+            if bound is None:
+                continue
+            insertions = int(bound) - int("<" == operator)
+        elif cost is not None:
+            terms, operator, bound = cost.groups()
+            unit_costs = dict(
+                (term[-1], int(term[:-1]) if "" != term[:-1] else 1)
+                for term in terms.split("+")
+            )
+            if "i" not in unit_costs and "e" not in unit_costs:
+                continue
+            allows_insertions = True
+            unit_cost = min(unit_costs[t] for t in "ie" if t in unit_costs)
+            if 0 == unit_cost:
+                continue
+            insertions = (int(bound) - int("<" == operator)) // unit_cost
+        else:
+            raise UnsupportedPatternError(
+                f"unsupported fuzzy constraint '{constraint}'"
+            )
+        if max_insertions is None or insertions < max_insertions:
+            max_insertions = max(0, insertions)
+    if not allows_insertions:
+        return 0
+    return max_insertions
+
+
+def get_max_width(node: PatternNode) -> Optional[int]:
+    """Computes the maximum number of characters a node can match.
+
+    Arguments:
+        node {PatternNode} -- pattern node
+
+    Returns:
+        Optional[int] -- maximum width, or None if unbounded
+
+    Raises:
+        UnsupportedPatternError -- if the node looks beyond its match, i.e.,
+                                   it is a lookaround or an anchor other than ^
+    """
+    if NodeKinds.LOOKAROUND is node.kind or (
+        NodeKinds.ANCHOR is node.kind and node.text not in ("^", "\\A")
+    ):
+        raise UnsupportedPatternError(f"'{node.text}' looks beyond the match")
+    width: Optional[int] = 0 if NodeKinds.ANCHOR is node.kind else 1
+    if NodeKinds.GROUP is node.kind:
+        width = get_max_alternatives_width(node.alternatives)
+    if width is None or node.max_repeat is None:
+        return None
+    width *= node.max_repeat
+    if node.fuzzy is not None:
+        max_insertions = get_max_insertions(node.fuzzy)
+        if max_insertions is None:
+            return None
+        width += max_insertions
+    return width
+
+
+def get_max_alternatives_width(
+    alternatives: List[List[PatternNode]],
+) -> Optional[int]:
+    """Computes the maximum number of characters alternatives can match.
+
+    Arguments:
+        alternatives {List[List[PatternNode]]} -- alternative node sequences
+
+    Returns:
+        Optional[int] -- maximum width, or None if unbounded
+    """
+    max_width = 0
+    for alternative in alternatives:
+        width = 0
+        for node in alternative:
+            node_width = get_max_width(node)
+            if node_width is None:
+                return None
+            width += node_width
+        max_width = max(max_width, width)
+    return max_width
+
+
+def get_max_span(pattern: str) -> Optional[int]:
+    """Computes the maximum span of a match of a pattern, from its start.
+
+    The span includes the insertions allowed by fuzzy constraints. Patterns with
+    end anchors ($), word boundaries or lookarounds are not bounded, as they look
+    beyond the match. E.g., the maximum span of ^(?<UMI>.{8})(?<CS>GATC){e<=1}
+    is 13.
+
+    Arguments:
+        pattern {str} -- regular expression
+
+    Returns:
+        Optional[int] -- maximum span, or None if the pattern is not bounded
+    """
+    alternatives = parse_pattern(pattern)
+    if alternatives is None:
+        return None
+    try:
+        return get_max_alternatives_width(alternatives)
+    except UnsupportedPatternError:
+        return None
+
+
+def get_literal_prefix(pattern: str) -> str:
+    """Retrieves the literal string that any match of a pattern starts with.
+
+    E.g., the literal prefix of ^GA(?<CS>TC)(?<UMI>.{8}) is GATC, and that of
+    ^(?<UMI>.{8})GATC is empty. Fuzzy, optional and alternating nodes end the
+    prefix.
+
+    Arguments:
+        pattern {str} -- regular expression
+
+    Returns:
+        str -- literal prefix, empty if none or if the pattern is not supported
+    """
+    alternatives = parse_pattern(pattern)
+    if alternatives is None or 1 != len(alternatives):
+        return ""
+    nodes = alternatives[0]
+    if 0 != len(nodes) and NodeKinds.ANCHOR is nodes[0].kind and "^" == nodes[0].text:
+        nodes = nodes[1:]
+
+    prefix = ""
+
+    def visit(nodes: List[PatternNode]) -> bool:
+        nonlocal prefix
+        for node in nodes:
+            if node.fuzzy is not None:
+                return False
+            if NodeKinds.LITERAL is node.kind:
+                prefix += node.text * node.min_repeat
+                if not node.is_fixed_repeat:
+                    return False
+            elif (
+                NodeKinds.GROUP is node.kind
+                and not node.is_repeated
+                and 1 == len(node.alternatives)
+            ):
+                if not visit(node.alternatives[0]):
+                    return False
+            else:
+                return False
+        return True
+
+    visit(nodes)
+    return prefix
@@ -3,10 +3,47 @@
 @contact: gigi.ga90@gmail.com
 """
 
+from collections import defaultdict
 from fastx_barber.const import DEFAULT_PHRED_OFFSET, FlagData, QFLAG_START
 import logging
 import numpy as np  # type: ignore
-from typing import Callable, Dict, List, Tuple
+from typing import Callable, DefaultDict, Dict, List, Sequence, Tuple
+
+
+class QualityBatch(object):
+    """Quality scores of a batch of records, in a single buffer
+
+    Variables:
+        _qscores {np.ndarray} -- concatenated quality scores (uint8)
+        _offsets {np.ndarray} -- start of each record's scores, plus total length
+    """
+
+    _qscores: np.ndarray
+    _offsets: np.ndarray
+
+    def __init__(self, qscores: np.ndarray, offsets: np.ndarray):
+        super(QualityBatch, self).__init__()
+        assert len(qscores) == offsets[-1]
+        self._qscores = qscores
+        self._offsets = offsets
+
+    @property
+    def qscores(self) -> np.ndarray:
+        return self._qscores
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self._offsets
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        return self._qscores[self._offsets[i] : self._offsets[i + 1]]
 
 
 class QualityIO(object):
@@ -30,6 +67,35 @@ class QualityIO(object):
         ), f"phred offset of {self.__phred_offset} produces negative qscores"
         return qscore
 
+    def __bytes_to_qscore(self, data: bytes) -> np.ndarray:
+        phred = np.frombuffer(data, dtype=np.uint8)
+        assert (
+            0 == len(phred) or phred.min() >= self.__phred_offset
+        ), f"phred offset of {self.__phred_offset} produces negative qscores"
+        return phred - np.uint8(self.__phred_offset)
+
+    def phred_to_qscore_array(self, qual: str) -> np.ndarray:
+        """Converts a phred string into an array of quality scores (uint8)."""
+        return self.__bytes_to_qscore(qual.encode("ascii"))
+
+    def phred_to_qscore_batch(self, quals: Sequence[str]) -> QualityBatch:
+        """Converts phred strings into quality scores, in a single pass.
+
+        Arguments:
+            quals {Sequence[str]} -- phred strings
+
+        Returns:
+            QualityBatch -- quality scores of all strings, with their offsets
+        """
+        offsets = np.zeros(len(quals) + 1, dtype=np.int64)
+        np.cumsum(
+            np.fromiter(map(len, quals), dtype=np.int64, count=len(quals)),
+            out=offsets[1:],
+        )
+        return QualityBatch(
+            self.__bytes_to_qscore("".join(quals).encode("ascii")), offsets
+        )
+
 
 class QualityFilter(QualityIO):
     """docstring for QualityFilter"""
@@ -96,10 +162,47 @@ class QualityFilter(QualityIO):
         Returns:
             bool -- whether the quality string passes the filter
         """
-        qscore = np.array(self.phred_to_qscore(qual))
+        qscore = self.phred_to_qscore_array(qual)
         low_quality_fraction = (qscore < min_qscore).sum() / len(qual)
         return low_quality_fraction <= max_perc
 
+    def qual_pass_filter_batch(self, quals: Sequence[str]) -> np.ndarray:
+        """
+        Arguments:
+            quals {Sequence[str]} -- phred strings
+
+        Returns:
+            np.ndarray -- whether each quality string passes the filter
+        """
+        has_passed = self.__qual_pass_filter_batch(
+            quals, self.__min_qscore, self.__max_perc
+        )
+        self._passed += int(has_passed.sum())
+        self._parsed += len(quals)
+        return has_passed
+
+    def __qual_pass_filter_batch(
+        self, quals: Sequence[str], min_qscore: int, max_perc: float
+    ) -> np.ndarray:
+        """Counts low quality bases of all strings with a single cumulative sum.
+
+        Arguments:
+            quals {Sequence[str]} -- phred strings
+            min_qscore {int} -- qscore threshold (lower qscores considered low quality)
+            max_perc {float} -- max fraction (inclusive) of low quality bases
+                                to pass the filter
+
+        Returns:
+            np.ndarray -- whether each quality string passes the filter
+        """
+        qbatch = self.phred_to_qscore_batch(quals)
+        low_quality_cumsum = np.zeros(len(qbatch.qscores) + 1, dtype=np.int64)
+        np.cumsum(qbatch.qscores < min_qscore, out=low_quality_cumsum[1:])
+        low_quality_counts = np.diff(low_quality_cumsum[qbatch.offsets])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            low_quality_fraction = low_quality_counts / qbatch.lengths
+        return low_quality_fraction <= max_perc
+
     @staticmethod
     def init_flag_filters(
         filters: List[str], phred_offset: int
@@ -141,6 +244,48 @@ def apply_filter_flag(
     return True
 
 
+def dummy_apply_filter_flag_batch(
+    flag_data: Sequence[Dict[str, FlagData]], filters: Dict[str, QualityFilter]
+) -> np.ndarray:
+    return np.ones(len(flag_data), dtype=bool)
+
+
+def apply_filter_flag_batch(
+    flag_data: Sequence[Dict[str, FlagData]], filters: Dict[str, QualityFilter]
+) -> np.ndarray:
+    """Applies the filters to the flags of a batch of records, one flag at a time.
+
+    As in apply_filter_flag, the flags of a record are filtered in order, and
+    those after the first failing one are not filtered (nor counted).
+
+    Arguments:
+        flag_data {Sequence[Dict[str, FlagData]]} -- flag data of each record
+        filters: {Dict[str, QualityFilter]} -- dict with flag name as key
+                                               and filter as value
+
+    Returns:
+        np.ndarray -- whether the flags of each record pass the filters
+    """
+    flag_orders: DefaultDict[Tuple[str, ...], List[int]] = defaultdict(list)
+    for i, flags in enumerate(flag_data):
+        flag_order = tuple(
+            flag
+            for flag in flags.keys()
+            if flag.startswith(QFLAG_START) and flag in filters.keys()
+        )
+        flag_orders[flag_order].append(i)
+
+    has_passed = np.ones(len(flag_data), dtype=bool)
+    for flag_order, record_ids in flag_orders.items():
+        record_ids_array = np.array(record_ids, dtype=np.int64)
+        still_passing = np.ones(len(record_ids_array), dtype=bool)
+        for flag in flag_order:
+            quals = [flag_data[i][flag][0] for i in record_ids_array[still_passing]]
+            still_passing[still_passing] = filters[flag].qual_pass_filter_batch(quals)
+        has_passed[record_ids_array] = still_passing
+    return has_passed
+
+
 def log_qual_filters(
     phred_offset: int, quality_flag_filters: Dict[str, QualityFilter]
 ) -> None:
@@ -151,15 +296,34 @@ def log_qual_filters(
 
 
 def setup_qual_filters(
-    filter_qual_flags: List[str], phred_offset: int, verbose: bool = False
+    filter_qual_flags: List[str],
+    phred_offset: int,
+    verbose: bool = False,
+    batch: bool = False,
 ) -> Tuple[Dict[str, QualityFilter], Callable]:
+    """
+    Arguments:
+        filter_qual_flags {List[str]} -- filters, as "flag,min_qscore,max_perc"
+        phred_offset {int} -- phred offset
+
+    Keyword Arguments:
+        verbose {bool} -- whether to log the filters (default: {False})
+        batch {bool} -- whether to return a function that filters the flags of a
+                        batch of records at once, into a boolean mask
+                        (default: {False})
+
+    Returns:
+        Tuple[Dict[str, QualityFilter], Callable] -- filters and filter function
+    """
     quality_flag_filters: Dict[str, QualityFilter] = {}
-    filter_fun = dummy_apply_filter_flag
+    filter_fun: Callable = (
+        dummy_apply_filter_flag_batch if batch else dummy_apply_filter_flag
+    )
     if filter_qual_flags is not None:
         quality_flag_filters = QualityFilter.init_flag_filters(
             filter_qual_flags, phred_offset
         )
         if verbose:
             log_qual_filters(phred_offset, quality_flag_filters)
-        filter_fun = apply_filter_flag
+        filter_fun = apply_filter_flag_batch if batch else apply_filter_flag
     return (quality_flag_filters, filter_fun)
@@ -4,22 +4,50 @@
 """
 
 import argparse
-from fastx_barber.const import FastxFormats
+from collections import Counter
+from concurrent.futures import (
+    ALL_COMPLETED,
+    Executor,
+    Future,
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    wait,
+)
+from fastx_barber.const import (
+    ChunkTransports,
+    ExecutionBackends,
+    FastxFormats,
+    FastxParsers,
+    OutputModes,
+)
+from fastx_barber.io import OrderedChunkWriter
 from fastx_barber.seqio import (
+    get_fastx_format,
     get_fastx_parser,
     get_fastx_writer,
     get_split_fastx_writer,
+    is_output_captured,
+    is_output_direct,
+    start_direct_output,
+    start_output_capture,
+    stop_direct_output,
+    stop_output_capture,
     FastxChunkedParser,
-    SimpleFastxParser,
+    FastxRangeChunker,
+    FastxSharedMemoryChunker,
     SimpleFastxWriter,
     SimpleSplitFastxWriter,
 )
+from joblib.externals.loky import get_reusable_executor  # type: ignore
 import logging
 import os
 from rich.console import Console  # type: ignore
 from rich.logging import RichHandler  # type: ignore
 import tempfile
-from typing import Callable, Dict, Optional, Tuple, Union
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+_worker = threading.local()
 
 
 def set_tempdir(args: argparse.Namespace) -> argparse.Namespace:
@@ -51,11 +79,27 @@ def add_log_file_handler(path: str, logger_name: str = "") -> None:
 
 
 def get_input_handler(
-    path: str, chunk_size: int
-) -> Tuple[FastxFormats, SimpleFastxParser]:
-    IH, fmt = get_fastx_parser(path)
-    IH = FastxChunkedParser(IH, chunk_size)
-    return (fmt, IH)
+    path: str,
+    chunk_size: int,
+    parser: str = FastxParsers.BIOPYTHON.value,
+    inflate_threads: int = 1,
+    transport: str = ChunkTransports.PICKLE.value,
+) -> Tuple[
+    FastxFormats,
+    Union[FastxChunkedParser, FastxRangeChunker, FastxSharedMemoryChunker],
+]:
+    if ChunkTransports.SHM == ChunkTransports(transport):
+        fmt, _ = get_fastx_format(path)
+        return (fmt, FastxSharedMemoryChunker(path, chunk_size, inflate_threads))
+    if ChunkTransports.RANGES == ChunkTransports(transport):
+        fmt, gzipped = get_fastx_format(path)
+        if not gzipped:
+            return (fmt, FastxRangeChunker(path, fmt, chunk_size))
+        logging.warning(
+            "Byte-range transport requires uncompressed input, pickling chunks."
+        )
+    IH, fmt = get_fastx_parser(path, FastxParsers(parser), inflate_threads)
+    return (fmt, FastxChunkedParser(IH, chunk_size))
 
 
 def get_chunk_tmp_path(
@@ -63,24 +107,49 @@ def get_chunk_tmp_path(
     path: str,
     tempdir: Optional[tempfile.TemporaryDirectory] = None,
 ) -> str:
+    if is_output_captured() or is_output_direct():
+        return path
     chunk_path = f".tmp.chunk{cid}.{os.path.basename(path)}"
     if tempdir is not None:
         chunk_path = os.path.join(tempdir.name, os.path.basename(chunk_path))
     return chunk_path
 
 
+def get_pattern_output_paths(path: str, n_patterns: int) -> List[str]:
+    """Retrieves the output path of each pattern, when matching multiple patterns.
+
+    With a single pattern, the output path is used as is. Otherwise, the output
+    of pattern N is written next to the output path, prefixed with "patternN.".
+
+    Arguments:
+        path {str} -- output path
+        n_patterns {int} -- number of patterns
+
+    Returns:
+        List[str] -- output path of each pattern
+    """
+    if 1 == n_patterns:
+        return [path]
+    return [
+        os.path.join(os.path.dirname(path), f"pattern{i}.{os.path.basename(path)}")
+        for i in range(1, n_patterns + 1)
+    ]
+
+
 def get_chunk_handler(
     cid: int,
     fmt: FastxFormats,
     path: Optional[str],
     compress_level: int,
     tempdir: Optional[tempfile.TemporaryDirectory] = None,
+    bgzf: bool = False,
+    compress_threads: int = 1,
 ) -> Optional[SimpleFastxWriter]:
     if path is None:
         return None
     chunk_path = get_chunk_tmp_path(cid, path, tempdir)
     assert not os.path.isdir(path)
-    return get_fastx_writer(fmt)(chunk_path, compress_level)
+    return get_fastx_writer(fmt)(chunk_path, compress_level, bgzf, compress_threads)
 
 
 def get_split_chunk_handler(
@@ -90,12 +159,16 @@ def get_split_chunk_handler(
     compress_level: int,
     split_by: str,
     tempdir: Optional[tempfile.TemporaryDirectory] = None,
+    bgzf: bool = False,
+    compress_threads: int = 1,
 ) -> Optional[SimpleSplitFastxWriter]:
     if path is None:
         return None
     chunk_path = get_chunk_tmp_path(cid, path, tempdir)
     assert not os.path.isdir(path)
-    return get_split_fastx_writer(fmt)(chunk_path, split_by, compress_level)
+    return get_split_fastx_writer(fmt)(
+        chunk_path, split_by, compress_level, bgzf, compress_threads
+    )
 
 
 def get_output_fun(
@@ -121,8 +194,12 @@ def get_qual_filter_handler(
     path: Optional[str],
     compress_level: int,
     tempdir: Optional[tempfile.TemporaryDirectory] = None,
+    bgzf: bool = False,
+    compress_threads: int = 1,
 ) -> Tuple[Optional[SimpleFastxWriter], Callable]:
-    FH = get_chunk_handler(cid, fmt, path, compress_level, tempdir)
+    FH = get_chunk_handler(
+        cid, fmt, path, compress_level, tempdir, bgzf, compress_threads
+    )
     if FH is not None:
         assert fmt == FH.format, "format mismatch between input and requested output"
         return (FH, FH.write)
@@ -137,8 +214,12 @@ def get_split_qual_filter_handler(
     compress_level: int,
     split_by: str,
     tempdir: Optional[tempfile.TemporaryDirectory] = None,
+    bgzf: bool = False,
+    compress_threads: int = 1,
 ) -> Tuple[Optional[SimpleSplitFastxWriter], Callable]:
-    FH = get_split_chunk_handler(cid, fmt, path, compress_level, split_by, tempdir)
+    FH = get_split_chunk_handler(
+        cid, fmt, path, compress_level, split_by, tempdir, bgzf, compress_threads
+    )
     if FH is not None:
         assert fmt == FH.format, "format mismatch between input and requested output"
         return (FH, FH.write)
@@ -147,17 +228,34 @@ def get_split_qual_filter_handler(
 
 
 def get_handles(
-    fmt: FastxFormats, cid: int, args: argparse.Namespace
+    fmt: FastxFormats,
+    cid: int,
+    args: argparse.Namespace,
+    output: Optional[str] = None,
 ) -> Tuple[
     Optional[SimpleFastxWriter],
     Optional[SimpleFastxWriter],
     Optional[SimpleFastxWriter],
     Callable,
 ]:
-    OHC = get_chunk_handler(cid, fmt, args.output, args.compress_level, args.temp_dir)
+    OHC = get_chunk_handler(
+        cid,
+        fmt,
+        args.output if output is None else output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
+    )
     assert OHC is not None
     UHC = get_chunk_handler(
-        cid, fmt, args.unmatched_output, args.compress_level, args.temp_dir
+        cid,
+        fmt,
+        args.unmatched_output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     FHC, filter_output_fun = get_qual_filter_handler(
         cid,
@@ -165,12 +263,17 @@ def get_handles(
         args.filter_qual_output,
         args.compress_level,
         args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     return (OHC, UHC, FHC, filter_output_fun)
 
 
 def get_split_handles(
-    fmt: FastxFormats, cid: int, args: argparse.Namespace
+    fmt: FastxFormats,
+    cid: int,
+    args: argparse.Namespace,
+    output: Optional[str] = None,
 ) -> Tuple[
     Optional[SimpleSplitFastxWriter],
     Optional[SimpleFastxWriter],
@@ -178,11 +281,24 @@ def get_split_handles(
     Callable,
 ]:
     OHC = get_split_chunk_handler(
-        cid, fmt, args.output, args.compress_level, args.split_by, args.temp_dir
+        cid,
+        fmt,
+        args.output if output is None else output,
+        args.compress_level,
+        args.split_by,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     assert OHC is not None
     UHC = get_chunk_handler(
-        cid, fmt, args.unmatched_output, args.compress_level, args.temp_dir
+        cid,
+        fmt,
+        args.unmatched_output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     FHC, filter_output_fun = get_split_qual_filter_handler(
         cid,
@@ -191,5 +307,305 @@ def get_split_handles(
         args.compress_level,
         args.split_by,
         args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     return (OHC, UHC, FHC, filter_output_fun)
+
+
+def get_pattern_handles(
+    fmt: FastxFormats, cid: int, args: argparse.Namespace, paths: List[str]
+) -> List[Union[SimpleFastxWriter, SimpleSplitFastxWriter]]:
+    """Retrieves the chunk output handles of multiple patterns, one per path.
+
+    Split by args.split_by, if any.
+
+    Arguments:
+        fmt {FastxFormats} -- output format
+        cid {int} -- chunk id
+        args {argparse.Namespace} -- script arguments
+        paths {List[str]} -- output paths (see get_pattern_output_paths)
+
+    Returns:
+        List[Union[SimpleFastxWriter, SimpleSplitFastxWriter]] -- output handles
+    """
+    handles: List[Union[SimpleFastxWriter, SimpleSplitFastxWriter]] = []
+    for path in paths:
+        OHC: Union[SimpleFastxWriter, SimpleSplitFastxWriter, None]
+        if getattr(args, "split_by", None) is None:
+            OHC = get_chunk_handler(
+                cid,
+                fmt,
+                path,
+                args.compress_level,
+                args.temp_dir,
+                bgzf=args.bgzf,
+                compress_threads=args.compress_threads,
+            )
+        else:
+            OHC = get_split_chunk_handler(
+                cid,
+                fmt,
+                path,
+                args.compress_level,
+                args.split_by,
+                args.temp_dir,
+                bgzf=args.bgzf,
+                compress_threads=args.compress_threads,
+            )
+        assert OHC is not None
+        handles.append(OHC)
+    return handles
+
+
+def get_output_mode(args: argparse.Namespace) -> OutputModes:
+    """Retrieves the output mode, which is always direct with a single thread."""
+    if 1 == args.threads:
+        return OutputModes.DIRECT
+    return OutputModes(getattr(args, "output_mode", OutputModes.MERGE.value))
+
+
+def get_backend(args: argparse.Namespace) -> ExecutionBackends:
+    """Retrieves the execution backend (default: worker processes)."""
+    return ExecutionBackends(
+        getattr(args, "backend", ExecutionBackends.PROCESSES.value)
+    )
+
+
+def get_executor(args: argparse.Namespace, setup_context: Callable) -> Executor:
+    """Retrieves an executor with args.threads workers, of the selected backend.
+
+    Worker threads share the memory of the main process, so chunks, patterns and
+    output writers are not copied, but each of them builds its own context (e.g.,
+    matcher, with its counts), stored thread-locally.
+
+    Arguments:
+        args {argparse.Namespace} -- script arguments
+        setup_context {Callable} -- builds a worker's context from args
+
+    Returns:
+        Executor -- executor, to be shut down by the caller if of threads
+    """
+    if ExecutionBackends.THREADS == get_backend(args):
+        return ThreadPoolExecutor(
+            max_workers=args.threads,
+            thread_name_prefix="fbarber-worker",
+            initializer=init_worker,
+            initargs=(args, setup_context),
+        )
+    return get_reusable_executor(
+        max_workers=args.threads,
+        initializer=init_worker,
+        initargs=(args, setup_context),
+    )
+
+
+def init_worker(args: argparse.Namespace, setup_context: Callable) -> None:
+    """Stores the arguments and processing context of a worker.
+
+    Called once per worker, so that the context is built only once and reused for
+    all the chunks the worker processes. The context is thread-local, so that
+    worker threads do not share stateful objects, e.g., matchers.
+
+    Arguments:
+        args {argparse.Namespace} -- script arguments
+        setup_context {Callable} -- builds the processing context from args
+    """
+    _worker.args = args
+    _worker.context = setup_context(args)
+
+
+def run_chunk_task(
+    run_chunk: Callable,
+    payload: Any,
+    cid: int,
+    stream: bool = False,
+) -> Tuple[Any, Dict[str, bytes]]:
+    """Runs a chunk in a worker, capturing its outputs in memory if streaming.
+
+    Arguments:
+        run_chunk {Callable} -- chunk function,
+                                called with (payload, cid, args, context)
+        payload {Any} -- chunk payload
+        cid {int} -- chunk id
+
+    Keyword Arguments:
+        stream {bool} -- capture outputs instead of writing chunk files
+                         (default: {False})
+
+    Returns:
+        Tuple[Any, Dict[str, bytes]] -- chunk result and captured outputs
+    """
+    if not stream:
+        return (run_chunk(payload, cid, _worker.args, _worker.context), {})
+    start_output_capture()
+    try:
+        result = run_chunk(payload, cid, _worker.args, _worker.context)
+    finally:
+        outputs = stop_output_capture()
+    return (result, outputs)
+
+
+def get_max_in_flight(args: argparse.Namespace) -> int:
+    """Retrieves the maximum number of chunks in flight (default: twice the threads)."""
+    max_in_flight = getattr(args, "max_in_flight", None)
+    if max_in_flight is None:
+        return 2 * args.threads
+    assert 0 < max_in_flight, "at least one chunk must be in flight."
+    return max_in_flight
+
+
+def sum_chunk_details(total: Tuple, details: Tuple) -> Tuple:
+    """Folds chunk details into running totals, by element-wise sum."""
+    return tuple(t + d for t, d in zip(total, details))
+
+
+def log_match_stats(stats: Counter) -> None:
+    """Logs the number of records per matching path, for two-stage matchers, that
+    of records that timed out, and cache hits and misses.
+
+    Arguments:
+        stats {Counter} -- folded matcher stats (see FastxMatcher.stats)
+    """
+    if 0 != stats["exact"] + stats["fuzzy"]:
+        logging.info(
+            f"{stats['exact']} records matched the exact version of the pattern, "
+            + f"{stats['fuzzy']} were passed to the fuzzy pattern."
+        )
+    if 0 != stats["timeout"]:
+        logging.warning(
+            f"{stats['timeout']} records exceeded the match timeout, "
+            + "and were considered unmatched."
+        )
+    if 0 != stats["cache_hit"] + stats["cache_miss"]:
+        n_lookups = stats["cache_hit"] + stats["cache_miss"]
+        logging.info(
+            f"{stats['cache_hit']}/{n_lookups} "
+            + f"({stats['cache_hit']/n_lookups*100:.2f}%) records matched from the "
+            + f"match cache, {stats['cache_miss']} were passed to the regex engine."
+        )
+
+
+def log_pattern_stats(
+    pattern_stats: Counter, patterns: List[Any], n_parsed: int
+) -> None:
+    """Logs the number of records matched by each pattern, with multiple patterns.
+
+    Arguments:
+        pattern_stats {Counter} -- folded number of matched and timed out records,
+                                   by pattern id (see FastxMultiMatcher)
+        patterns {List[Any]} -- patterns, with their source as "pattern" attribute
+        n_parsed {int} -- number of parsed records
+    """
+    if 1 == len(patterns):
+        return
+    for pattern_id, pattern in enumerate(patterns):
+        n_matched = pattern_stats[(pattern_id, "matched")]
+        n_timeout = pattern_stats[(pattern_id, "timeout")]
+        logging.info(
+            f"Pattern {pattern_id + 1}: {n_matched}/{n_parsed} "
+            + f"({n_matched/n_parsed*100:.2f}%) records matched "
+            + f"'{pattern.pattern}'"
+            + ("." if 0 == n_timeout else f", {n_timeout} timed out.")
+        )
+
+
+def close_input(IH: Iterable[Tuple[Any, int]]) -> None:
+    """Releases the resources held by an input handler, e.g., shared memory."""
+    if isinstance(IH, FastxSharedMemoryChunker):
+        IH.close()
+
+
+def run_chunks(
+    run_chunk: Callable,
+    IH: Iterable[Tuple[Any, int]],
+    args: argparse.Namespace,
+    setup_context: Callable,
+    fold: Optional[Callable] = sum_chunk_details,
+    initial: Any = None,
+) -> Any:
+    """Runs a chunk function on every chunk, on args.threads workers.
+
+    Workers are processes, or threads with args.backend set to 'threads' (see
+    get_executor). Each worker receives the arguments and builds its processing
+    context once, when started, so that tasks carry only the chunk payload and
+    id. Chunk results are folded into running totals as soon as they are
+    available, in no particular order.
+
+    At most args.max_in_flight chunks are in flight, counting from the oldest one
+    still running. In stream output mode, chunk outputs are appended to the
+    output files in chunk id order as they come back from the workers. With a
+    single thread, chunks are run in this process and write directly to the
+    output files. The input handler is closed once done (see close_input).
+
+    Arguments:
+        run_chunk {Callable} -- chunk function,
+                                called with (payload, cid, args, context)
+        IH {Iterable[Tuple[Any, int]]} -- chunk payloads and ids
+        args {argparse.Namespace} -- script arguments
+        setup_context {Callable} -- builds a worker's context from args
+
+    Keyword Arguments:
+        fold {Optional[Callable]} -- called with (total, result) for every chunk,
+                                     returns the updated total; chunk results are
+                                     discarded if None (default: {sum_chunk_details})
+        initial {Any} -- initial total (default: {None})
+
+    Returns:
+        Any -- folded chunk results
+    """
+    output_mode = get_output_mode(args)
+    total = initial
+    n_chunks = 0
+
+    def collect(result: Any) -> None:
+        nonlocal total, n_chunks
+        n_chunks += 1
+        if fold is not None:
+            total = fold(total, result)
+
+    if OutputModes.DIRECT == output_mode:
+        init_worker(args, setup_context)
+        start_direct_output()
+        try:
+            for payload, cid in IH:
+                collect(run_chunk(payload, cid, args, _worker.context))
+        finally:
+            stop_direct_output()
+            close_input(IH)
+        logging.info(f"Processed {n_chunks} chunks.")
+        return total
+
+    writer = OrderedChunkWriter() if OutputModes.STREAM == output_mode else None
+    max_in_flight = get_max_in_flight(args)
+    executor: Optional[Executor] = None
+    try:
+        executor = get_executor(args, setup_context)
+        running: Dict[Future, int] = {}
+
+        def collect_done(return_when: str) -> None:
+            done, _ = wait(running, return_when=return_when)
+            for future in done:
+                cid = running.pop(future)
+                result, outputs = future.result()
+                collect(result)
+                if writer is not None:
+                    writer.put(cid, outputs)
+
+        for payload, cid in IH:
+            while 0 != len(running) and (max_in_flight <= cid - min(running.values())):
+                collect_done(FIRST_COMPLETED)
+            running[
+                executor.submit(
+                    run_chunk_task, run_chunk, payload, cid, writer is not None
+                )
+            ] = cid
+        collect_done(ALL_COMPLETED)
+    finally:
+        if isinstance(executor, ThreadPoolExecutor):
+            executor.shutdown(wait=True)
+        if writer is not None:
+            writer.close()
+        close_input(IH)
+    logging.info(f"Processed {n_chunks} chunks.")
+    return total
@@ -8,7 +8,7 @@ from fastx_barber.scripts import find_seq
 from fastx_barber.scripts import flag, flag_extract
 from fastx_barber.scripts import flag_filter, flag_regex, flag_split, flag_stats
 from fastx_barber.scripts import match
-from fastx_barber.scripts import trim, trim_len, trim_qual, trim_regex
+from fastx_barber.scripts import trim, trim_len, trim_qual, trim_regex, trim_window
 
 __all__ = [
     "arguments",
@@ -24,4 +24,5 @@ __all__ = [
     "trim_len",
     "trim_qual",
     "trim_regex",
+    "trim_window",
 ]
@@ -5,17 +5,32 @@
 
 import argparse
 from fastx_barber import __version__
-from fastx_barber.const import DEFAULT_PHRED_OFFSET
+from fastx_barber.const import (
+    ChunkTransports,
+    DEFAULT_PHRED_OFFSET,
+    ExecutionBackends,
+    FastxParsers,
+    OutputModes,
+    PATTERN_EXAMPLE,
+)
 import joblib  # type: ignore
 import logging
 import sys
 import tempfile
+from typing import Optional
 
 
 def log_args(args: argparse.Namespace) -> None:
     logging.info("[bold underline red]General[/]")
     logging.info(f"Input\t\t{args.input}")
-    logging.info(f"Pattern\t\t{args.pattern.pattern}")
+    for pattern in args.pattern if isinstance(args.pattern, list) else [args.pattern]:
+        logging.info(f"Pattern\t\t{pattern.pattern}")
+    if args.match_window is not None:
+        logging.info(f"Match window\t{args.match_window}")
+    if args.match_timeout is not None:
+        logging.info(f"Match timeout\t{args.match_timeout} s")
+    if 0 != args.match_cache:
+        logging.info(f"Match cache\t{args.match_cache} prefixes")
     logging.info(f"Threads\t\t{args.threads}")
     logging.info(f"Chunk size\t{args.chunk_size}")
 
@@ -39,6 +54,82 @@ def add_unmatched_output_option(
     return arg_group
 
 
+def add_patterns_option(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    parser.add_argument(
+        "--pattern",
+        type=str,
+        action="append",
+        help="Pattern to match to reads. Remember to use quotes. "
+        + f"Example: '{PATTERN_EXAMPLE}'. Repeat to match multiple patterns: each "
+        + "read is assigned to the first pattern it matches, and written to the "
+        + "output of that pattern, i.e., the output path prefixed by 'patternN.'.",
+    )
+    return parser
+
+
+def add_match_window_option(
+    arg_group: argparse._ArgumentGroup,
+) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--match-window",
+        type=int,
+        help="""Match the pattern only against the first bases of each record.
+        By default, as many as the pattern can span (fuzzy insertions included),
+        or the whole record for patterns that can't be bounded, e.g., with
+        unbounded repeats, '$', or lookarounds. Use 0 for whole records.""",
+    )
+    return arg_group
+
+
+def check_match_window(match_window: Optional[int]) -> Optional[int]:
+    assert (
+        match_window is None or 0 <= match_window
+    ), "match window (--match-window) cannot be negative."
+    return match_window
+
+
+def add_match_timeout_option(
+    arg_group: argparse._ArgumentGroup,
+) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--match-timeout",
+        type=float,
+        help="""Maximum time, in seconds, spent matching the pattern against a
+        single record. Records exceeding it are considered unmatched, i.e., go to
+        the unmatched output, if any. Useful to guard against patterns with
+        catastrophic backtracking. Default: no timeout.""",
+    )
+    return arg_group
+
+
+def check_match_timeout(match_timeout: Optional[float]) -> Optional[float]:
+    assert (
+        match_timeout is None or 0 < match_timeout
+    ), "match timeout (--match-timeout) must be positive."
+    return match_timeout
+
+
+def add_match_cache_option(
+    arg_group: argparse._ArgumentGroup,
+) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--match-cache",
+        type=int,
+        default=0,
+        help="""Number of read prefixes (as many bases as the match window) whose
+        match results are cached, least recently used first to be dropped. Reads
+        with a cached prefix skip the regex engine, which pays off with libraries
+        of low prefix diversity. Only used when the match window is bounded.
+        Default: 0 (no cache)""",
+    )
+    return arg_group
+
+
+def check_match_cache(match_cache: int) -> int:
+    assert 0 <= match_cache, "match cache size (--match-cache) cannot be negative."
+    return match_cache
+
+
 def add_compress_level_option(
     arg_group: argparse._ArgumentGroup,
 ) -> argparse._ArgumentGroup:
@@ -51,6 +142,30 @@ def add_compress_level_option(
     return arg_group
 
 
+def add_bgzf_option(arg_group: argparse._ArgumentGroup) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--bgzf",
+        action="store_const",
+        const=True,
+        default=False,
+        help="""Write gzipped output as BGZF, which allows random access and
+        parallel decompression downstream.""",
+    )
+    return arg_group
+
+
+def add_compress_threads_option(
+    arg_group: argparse._ArgumentGroup,
+) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--compress-threads",
+        type=int,
+        default=1,
+        help="""Threads for compressing BGZF blocks, per process. Default: 1""",
+    )
+    return arg_group
+
+
 def add_log_file_option(arg_group: argparse._ArgumentGroup) -> argparse._ArgumentGroup:
     arg_group.add_argument(
         "--log-file", type=str, help="""Path to file where to write the log."""
@@ -70,6 +185,69 @@ def add_chunk_size_option(
     return arg_group
 
 
+def add_parser_option(arg_group: argparse._ArgumentGroup) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--parser",
+        type=str,
+        default=FastxParsers.BIOPYTHON.value,
+        choices=[p.value for p in FastxParsers],
+        help="""Input parsing engine. 'mmap' memory-maps uncompressed input and
+        splits records with bytes-level scanning, which is faster on large files.
+        Gzipped input is streamed through the same scanner. Default: 'biopython'""",
+    )
+    return arg_group
+
+
+def add_inflate_threads_option(
+    arg_group: argparse._ArgumentGroup,
+) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--inflate-threads",
+        type=int,
+        default=1,
+        help="""Threads for decompressing multi-member gzipped input (e.g., BGZF).
+        Single-member gzip files are always inflated by one thread. Default: 1""",
+    )
+    return arg_group
+
+
+def add_transport_option(
+    arg_group: argparse._ArgumentGroup,
+) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--transport",
+        type=str,
+        default=ChunkTransports.PICKLE.value,
+        choices=[t.value for t in ChunkTransports],
+        help="""How chunks are handed to the workers. 'pickle' parses records in
+        the main process and pickles them to the workers. 'ranges' sends
+        record-aligned byte ranges of uncompressed input, parsed by the workers
+        themselves, in chunks of approximately --chunk-size records. 'shm' copies
+        raw records of (inflated) input into shared memory segments, parsed by
+        the workers and reused once released. Default: 'pickle'""",
+    )
+    return arg_group
+
+
+def add_output_mode_option(
+    arg_group: argparse._ArgumentGroup,
+) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--output-mode",
+        type=str,
+        default=OutputModes.MERGE.value,
+        choices=[OutputModes.MERGE.value, OutputModes.STREAM.value],
+        help="""How chunk outputs are assembled. 'merge' writes temporary chunk
+        files, merged into the output files once all chunks are processed.
+        'stream' has workers return compressed chunk data, which is appended to
+        the output files in chunk order as soon as it is available, without using
+        temporary space. Ignored with --threads 1, where chunks are processed in
+        the main process and written straight to the output files.
+        Default: 'merge'""",
+    )
+    return arg_group
+
+
 def add_threads_option(arg_group: argparse._ArgumentGroup) -> argparse._ArgumentGroup:
     arg_group.add_argument(
         "--threads",
@@ -80,6 +258,35 @@ def add_threads_option(arg_group: argparse._ArgumentGroup) -> argparse._Argument
     return arg_group
 
 
+def add_backend_option(arg_group: argparse._ArgumentGroup) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--backend",
+        type=str,
+        default=ExecutionBackends.PROCESSES.value,
+        choices=[b.value for b in ExecutionBackends],
+        help="""How chunks are processed in parallel. 'processes' runs --threads
+        worker processes, to which chunks are sent and from which results are
+        received (pickled). 'threads' runs --threads worker threads in the main
+        process, sharing chunks, compiled patterns and output writers, and pays
+        off when the work releases the GIL (regular expression matching and
+        compression), or with free-threaded Python builds. Default: 'processes'""",
+    )
+    return arg_group
+
+
+def add_max_in_flight_option(
+    arg_group: argparse._ArgumentGroup,
+) -> argparse._ArgumentGroup:
+    arg_group.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="""Maximum number of chunks being processed, or waiting for previous
+        chunks to be written, at any time. Bounds the memory used by chunks in
+        the main process. Default: twice --threads""",
+    )
+    return arg_group
+
+
 def add_tempdir_option(arg_group: argparse._ArgumentGroup) -> argparse._ArgumentGroup:
     arg_group.add_argument(
         "--temp-dir",
@@ -4,32 +4,48 @@
 """
 
 import argparse
+from collections import Counter
 from fastx_barber import scriptio
-from fastx_barber.const import PATTERN_EXAMPLE, FlagData
+from fastx_barber.const import (
+    ExecutionBackends,
+    FastxFormats,
+    OutputModes,
+    PATTERN_EXAMPLE,
+    FlagData,
+)
 from fastx_barber.exception import enable_rich_assert
 from fastx_barber.flag import (
+    ABCFlagExtractor,
+    FastaFlagExtractor,
     FastqFlagExtractor,
     FlagStats,
     get_fastx_flag_extractor,
 )
 from fastx_barber.io import ChunkMerger
-from fastx_barber.match import AlphaNumericPattern, FastxMatcher
-from fastx_barber.qual import setup_qual_filters
+from fastx_barber.match import (
+    get_fastx_matcher,
+    AlphaNumericPattern,
+    FastxMatcher,
+    FastxMultiMatcher,
+)
+from fastx_barber.qual import setup_qual_filters, QualityFilter
 from fastx_barber.scriptio import get_handles, get_split_handles
 from fastx_barber.scripts import arguments as ap
 from fastx_barber.seqio import (
     get_fastx_format,
+    load_chunk,
+    release_chunk,
+    FastxChunk,
     SimpleFastxRecord,
     SimpleFastxWriter,
     SimpleSplitFastxWriter,
 )
-from fastx_barber.trim import get_fastx_trimmer
-import joblib  # type: ignore
+from fastx_barber.trim import get_fastx_trimmer, ABCTrimmer
 import logging
 import regex as re  # type: ignore
 from rich.logging import RichHandler  # type: ignore
 import sys
-from typing import Dict, List, Tuple, Union
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Type, Union
 
 logging.basicConfig(
     level=logging.INFO,
@@ -63,14 +79,21 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
     parser.add_argument(
         "--pattern",
         type=str,
+        action="append",
         help="Pattern to match to reads and extract flagged groups. "
-        + f"Remember to use quotes. Example: '{PATTERN_EXAMPLE}'",
+        + f"Remember to use quotes. Example: '{PATTERN_EXAMPLE}'. Repeat to match "
+        + "multiple patterns: each read is assigned to the first pattern it "
+        + "matches, and written to the output of that pattern, i.e., the output "
+        + "path prefixed by 'patternN.'.",
     )
 
     parser = ap.add_version_option(parser)
 
     advanced = parser.add_argument_group("advanced arguments")
     advanced = ap.add_unmatched_output_option(advanced)
+    advanced = ap.add_match_window_option(advanced)
+    advanced = ap.add_match_timeout_option(advanced)
+    advanced = ap.add_match_cache_option(advanced)
     advanced = ap.add_flag_delim_option(advanced)
     advanced.add_argument(
         "--selected-flags",
@@ -102,10 +125,18 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
     )
     advanced = ap.add_comment_space_option(advanced)
     advanced = ap.add_compress_level_option(advanced)
+    advanced = ap.add_bgzf_option(advanced)
+    advanced = ap.add_compress_threads_option(advanced)
     advanced = ap.add_log_file_option(advanced)
 
     advanced = ap.add_chunk_size_option(advanced)
+    advanced = ap.add_parser_option(advanced)
+    advanced = ap.add_inflate_threads_option(advanced)
+    advanced = ap.add_transport_option(advanced)
+    advanced = ap.add_output_mode_option(advanced)
     advanced = ap.add_threads_option(advanced)
+    advanced = ap.add_backend_option(advanced)
+    advanced = ap.add_max_in_flight_option(advanced)
     advanced = ap.add_tempdir_option(advanced)
 
     parser.set_defaults(parse=parse_arguments, run=run)
@@ -117,6 +148,11 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     assert 1 == len(args.flag_delim)
     args.threads = ap.check_threads(args.threads)
+    args.inflate_threads = ap.check_threads(args.inflate_threads)
+    args.compress_threads = ap.check_threads(args.compress_threads)
+    args.match_window = ap.check_match_window(args.match_window)
+    args.match_timeout = ap.check_match_timeout(args.match_timeout)
+    args.match_cache = ap.check_match_cache(args.match_cache)
     args = scriptio.set_tempdir(args)
 
     if args.pattern is None:
@@ -125,10 +161,12 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
         )
         sys.exit()
 
-    args.pattern = (
-        AlphaNumericPattern(args.pattern)
-        if args.simple_pattern
-        else re.compile(args.pattern)
+    args.pattern = [
+        AlphaNumericPattern(pattern) if args.simple_pattern else re.compile(pattern)
+        for pattern in args.pattern
+    ]
+    args.pattern_output = scriptio.get_pattern_output_paths(
+        args.output, len(args.pattern)
     )
 
     if args.log_file is not None:
@@ -148,83 +186,201 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     return args
 
 
-ChunkDetails = Tuple[int, int, int, FlagStats]
+ChunkDetails = Tuple[int, int, int, FlagStats, Counter, Counter]
 
 
-def run_chunk(
-    chunk: List[SimpleFastxRecord],
-    cid: int,
-    args: argparse.Namespace,
-) -> ChunkDetails:
-    fmt, _ = get_fastx_format(args.input)
-    OHC: Union[SimpleFastxWriter, SimpleSplitFastxWriter, None]
-    FHC: Union[SimpleFastxWriter, SimpleSplitFastxWriter, None]
-    OHC, UHC, FHC, filter_output_fun = (
-        get_handles(fmt, cid, args)
-        if args.split_by is None
-        else get_split_handles(fmt, cid, args)
-    )
-    foutput = scriptio.get_output_fun(OHC, UHC)
+class ChunkContext(NamedTuple):
+    fmt: FastxFormats
+    matcher: Union[FastxMatcher, FastxMultiMatcher]
+    trimmer: Type[ABCTrimmer]
+    quality_flag_filters: Dict[str, QualityFilter]
+    filter_fun: Callable
+    flag_extractor: ABCFlagExtractor
+
 
-    matcher = FastxMatcher(args.pattern)
-    trimmer = get_fastx_trimmer(fmt)
+def setup_chunk_context(args: argparse.Namespace) -> ChunkContext:
+    fmt, _ = get_fastx_format(args.input)
     quality_flag_filters, filter_fun = setup_qual_filters(
-        args.filter_qual_flags, args.phred_offset
+        args.filter_qual_flags, args.phred_offset, batch=True
     )
-
     flag_extractor = get_fastx_flag_extractor(fmt)(args.selected_flags, args.flagstats)
     flag_extractor.flag_delim = args.flag_delim
     flag_extractor.comment_space = args.comment_space
     if isinstance(flag_extractor, FastqFlagExtractor):
         flag_extractor.extract_qual_flags = args.qual_flags
+    return ChunkContext(
+        fmt,
+        get_fastx_matcher(
+            args.pattern,
+            args.match_window,
+            args.match_timeout,
+            args.match_cache,
+            ExecutionBackends.THREADS == scriptio.get_backend(args),
+        ),
+        get_fastx_trimmer(fmt),
+        quality_flag_filters,
+        filter_fun,
+        flag_extractor,
+    )
+
 
-    filtered_counter = 0
+ExtractedChunk = Tuple[
+    List[SimpleFastxRecord], List[Dict[str, FlagData]], List[Optional[int]]
+]
+
+
+def extract_chunk(
+    chunk: List[SimpleFastxRecord], context: ChunkContext
+) -> ExtractedChunk:
+    """Matches records one by one, extracting flags and trimming matched records.
+
+    Records are matched to the first pattern they match, with multiple patterns."""
+    matcher = context.matcher
+    trimmer = context.trimmer
+    flag_extractor = context.flag_extractor
+
+    records: List[SimpleFastxRecord] = []
+    chunk_flags: List[Dict[str, FlagData]] = []
+    chunk_pattern_ids: List[Optional[int]] = []
     for record in chunk:
         flags: Dict[str, FlagData] = {}
-        match, matched = matcher.do(record)
-        if matched:
+        match, pattern_id = matcher.dispatch(record)
+        if pattern_id is not None:
             flags = flag_extractor.extract_all(record, match)
             flag_extractor.update_stats(flags)
             flags_selected = flag_extractor.apply_selection(flags)
             record = flag_extractor.update(record, flags_selected)
             record = trimmer.trim_re(record, match)
-            pass_filters = filter_fun(flags, quality_flag_filters)
-            if not pass_filters:
-                filtered_counter += 1
-                filter_output_fun(record, flags)
-                continue
-        foutput[matched](record, flags)
+        records.append(record)
+        chunk_flags.append(flags)
+        chunk_pattern_ids.append(pattern_id)
+    return (records, chunk_flags, chunk_pattern_ids)
+
+
+def extract_chunk_simple(
+    chunk: List[SimpleFastxRecord], context: ChunkContext
+) -> ExtractedChunk:
+    """Matches a whole chunk to a fixed-structure pattern, extracting flags
+    column-wise, and trimming matched records."""
+    matcher = context.matcher
+    assert isinstance(matcher, FastxMatcher)
+    batch_match = matcher.do_batch(chunk)
+    trimmer = context.trimmer
+    flag_extractor = context.flag_extractor
+    assert isinstance(flag_extractor, FastaFlagExtractor)
+
+    matched_flags = iter(flag_extractor.extract_all_batch(chunk, batch_match))
+    records: List[SimpleFastxRecord] = []
+    chunk_flags: List[Dict[str, FlagData]] = []
+    chunk_pattern_ids: List[Optional[int]] = [
+        0 if matched else None for matched in batch_match.matched.tolist()
+    ]
+    for record, pattern_id in zip(chunk, chunk_pattern_ids):
+        flags: Dict[str, FlagData] = {}
+        if pattern_id is not None:
+            flags = next(matched_flags)
+            flag_extractor.update_stats(flags)
+            flags_selected = flag_extractor.apply_selection(flags)
+            record = flag_extractor.update(record, flags_selected)
+            record = trimmer.trim_len(record, batch_match.length, 5)
+        records.append(record)
+        chunk_flags.append(flags)
+    return (records, chunk_flags, chunk_pattern_ids)
+
+
+def run_chunk(
+    payload: FastxChunk,
+    cid: int,
+    args: argparse.Namespace,
+    context: ChunkContext,
+) -> ChunkDetails:
+    chunk = load_chunk(payload)
+    OHC: Union[SimpleFastxWriter, SimpleSplitFastxWriter, None]
+    FHC: Union[SimpleFastxWriter, SimpleSplitFastxWriter, None]
+    OHC, UHC, FHC, filter_output_fun = (
+        get_handles(context.fmt, cid, args, args.pattern_output[0])
+        if args.split_by is None
+        else get_split_handles(context.fmt, cid, args, args.pattern_output[0])
+    )
+    foutput = scriptio.get_output_fun(OHC, UHC)
+    PHCs = scriptio.get_pattern_handles(context.fmt, cid, args, args.pattern_output[1:])
+    pattern_output: List[Callable] = [foutput[True]] + [PHC.write for PHC in PHCs]
+
+    matcher = context.matcher
+    matcher.reset()
+    quality_flag_filters = context.quality_flag_filters
+    filter_fun = context.filter_fun
+    flag_extractor = context.flag_extractor
+    flag_extractor.reset_stats()
+
+    records, chunk_flags, chunk_pattern_ids = (
+        extract_chunk_simple(chunk, context)
+        if matcher.can_batch
+        else extract_chunk(chunk, context)
+    )
+
+    pass_filters = filter_fun(chunk_flags, quality_flag_filters)
+    for record, flags, pattern_id, passed in zip(
+        records, chunk_flags, chunk_pattern_ids, pass_filters
+    ):
+        if not passed:
+            filter_output_fun(record, flags)
+        elif pattern_id is None:
+            foutput[False](record, flags)
+        else:
+            pattern_output[pattern_id](record, flags)
+    filtered_counter = len(chunk) - int(pass_filters.sum())
 
     SimpleFastxWriter.close_handle(OHC)
+    for PHC in PHCs:
+        PHC.close()
     SimpleFastxWriter.close_handle(UHC)
     SimpleFastxWriter.close_handle(FHC)
 
+    release_chunk(payload)
+
     return (
         filtered_counter,
         matcher.matched_count,
         len(chunk),
         flag_extractor.flagstats,
+        matcher.stats,
+        matcher.pattern_stats,
     )
 
 
-def merge_chunk_details(chunk_details: List[ChunkDetails]) -> ChunkDetails:
-    parsed_counter = 0
-    matched_counter = 0
-    filtered_counter = 0
-    flagstats: FlagStats = FlagStats()
-    for filtered, matched, parsed, stats in chunk_details:
-        filtered_counter += filtered
-        matched_counter += matched
-        parsed_counter += parsed
-        for flag_name, data in stats.items():
-            for k, v in data.items():
-                flagstats[flag_name][k] += v
-    return (parsed_counter, matched_counter, filtered_counter, flagstats)
+def fold_chunk_details(total: ChunkDetails, details: ChunkDetails) -> ChunkDetails:
+    (
+        filtered_counter,
+        matched_counter,
+        parsed_counter,
+        flagstats,
+        match_stats,
+        pattern_stats,
+    ) = total
+    filtered, matched, parsed, stats, path_stats, chunk_pattern_stats = details
+    for flag_name, data in stats.items():
+        for k, v in data.items():
+            flagstats[flag_name][k] += v
+    return (
+        filtered_counter + filtered,
+        matched_counter + matched,
+        parsed_counter + parsed,
+        flagstats,
+        match_stats + path_stats,
+        pattern_stats + chunk_pattern_stats,
+    )
 
 
 @enable_rich_assert
 def run(args: argparse.Namespace) -> None:
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
+    fmt, IH = scriptio.get_input_handler(
+        args.input,
+        args.chunk_size,
+        args.parser,
+        args.inflate_threads,
+        args.transport,
+    )
 
     quality_flag_filters, filter_fun = setup_qual_filters(
         args.filter_qual_flags, args.phred_offset, verbose=True
@@ -232,16 +388,28 @@ def run(args: argparse.Namespace) -> None:
 
     logging.info("[bold underline red]Running[/]")
     logging.info("Trimming and extracting flags...")
-    chunk_details = joblib.Parallel(n_jobs=args.threads, verbose=10)(
-        joblib.delayed(run_chunk)(chunk, cid, args) for chunk, cid in IH
+    (
+        n_filtered,
+        n_matched,
+        n_parsed,
+        flagstats,
+        match_stats,
+        pattern_stats,
+    ) = scriptio.run_chunks(
+        run_chunk,
+        IH,
+        args,
+        setup_chunk_context,
+        fold_chunk_details,
+        (0, 0, 0, FlagStats(), Counter(), Counter()),
     )
-    logging.info("Merging subprocesses details...")
-    n_parsed, n_matched, n_filtered, flagstats = merge_chunk_details(chunk_details)
 
     logging.info(
         f"{n_matched}/{n_parsed} ({n_matched/n_parsed*100:.2f}%) "
         + "records matched the pattern.",
     )
+    scriptio.log_pattern_stats(pattern_stats, args.pattern, n_parsed)
+    scriptio.log_match_stats(match_stats)
     if args.filter_qual_flags is not None and 0 != n_matched:
         logging.info(
             " ".join(
@@ -256,13 +424,19 @@ def run(args: argparse.Namespace) -> None:
     if args.flagstats is not None:
         flagstats.export(args.output)
 
-    logging.info("Merging batch output...")
-    if args.unmatched_output is not None:
-        merger = ChunkMerger(args.temp_dir, None)
-        merger.do(args.unmatched_output, IH.last_chunk_id, "Writing unmatched records")
-    merger = ChunkMerger(args.temp_dir, args.split_by)
-    merger.do(args.output, IH.last_chunk_id, "Writing matched records")
-    if args.filter_qual_output is not None:
-        merger.do(args.filter_qual_output, IH.last_chunk_id, "Writing filtered records")
+    if OutputModes.MERGE == scriptio.get_output_mode(args):
+        logging.info("Merging batch output...")
+        if args.unmatched_output is not None:
+            merger = ChunkMerger(args.temp_dir, None)
+            merger.do(
+                args.unmatched_output, IH.last_chunk_id, "Writing unmatched records"
+            )
+        merger = ChunkMerger(args.temp_dir, args.split_by)
+        for path in args.pattern_output:
+            merger.do(path, IH.last_chunk_id, "Writing matched records")
+        if args.filter_qual_output is not None:
+            merger.do(
+                args.filter_qual_output, IH.last_chunk_id, "Writing filtered records"
+            )
 
     logging.info("Done. :thumbs_up: :smiley:")
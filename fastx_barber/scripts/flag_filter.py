@@ -5,19 +5,24 @@
 
 import argparse
 from fastx_barber import scriptio
+from fastx_barber.const import FastxFormats, OutputModes
 from fastx_barber.exception import enable_rich_assert
 from fastx_barber.flag import FastxFlagReader
 from fastx_barber.io import ChunkMerger
-from fastx_barber.match import SimpleFastxRecord
-from fastx_barber.qual import setup_qual_filters
+from fastx_barber.qual import setup_qual_filters, QualityFilter
 from fastx_barber.scriptio import get_handles
 from fastx_barber.scripts import arguments as ap
-from fastx_barber.seqio import SimpleFastxWriter
-import joblib  # type: ignore
+from fastx_barber.seqio import (
+    get_fastx_format,
+    load_chunk,
+    release_chunk,
+    FastxChunk,
+    SimpleFastxWriter,
+)
 import logging
 from rich.logging import RichHandler  # type: ignore
 import sys
-from typing import List, Tuple
+from typing import Callable, Dict, NamedTuple, Tuple
 
 logging.basicConfig(
     level=logging.INFO,
@@ -57,10 +62,18 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
     advanced = ap.add_filter_qual_output_option(advanced)
     advanced = ap.add_phred_offset_option(advanced)
     advanced = ap.add_compress_level_option(advanced)
+    advanced = ap.add_bgzf_option(advanced)
+    advanced = ap.add_compress_threads_option(advanced)
     advanced = ap.add_log_file_option(advanced)
 
     advanced = ap.add_chunk_size_option(advanced)
+    advanced = ap.add_parser_option(advanced)
+    advanced = ap.add_inflate_threads_option(advanced)
+    advanced = ap.add_transport_option(advanced)
+    advanced = ap.add_output_mode_option(advanced)
     advanced = ap.add_threads_option(advanced)
+    advanced = ap.add_backend_option(advanced)
+    advanced = ap.add_max_in_flight_option(advanced)
     advanced = ap.add_tempdir_option(advanced)
 
     parser.set_defaults(parse=parse_arguments, run=run)
@@ -71,6 +84,8 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 @enable_rich_assert
 def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     args.threads = ap.check_threads(args.threads)
+    args.inflate_threads = ap.check_threads(args.inflate_threads)
+    args.compress_threads = ap.check_threads(args.compress_threads)
     args = scriptio.set_tempdir(args)
 
     if args.filter_qual_flags is None:
@@ -85,38 +100,53 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     return args
 
 
-def run_chunk(
-    chunk: List[SimpleFastxRecord],
-    cid: int,
-    args: argparse.Namespace,
-) -> Tuple[int, int]:
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
-    OHC, _, FHC, filter_output_fun = get_handles(fmt, cid, args)
-    foutput = scriptio.get_output_fun(OHC, None)
+class ChunkContext(NamedTuple):
+    fmt: FastxFormats
+    quality_flag_filters: Dict[str, QualityFilter]
+    filter_fun: Callable
+    flag_reader: FastxFlagReader
 
+
+def setup_chunk_context(args: argparse.Namespace) -> ChunkContext:
+    fmt, _ = get_fastx_format(args.input)
     quality_flag_filters, filter_fun = setup_qual_filters(
-        args.filter_qual_flags, args.phred_offset
+        args.filter_qual_flags, args.phred_offset, batch=True
     )
-
     flag_reader = FastxFlagReader()
     flag_reader.flag_delim = args.flag_delim
     flag_reader.comment_space = args.comment_space
+    return ChunkContext(fmt, quality_flag_filters, filter_fun, flag_reader)
+
 
-    unfiltered_counter = 0
-    filtered_counter = 0
-    for record in chunk:
-        flags = flag_reader.read(record)
-        pass_filters = filter_fun(flags, quality_flag_filters)
-        if pass_filters:
-            unfiltered_counter += 1
+def run_chunk(
+    payload: FastxChunk,
+    cid: int,
+    args: argparse.Namespace,
+    context: ChunkContext,
+) -> Tuple[int, int]:
+    chunk = load_chunk(payload)
+    OHC, _, FHC, filter_output_fun = get_handles(context.fmt, cid, args)
+    foutput = scriptio.get_output_fun(OHC, None)
+
+    quality_flag_filters = context.quality_flag_filters
+    filter_fun = context.filter_fun
+    flag_reader = context.flag_reader
+
+    chunk_flags = [flag_reader.read(record) for record in chunk]
+    pass_filters = filter_fun(chunk_flags, quality_flag_filters)
+    for record, flags, passed in zip(chunk, chunk_flags, pass_filters):
+        if passed:
             foutput[True](record, flags)
         else:
-            filtered_counter += 1
             filter_output_fun(record, flags)
+    unfiltered_counter = int(pass_filters.sum())
+    filtered_counter = len(chunk) - unfiltered_counter
 
     SimpleFastxWriter.close_handle(OHC)
     SimpleFastxWriter.close_handle(FHC)
 
+    release_chunk(payload)
+
     return (filtered_counter, unfiltered_counter)
 
 
@@ -130,27 +160,22 @@ def run(args: argparse.Namespace) -> None:
     logging.info(f"Flag delim\t'{args.flag_delim}'")
     logging.info(f"Comment delim\t'{args.comment_space}'")
 
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
+    fmt, IH = scriptio.get_input_handler(
+        args.input,
+        args.chunk_size,
+        args.parser,
+        args.inflate_threads,
+        args.transport,
+    )
     quality_flag_filters, filter_fun = setup_qual_filters(
         args.filter_qual_flags, args.phred_offset, verbose=True
     )
 
     logging.info("[bold underline red]Running[/]")
     logging.info("Matching...")
-    chunk_details = joblib.Parallel(n_jobs=args.threads, verbose=10)(
-        joblib.delayed(run_chunk)(
-            chunk,
-            cid,
-            args,
-        )
-        for chunk, cid in IH
+    parsed_counter, unfiltered_counter = scriptio.run_chunks(
+        run_chunk, IH, args, setup_chunk_context, initial=(0, 0)
     )
-
-    parsed_counter = 0
-    unfiltered_counter = 0
-    for filtered, unfiltered in chunk_details:
-        parsed_counter += filtered
-        unfiltered_counter += unfiltered
     parsed_counter += unfiltered_counter
     logging.info(
         " ".join(
@@ -162,10 +187,13 @@ def run(args: argparse.Namespace) -> None:
         )
     )
 
-    logging.info("Merging batch output...")
-    merger = ChunkMerger(args.temp_dir)
-    merger.do(args.output, IH.last_chunk_id, "Writing matched records")
-    if args.filter_qual_output is not None:
-        merger.do(args.filter_qual_output, IH.last_chunk_id, "Writing filtered records")
+    if OutputModes.MERGE == scriptio.get_output_mode(args):
+        logging.info("Merging batch output...")
+        merger = ChunkMerger(args.temp_dir)
+        merger.do(args.output, IH.last_chunk_id, "Writing matched records")
+        if args.filter_qual_output is not None:
+            merger.do(
+                args.filter_qual_output, IH.last_chunk_id, "Writing filtered records"
+            )
 
     logging.info("Done. :thumbs_up: :smiley:")
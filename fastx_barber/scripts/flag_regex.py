@@ -5,17 +5,23 @@
 
 import argparse
 from fastx_barber import scriptio
+from fastx_barber.const import FastxFormats, OutputModes
 from fastx_barber.exception import enable_rich_assert
 from fastx_barber.flag import FastxFlagReader, FlagRegexes
 from fastx_barber.io import ChunkMerger
-from fastx_barber.match import SimpleFastxRecord
+from fastx_barber.seqio import (
+    get_fastx_format,
+    load_chunk,
+    release_chunk,
+    FastxChunk,
+    SimpleFastxWriter,
+)
 from fastx_barber.scriptio import get_chunk_handler
 from fastx_barber.scripts import arguments as ap
-import joblib  # type: ignore
 import logging
 from rich.logging import RichHandler  # type: ignore
 import sys
-from typing import List, Tuple
+from typing import NamedTuple, Tuple
 
 logging.basicConfig(
     level=logging.INFO,
@@ -62,9 +68,17 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
     advanced = ap.add_comment_space_option(advanced)
 
     advanced = ap.add_compress_level_option(advanced)
+    advanced = ap.add_bgzf_option(advanced)
+    advanced = ap.add_compress_threads_option(advanced)
     advanced = ap.add_log_file_option(advanced)
     advanced = ap.add_chunk_size_option(advanced)
+    advanced = ap.add_parser_option(advanced)
+    advanced = ap.add_inflate_threads_option(advanced)
+    advanced = ap.add_transport_option(advanced)
+    advanced = ap.add_output_mode_option(advanced)
     advanced = ap.add_threads_option(advanced)
+    advanced = ap.add_backend_option(advanced)
+    advanced = ap.add_max_in_flight_option(advanced)
     advanced = ap.add_tempdir_option(advanced)
 
     parser.set_defaults(parse=parse_arguments, run=run)
@@ -75,6 +89,8 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 @enable_rich_assert
 def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     args.threads = ap.check_threads(args.threads)
+    args.inflate_threads = ap.check_threads(args.inflate_threads)
+    args.compress_threads = ap.check_threads(args.compress_threads)
     args = scriptio.set_tempdir(args)
 
     if args.pattern is None:
@@ -89,24 +105,50 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     return args
 
 
+class ChunkContext(NamedTuple):
+    fmt: FastxFormats
+    flag_regex: FlagRegexes
+    flag_reader: FastxFlagReader
+
+
+def setup_chunk_context(args: argparse.Namespace) -> ChunkContext:
+    fmt, _ = get_fastx_format(args.input)
+    flag_reader = FastxFlagReader()
+    flag_reader.flag_delim = args.flag_delim
+    flag_reader.comment_space = args.comment_space
+    return ChunkContext(fmt, FlagRegexes(args.pattern), flag_reader)
+
+
 def run_chunk(
-    chunk: List[SimpleFastxRecord],
+    payload: FastxChunk,
     cid: int,
     args: argparse.Namespace,
+    context: ChunkContext,
 ) -> Tuple[int, int]:
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
-
-    OHC = get_chunk_handler(cid, fmt, args.output, args.compress_level, args.temp_dir)
+    chunk = load_chunk(payload)
+
+    OHC = get_chunk_handler(
+        cid,
+        context.fmt,
+        args.output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
+    )
     assert OHC is not None
     UHC = get_chunk_handler(
-        cid, fmt, args.unmatched_output, args.compress_level, args.temp_dir
+        cid,
+        context.fmt,
+        args.unmatched_output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     foutput = scriptio.get_output_fun(OHC, UHC)
-    flag_regex = FlagRegexes(args.pattern)
-
-    flag_reader = FastxFlagReader()
-    flag_reader.flag_delim = args.flag_delim
-    flag_reader.comment_space = args.comment_space
+    flag_regex = context.flag_regex
+    flag_reader = context.flag_reader
 
     matched_counter = 0
     unmatched_counter = 0
@@ -120,6 +162,11 @@ def run_chunk(
         else:
             logging.warning("encountered record without flags.")
 
+    OHC.close()
+    SimpleFastxWriter.close_handle(UHC)
+
+    release_chunk(payload)
+
     return (matched_counter, unmatched_counter)
 
 
@@ -133,25 +180,20 @@ def run(args: argparse.Namespace) -> None:
     logging.info(f"Flag delim\t'{args.flag_delim}'")
     logging.info(f"Comment delim\t'{args.comment_space}'")
 
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
+    fmt, IH = scriptio.get_input_handler(
+        args.input,
+        args.chunk_size,
+        args.parser,
+        args.inflate_threads,
+        args.transport,
+    )
     FlagRegexes(args.pattern).log()
 
     logging.info("[bold underline red]Running[/]")
     logging.info("Matching...")
-    chunk_details = joblib.Parallel(n_jobs=args.threads, verbose=10)(
-        joblib.delayed(run_chunk)(
-            chunk,
-            cid,
-            args,
-        )
-        for chunk, cid in IH
+    matched_counter, parsed_counter = scriptio.run_chunks(
+        run_chunk, IH, args, setup_chunk_context, initial=(0, 0)
     )
-
-    parsed_counter = 0
-    matched_counter = 0
-    for matched, unmatched in chunk_details:
-        matched_counter += matched
-        parsed_counter += unmatched
     parsed_counter += matched_counter
     logging.info(
         " ".join(
@@ -163,10 +205,13 @@ def run(args: argparse.Namespace) -> None:
         )
     )
 
-    logging.info("Merging batch output...")
-    merger = ChunkMerger(args.temp_dir, None)
-    if args.unmatched_output is not None:
-        merger.do(args.unmatched_output, IH.last_chunk_id, "Writing unmatched records")
-    merger.do(args.output, IH.last_chunk_id, "Writing matched records")
+    if OutputModes.MERGE == scriptio.get_output_mode(args):
+        logging.info("Merging batch output...")
+        merger = ChunkMerger(args.temp_dir, None)
+        if args.unmatched_output is not None:
+            merger.do(
+                args.unmatched_output, IH.last_chunk_id, "Writing unmatched records"
+            )
+        merger.do(args.output, IH.last_chunk_id, "Writing matched records")
 
     logging.info("Done. :thumbs_up: :smiley:")
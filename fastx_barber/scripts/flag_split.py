@@ -5,17 +5,17 @@
 
 import argparse
 from fastx_barber import scriptio
+from fastx_barber.const import FastxFormats, OutputModes
 from fastx_barber.exception import enable_rich_assert
 from fastx_barber.flag import FastxFlagReader
 from fastx_barber.io import ChunkMerger
-from fastx_barber.match import SimpleFastxRecord
+from fastx_barber.seqio import get_fastx_format, load_chunk, release_chunk, FastxChunk
 from fastx_barber.scriptio import get_split_chunk_handler
 from fastx_barber.scripts import arguments as ap
-import joblib  # type: ignore
 import logging
 from rich.logging import RichHandler  # type: ignore
 import sys
-from typing import List
+from typing import NamedTuple
 
 logging.basicConfig(
     level=logging.INFO,
@@ -54,9 +54,17 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
     advanced = ap.add_split_by_option(advanced)
 
     advanced = ap.add_compress_level_option(advanced)
+    advanced = ap.add_bgzf_option(advanced)
+    advanced = ap.add_compress_threads_option(advanced)
     advanced = ap.add_log_file_option(advanced)
     advanced = ap.add_chunk_size_option(advanced)
+    advanced = ap.add_parser_option(advanced)
+    advanced = ap.add_inflate_threads_option(advanced)
+    advanced = ap.add_transport_option(advanced)
+    advanced = ap.add_output_mode_option(advanced)
     advanced = ap.add_threads_option(advanced)
+    advanced = ap.add_backend_option(advanced)
+    advanced = ap.add_max_in_flight_option(advanced)
     advanced = ap.add_tempdir_option(advanced)
 
     parser.set_defaults(parse=parse_arguments, run=run)
@@ -67,6 +75,8 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 @enable_rich_assert
 def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     args.threads = ap.check_threads(args.threads)
+    args.inflate_threads = ap.check_threads(args.inflate_threads)
+    args.compress_threads = ap.check_threads(args.compress_threads)
     args = scriptio.set_tempdir(args)
 
     if args.split_by is None:
@@ -81,20 +91,39 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     return args
 
 
+class ChunkContext(NamedTuple):
+    fmt: FastxFormats
+    flag_reader: FastxFlagReader
+
+
+def setup_chunk_context(args: argparse.Namespace) -> ChunkContext:
+    fmt, _ = get_fastx_format(args.input)
+    flag_reader = FastxFlagReader()
+    flag_reader.flag_delim = args.flag_delim
+    flag_reader.comment_space = args.comment_space
+    return ChunkContext(fmt, flag_reader)
+
+
 def run_chunk(
-    chunk: List[SimpleFastxRecord],
+    payload: FastxChunk,
     cid: int,
     args: argparse.Namespace,
+    context: ChunkContext,
 ) -> None:
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
+    chunk = load_chunk(payload)
     OHC = get_split_chunk_handler(
-        cid, fmt, args.output, args.compress_level, args.split_by, args.temp_dir
+        cid,
+        context.fmt,
+        args.output,
+        args.compress_level,
+        args.split_by,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     assert OHC is not None
 
-    flag_reader = FastxFlagReader()
-    flag_reader.flag_delim = args.flag_delim
-    flag_reader.comment_space = args.comment_space
+    flag_reader = context.flag_reader
 
     for record in chunk:
         flags = flag_reader.read(record)
@@ -103,6 +132,9 @@ def run_chunk(
         else:
             logging.warning("encountered record without flags.")
 
+    OHC.close()
+    release_chunk(payload)
+
 
 @enable_rich_assert
 def run(args: argparse.Namespace) -> None:
@@ -115,21 +147,21 @@ def run(args: argparse.Namespace) -> None:
     logging.info(f"Comment delim\t'{args.comment_space}'")
     logging.info(f"Split by\t'{args.split_by}'")
 
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
+    fmt, IH = scriptio.get_input_handler(
+        args.input,
+        args.chunk_size,
+        args.parser,
+        args.inflate_threads,
+        args.transport,
+    )
 
     logging.info("[bold underline red]Running[/]")
     logging.info("Matching...")
-    joblib.Parallel(n_jobs=args.threads, verbose=10)(
-        joblib.delayed(run_chunk)(
-            chunk,
-            cid,
-            args,
-        )
-        for chunk, cid in IH
-    )
+    scriptio.run_chunks(run_chunk, IH, args, setup_chunk_context, fold=None)
 
-    logging.info("Merging batch output...")
-    merger = ChunkMerger(args.temp_dir, args.split_by)
-    merger.do(args.output, IH.last_chunk_id, "Writing matched records")
+    if OutputModes.MERGE == scriptio.get_output_mode(args):
+        logging.info("Merging batch output...")
+        merger = ChunkMerger(args.temp_dir, args.split_by)
+        merger.do(args.output, IH.last_chunk_id, "Writing matched records")
 
     logging.info("Done. :thumbs_up: :smiley:")
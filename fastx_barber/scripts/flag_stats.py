@@ -7,13 +7,11 @@ import argparse
 from fastx_barber import scriptio
 from fastx_barber.exception import enable_rich_assert
 from fastx_barber.flag import FastxFlagReader, FlagStats
-from fastx_barber.match import SimpleFastxRecord
+from fastx_barber.seqio import load_chunk, release_chunk, FastxChunk
 from fastx_barber.scripts import arguments as ap
-import joblib  # type: ignore
 import logging
 from rich.logging import RichHandler  # type: ignore
 import sys
-from typing import List
 
 logging.basicConfig(
     level=logging.INFO,
@@ -47,7 +45,12 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
     advanced = ap.add_compress_level_option(advanced)
     advanced = ap.add_log_file_option(advanced)
     advanced = ap.add_chunk_size_option(advanced)
+    advanced = ap.add_parser_option(advanced)
+    advanced = ap.add_inflate_threads_option(advanced)
+    advanced = ap.add_transport_option(advanced)
     advanced = ap.add_threads_option(advanced)
+    advanced = ap.add_backend_option(advanced)
+    advanced = ap.add_max_in_flight_option(advanced)
     advanced = ap.add_tempdir_option(advanced)
 
     parser.set_defaults(parse=parse_arguments, run=run)
@@ -58,6 +61,7 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 @enable_rich_assert
 def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     args.threads = ap.check_threads(args.threads)
+    args.inflate_threads = ap.check_threads(args.inflate_threads)
     args = scriptio.set_tempdir(args)
 
     if args.flagstats is None:
@@ -72,29 +76,34 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     return args
 
 
-def run_chunk(
-    chunk: List[SimpleFastxRecord],
-    cid: int,
-    args: argparse.Namespace,
-) -> None:
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
-
+def setup_chunk_context(args: argparse.Namespace) -> FastxFlagReader:
     flag_reader = FastxFlagReader(args.flagstats)
     flag_reader.flag_delim = args.flag_delim
     flag_reader.comment_space = args.comment_space
+    return flag_reader
+
+
+def run_chunk(
+    payload: FastxChunk,
+    cid: int,
+    args: argparse.Namespace,
+    flag_reader: FastxFlagReader,
+) -> FlagStats:
+    chunk = load_chunk(payload)
+    flag_reader.reset_stats()
 
     for record in chunk:
         flag_reader.read(record)
 
+    release_chunk(payload)
+
     return flag_reader.flagstats
 
 
-def merge_flagstats(chunk_details: List[FlagStats]) -> FlagStats:
-    flagstats: FlagStats = FlagStats()
-    for stats in chunk_details:
-        for flag_name, data in stats.items():
-            for k, v in data.items():
-                flagstats[flag_name][k] += v
+def fold_flagstats(flagstats: FlagStats, stats: FlagStats) -> FlagStats:
+    for flag_name, data in stats.items():
+        for k, v in data.items():
+            flagstats[flag_name][k] += v
     return flagstats
 
 
@@ -109,19 +118,20 @@ def run(args: argparse.Namespace) -> None:
     logging.info(f"Comment delim\t'{args.comment_space}'")
     logging.info(f"Flag stats\t'{args.flagstats}'")
 
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
+    fmt, IH = scriptio.get_input_handler(
+        args.input,
+        args.chunk_size,
+        args.parser,
+        args.inflate_threads,
+        args.transport,
+    )
 
     logging.info("[bold underline red]Running[/]")
     logging.info("Matching...")
-    chunk_details = joblib.Parallel(n_jobs=args.threads, verbose=10)(
-        joblib.delayed(run_chunk)(
-            chunk,
-            cid,
-            args,
-        )
-        for chunk, cid in IH
+    flagstats = scriptio.run_chunks(
+        run_chunk, IH, args, setup_chunk_context, fold_flagstats, FlagStats()
     )
 
-    merge_flagstats(chunk_details).export(args.input)
+    flagstats.export(args.input)
 
     logging.info("Done. :thumbs_up: :smiley:")
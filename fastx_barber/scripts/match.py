@@ -4,19 +4,19 @@
 """
 
 import argparse
+from collections import Counter
 from fastx_barber import scriptio
 from fastx_barber.exception import enable_rich_assert
-from fastx_barber.const import PATTERN_EXAMPLE
+from fastx_barber.const import ExecutionBackends, FastxFormats, OutputModes
 from fastx_barber.io import ChunkMerger
-from fastx_barber.match import FastxMatcher, SimpleFastxRecord
+from fastx_barber.match import get_fastx_matcher, FastxMatcher, FastxMultiMatcher
 from fastx_barber.scripts import arguments as ap
-from fastx_barber.seqio import get_fastx_format
-import joblib  # type: ignore
+from fastx_barber.seqio import get_fastx_format, load_chunk, release_chunk, FastxChunk
 import logging
 import regex  # type: ignore
 from rich.logging import RichHandler  # type: ignore
 import sys
-from typing import List, Tuple
+from typing import Callable, List, NamedTuple, Tuple, Union
 
 logging.basicConfig(
     level=logging.INFO,
@@ -47,22 +47,27 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
         + "Format will match the input.",
     )
 
-    parser.add_argument(
-        "--pattern",
-        type=str,
-        help="Pattern to match to reads. Remember to use quotes. "
-        + f"Example: '{PATTERN_EXAMPLE}'",
-    )
-
+    parser = ap.add_patterns_option(parser)
     parser = ap.add_version_option(parser)
 
     advanced = parser.add_argument_group("advanced arguments")
     advanced = ap.add_unmatched_output_option(advanced)
+    advanced = ap.add_match_window_option(advanced)
+    advanced = ap.add_match_timeout_option(advanced)
+    advanced = ap.add_match_cache_option(advanced)
     advanced = ap.add_compress_level_option(advanced)
+    advanced = ap.add_bgzf_option(advanced)
+    advanced = ap.add_compress_threads_option(advanced)
     advanced = ap.add_log_file_option(advanced)
 
     advanced = ap.add_chunk_size_option(advanced)
+    advanced = ap.add_parser_option(advanced)
+    advanced = ap.add_inflate_threads_option(advanced)
+    advanced = ap.add_transport_option(advanced)
+    advanced = ap.add_output_mode_option(advanced)
     advanced = ap.add_threads_option(advanced)
+    advanced = ap.add_backend_option(advanced)
+    advanced = ap.add_max_in_flight_option(advanced)
     advanced = ap.add_tempdir_option(advanced)
 
     parser.set_defaults(parse=parse_arguments, run=run)
@@ -73,6 +78,11 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 @enable_rich_assert
 def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     args.threads = ap.check_threads(args.threads)
+    args.inflate_threads = ap.check_threads(args.inflate_threads)
+    args.compress_threads = ap.check_threads(args.compress_threads)
+    args.match_window = ap.check_match_window(args.match_window)
+    args.match_timeout = ap.check_match_timeout(args.match_timeout)
+    args.match_cache = ap.check_match_cache(args.match_cache)
     args = scriptio.set_tempdir(args)
 
     if args.pattern is None:
@@ -80,7 +90,10 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
             "No pattern specified (--pattern), nothing to do. :person_shrugging:"
         )
         sys.exit()
-    args.pattern = regex.compile(args.pattern)
+    args.pattern = [regex.compile(pattern) for pattern in args.pattern]
+    args.pattern_output = scriptio.get_pattern_output_paths(
+        args.output, len(args.pattern)
+    )
 
     if args.log_file is not None:
         scriptio.add_log_file_handler(args.log_file)
@@ -88,56 +101,96 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     return args
 
 
+class ChunkContext(NamedTuple):
+    fmt: FastxFormats
+    matcher: Union[FastxMatcher, FastxMultiMatcher]
+
+
+def setup_chunk_context(args: argparse.Namespace) -> ChunkContext:
+    fmt, _ = get_fastx_format(args.input)
+    return ChunkContext(
+        fmt,
+        get_fastx_matcher(
+            args.pattern,
+            args.match_window,
+            args.match_timeout,
+            args.match_cache,
+            ExecutionBackends.THREADS == scriptio.get_backend(args),
+        ),
+    )
+
+
 def run_chunk(
-    chunk: List[SimpleFastxRecord],
+    payload: FastxChunk,
     cid: int,
     args: argparse.Namespace,
-) -> Tuple[int, int]:
-    fmt, _ = get_fastx_format(args.input)
-    OHC = scriptio.get_chunk_handler(
-        cid, fmt, args.output, args.compress_level, args.temp_dir
-    )
-    assert OHC is not None
+    context: ChunkContext,
+) -> Tuple[int, int, Counter, Counter]:
+    chunk = load_chunk(payload)
+    OHCs = scriptio.get_pattern_handles(context.fmt, cid, args, args.pattern_output)
     UHC = scriptio.get_chunk_handler(
-        cid, fmt, args.unmatched_output, args.compress_level, args.temp_dir
+        cid,
+        context.fmt,
+        args.unmatched_output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
-    foutput = scriptio.get_output_fun(OHC, UHC)
-
-    matcher = FastxMatcher(args.pattern)
-
-    for record in chunk:
-        match, matched = matcher.do(record)
-        foutput[matched](record)
-
-    OHC.close()
+    foutput = scriptio.get_output_fun(OHCs[0], UHC)
+    pattern_output: List[Callable] = [OHC.write for OHC in OHCs]
+
+    matcher = context.matcher
+    matcher.reset()
+
+    if isinstance(matcher, FastxMatcher) and matcher.can_batch:
+        for record, matched in zip(chunk, matcher.do_batch(chunk).matched.tolist()):
+            foutput[matched](record)
+    else:
+        for record in chunk:
+            match, pattern_id = matcher.dispatch(record)
+            if pattern_id is None:
+                foutput[False](record)
+            else:
+                pattern_output[pattern_id](record)
+
+    for OHC in OHCs:
+        OHC.close()
     if UHC is not None:
         UHC.close()
 
-    return (matcher.matched_count, len(chunk))
+    release_chunk(payload)
+
+    return (
+        matcher.matched_count,
+        len(chunk),
+        matcher.stats,
+        matcher.pattern_stats,
+    )
 
 
 @enable_rich_assert
 def run(args: argparse.Namespace) -> None:
     ap.log_args(args)
 
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
+    fmt, IH = scriptio.get_input_handler(
+        args.input,
+        args.chunk_size,
+        args.parser,
+        args.inflate_threads,
+        args.transport,
+    )
 
     logging.info("[bold underline red]Running[/]")
     logging.info("Matching...")
-    output = joblib.Parallel(n_jobs=args.threads, verbose=10)(
-        joblib.delayed(run_chunk)(
-            chunk,
-            cid,
-            args,
-        )
-        for chunk, cid in IH
+    (
+        matched_counter,
+        parsed_counter,
+        match_stats,
+        pattern_stats,
+    ) = scriptio.run_chunks(
+        run_chunk, IH, args, setup_chunk_context, initial=(0, 0, Counter(), Counter())
     )
-
-    parsed_counter = 0
-    matched_counter = 0
-    for matched, parsed in output:
-        matched_counter += matched
-        parsed_counter += parsed
     logging.info(
         " ".join(
             (
@@ -147,11 +200,15 @@ def run(args: argparse.Namespace) -> None:
             )
         )
     )
-
-    logging.info("Merging batch output...")
-    merger = ChunkMerger(args.temp_dir, None)
-    merger.do(args.output, IH.last_chunk_id, "Writing matched")
-    if args.unmatched_output is not None:
-        merger.do(args.unmatched_output, IH.last_chunk_id, "Writing unmatched")
+    scriptio.log_pattern_stats(pattern_stats, args.pattern, parsed_counter)
+    scriptio.log_match_stats(match_stats)
+
+    if OutputModes.MERGE == scriptio.get_output_mode(args):
+        logging.info("Merging batch output...")
+        merger = ChunkMerger(args.temp_dir, None)
+        for path in args.pattern_output:
+            merger.do(path, IH.last_chunk_id, "Writing matched")
+        if args.unmatched_output is not None:
+            merger.do(args.unmatched_output, IH.last_chunk_id, "Writing unmatched")
 
     logging.info("Done. :thumbs_up: :smiley:")
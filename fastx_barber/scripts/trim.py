@@ -32,5 +32,6 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
     scripts.trim_len.init_parser(sub_subparsers)
     scripts.trim_qual.init_parser(sub_subparsers)
     scripts.trim_regex.init_parser(sub_subparsers)
+    scripts.trim_window.init_parser(sub_subparsers)
 
     return parser
@@ -5,16 +5,16 @@
 
 import argparse
 from fastx_barber import scriptio
+from fastx_barber.const import FastxFormats, OutputModes
 from fastx_barber.exception import enable_rich_assert
 from fastx_barber.io import ChunkMerger
 from fastx_barber.scripts import arguments as ap
-from fastx_barber.seqio import SimpleFastxRecord, get_fastx_format
-from fastx_barber.trim import get_fastx_trimmer
-import joblib  # type: ignore
+from fastx_barber.seqio import get_fastx_format, load_chunk, release_chunk, FastxChunk
+from fastx_barber.trim import get_fastx_trimmer, ABCTrimmer
 import logging
 from rich.logging import RichHandler  # type: ignore
 import sys
-from typing import List, Tuple
+from typing import NamedTuple, Tuple, Type
 
 logging.basicConfig(
     level=logging.INFO,
@@ -66,10 +66,18 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 
     advanced = parser.add_argument_group("advanced arguments")
     advanced = ap.add_compress_level_option(advanced)
+    advanced = ap.add_bgzf_option(advanced)
+    advanced = ap.add_compress_threads_option(advanced)
     advanced = ap.add_log_file_option(advanced)
 
     advanced = ap.add_chunk_size_option(advanced)
+    advanced = ap.add_parser_option(advanced)
+    advanced = ap.add_inflate_threads_option(advanced)
+    advanced = ap.add_transport_option(advanced)
+    advanced = ap.add_output_mode_option(advanced)
     advanced = ap.add_threads_option(advanced)
+    advanced = ap.add_backend_option(advanced)
+    advanced = ap.add_max_in_flight_option(advanced)
     advanced = ap.add_tempdir_option(advanced)
 
     parser.set_defaults(parse=parse_arguments, run=run)
@@ -80,6 +88,8 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 @enable_rich_assert
 def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     args.threads = ap.check_threads(args.threads)
+    args.inflate_threads = ap.check_threads(args.inflate_threads)
+    args.compress_threads = ap.check_threads(args.compress_threads)
     args = scriptio.set_tempdir(args)
 
     if 0 == args.length:
@@ -94,18 +104,35 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     return args
 
 
+class ChunkContext(NamedTuple):
+    fmt: FastxFormats
+    trimmer: Type[ABCTrimmer]
+
+
+def setup_chunk_context(args: argparse.Namespace) -> ChunkContext:
+    fmt, _ = get_fastx_format(args.input)
+    return ChunkContext(fmt, get_fastx_trimmer(fmt))
+
+
 def run_chunk(
-    chunk: List[SimpleFastxRecord],
+    payload: FastxChunk,
     cid: int,
     args: argparse.Namespace,
+    context: ChunkContext,
 ) -> Tuple[int, int]:
-    fmt, _ = get_fastx_format(args.input)
+    chunk = load_chunk(payload)
     OHC = scriptio.get_chunk_handler(
-        cid, fmt, args.output, args.compress_level, args.temp_dir
+        cid,
+        context.fmt,
+        args.output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     assert OHC is not None
 
-    trimmer = get_fastx_trimmer(fmt)
+    trimmer = context.trimmer
 
     skipped_short_counter = 0
     trimmed_counter = 0
@@ -119,6 +146,8 @@ def run_chunk(
 
     OHC.close()
 
+    release_chunk(payload)
+
     return (trimmed_counter, skipped_short_counter)
 
 
@@ -130,24 +159,19 @@ def run(args: argparse.Namespace) -> None:
     logging.info(f"Threads\t\t{args.threads}")
     logging.info(f"Chunk size\t{args.chunk_size}")
 
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
+    fmt, IH = scriptio.get_input_handler(
+        args.input,
+        args.chunk_size,
+        args.parser,
+        args.inflate_threads,
+        args.transport,
+    )
 
     logging.info("[bold underline red]Running[/]")
     logging.info("Trimming...")
-    output = joblib.Parallel(n_jobs=args.threads, verbose=10)(
-        joblib.delayed(run_chunk)(
-            chunk,
-            cid,
-            args,
-        )
-        for chunk, cid in IH
+    trimmed_counter, parsed_counter = scriptio.run_chunks(
+        run_chunk, IH, args, setup_chunk_context, initial=(0, 0)
     )
-
-    parsed_counter = 0
-    trimmed_counter = 0
-    for trimmed, skipped_short in output:
-        trimmed_counter += trimmed
-        parsed_counter += skipped_short
     parsed_counter += trimmed_counter
     logging.info(
         " ".join(
@@ -159,8 +183,9 @@ def run(args: argparse.Namespace) -> None:
         )
     )
 
-    logging.info("Merging batch output...")
-    merger = ChunkMerger(args.temp_dir, None)
-    merger.do(args.output, IH.last_chunk_id, "Writing trimmed records")
+    if OutputModes.MERGE == scriptio.get_output_mode(args):
+        logging.info("Merging batch output...")
+        merger = ChunkMerger(args.temp_dir, None)
+        merger.do(args.output, IH.last_chunk_id, "Writing trimmed records")
 
     logging.info("Done. :thumbs_up: :smiley:")
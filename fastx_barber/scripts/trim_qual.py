@@ -6,23 +6,25 @@
 import argparse
 from fastx_barber import scriptio
 from fastx_barber.exception import enable_rich_assert
-from fastx_barber.const import FastxFormats
+from fastx_barber.const import FastxFormats, OutputModes, QualityTrimMethods
 from fastx_barber.io import ChunkMerger
 from fastx_barber.qual import QualityIO
 from fastx_barber.scripts import arguments as ap
 from fastx_barber.seqio import (
-    FastxChunkedParser,
     get_fastx_format,
-    get_fastx_parser,
+    load_chunk,
+    release_chunk,
+    FastxChunk,
+    FastxChunkedParser,
+    FastxRangeChunker,
+    FastxSharedMemoryChunker,
     SimpleFastqRecord,
 )
-from fastx_barber.trim import FastqTrimmer
-import joblib  # type: ignore
+from fastx_barber.trim import FastqTrimmer, LengthHistogram
 import logging
-import numpy as np  # type: ignore
 from rich.logging import RichHandler  # type: ignore
 import sys
-from typing import List, Tuple
+from typing import Callable, cast, List, NamedTuple, Optional, Tuple, Union
 
 logging.basicConfig(
     level=logging.INFO,
@@ -63,11 +65,37 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
     parser.add_argument(
         "-s",
         "--side",
-        type=int,
-        default=5,
-        choices=[3, 5],
+        type=str,
+        default="5",
+        choices=["3", "5", "both"],
         help="""Side to trim from. Either '5' for 5' (left/start),
-        or '3' for 3' (right/end). Default: 5""",
+        '3' for 3' (right/end), or 'both'. Default: 5""",
+    )
+    parser.add_argument(
+        "--method",
+        type=str,
+        default=QualityTrimMethods.SCAN.value,
+        choices=[m.value for m in QualityTrimMethods],
+        help="""How to find the bases to trim. 'scan' trims all consecutive bases
+        with lower QSCORE than the threshold. 'bwa' trims up to where the cumulative
+        sum of (threshold - QSCORE) is maximal, as BWA does, so that isolated high
+        quality bases do not stop the trimming. Default: scan""",
+    )
+    parser.add_argument(
+        "--percentiles",
+        type=float,
+        nargs="+",
+        help="""Space-separated percentiles of trimmed length to report,
+        between 0 and 100. By default, only min, mean, median, and max are
+        reported.""",
+    )
+    parser.add_argument(
+        "--length-stats",
+        action="store_const",
+        const=True,
+        default=False,
+        help="""Export the trimmed length distribution to a tsv file, next to the
+        output file.""",
     )
 
     parser = ap.add_version_option(parser)
@@ -75,10 +103,18 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
     advanced = parser.add_argument_group("advanced arguments")
     advanced = ap.add_phred_offset_option(advanced)
     advanced = ap.add_compress_level_option(advanced)
+    advanced = ap.add_bgzf_option(advanced)
+    advanced = ap.add_compress_threads_option(advanced)
     advanced = ap.add_log_file_option(advanced)
 
     advanced = ap.add_chunk_size_option(advanced)
+    advanced = ap.add_parser_option(advanced)
+    advanced = ap.add_inflate_threads_option(advanced)
+    advanced = ap.add_transport_option(advanced)
+    advanced = ap.add_output_mode_option(advanced)
     advanced = ap.add_threads_option(advanced)
+    advanced = ap.add_backend_option(advanced)
+    advanced = ap.add_max_in_flight_option(advanced)
     advanced = ap.add_tempdir_option(advanced)
 
     parser.set_defaults(parse=parse_arguments, run=run)
@@ -89,8 +125,18 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 @enable_rich_assert
 def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     args.threads = ap.check_threads(args.threads)
+    args.inflate_threads = ap.check_threads(args.inflate_threads)
+    args.compress_threads = ap.check_threads(args.compress_threads)
     args = scriptio.set_tempdir(args)
 
+    if "both" != args.side:
+        args.side = int(args.side)
+
+    if args.percentiles is not None:
+        assert all(
+            0 <= q <= 100 for q in args.percentiles
+        ), "percentiles must be in the [0, 100] range."
+
     if 0 == args.qscore:
         logging.info(
             "Trimming QSCORE threshold (-q) equal to 0. "
@@ -104,26 +150,56 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     return args
 
 
+ChunkDetails = Tuple[int, int, LengthHistogram]
+
+
+class ChunkContext(NamedTuple):
+    fmt: FastxFormats
+    trimmer: FastqTrimmer
+    qio: QualityIO
+    method: QualityTrimMethods
+
+
+def setup_chunk_context(args: argparse.Namespace) -> ChunkContext:
+    fmt, _ = get_fastx_format(args.input)
+    return ChunkContext(
+        fmt,
+        FastqTrimmer(),
+        QualityIO(args.phred_offset),
+        QualityTrimMethods(args.method),
+    )
+
+
 def run_chunk(
-    chunk: List[SimpleFastqRecord],
+    payload: FastxChunk,
     cid: int,
     args: argparse.Namespace,
-) -> Tuple[int, int, List[int]]:
-    fmt, _ = get_fastx_format(args.input)
+    context: ChunkContext,
+) -> ChunkDetails:
+    chunk = cast(List[SimpleFastqRecord], load_chunk(payload))
     OHC = scriptio.get_chunk_handler(
-        cid, fmt, args.output, args.compress_level, args.temp_dir
+        cid,
+        context.fmt,
+        args.output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     assert OHC is not None
 
-    trimmer = FastqTrimmer()
-    qio = QualityIO(args.phred_offset)
+    trimmer = context.trimmer
+    qio = context.qio
 
     trimmed_counter = 0
     untrimmed_counter = 0
-    trimmed_length_list: List[int] = []
-    for record in chunk:
-        record, trimmed_length = trimmer.trim_qual(record, args.qscore, args.side, qio)
-        trimmed_length_list.append(trimmed_length)
+    histogram = LengthHistogram()
+    qbatch = qio.phred_to_qscore_batch([record[2] for record in chunk])
+    for i, record in enumerate(chunk):
+        record, trimmed_length = trimmer.trim_qual(
+            record, args.qscore, args.side, qio, qbatch[i], context.method
+        )
+        histogram.add(trimmed_length)
         if 0 < len(record[1]):
             OHC.write(record)
         trimmed_counter += trimmed_length != 0
@@ -131,41 +207,61 @@ def run_chunk(
 
     OHC.close()
 
-    return (trimmed_counter, untrimmed_counter, trimmed_length_list)
+    release_chunk(payload)
 
+    return (trimmed_counter, untrimmed_counter, histogram)
 
-@enable_rich_assert
-def run(args: argparse.Namespace) -> None:
-    logging.info("[bold underline red]General[/]")
-    logging.info(f"Input\t\t{args.input}")
-    logging.info(f"Trimming\tQSCORE < {args.qscore} from {args.side}'")
-    logging.info(f"Threads\t\t{args.threads}")
-    logging.info(f"Chunk size\t{args.chunk_size}")
 
-    IH, fmt = get_fastx_parser(args.input)
-    IH = FastxChunkedParser(IH, args.chunk_size)
+def fold_chunk_details(total: ChunkDetails, details: ChunkDetails) -> ChunkDetails:
+    """Sums trimmed record counts and merges trimmed length histograms."""
+    return (total[0] + details[0], total[1] + details[1], total[2].update(details[2]))
 
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
-    assert FastxFormats.FASTQ == fmt, "Trimming by quality requires a fastq file."
 
-    logging.info("[bold underline red]Running[/]")
-    logging.info("Trimming...")
-    output = joblib.Parallel(n_jobs=args.threads, verbose=10)(
-        joblib.delayed(run_chunk)(
-            chunk,
-            cid,
-            args,
+def log_length_stats(
+    histogram: LengthHistogram, percentiles: Optional[List[float]] = None
+) -> None:
+    logging.info("Trimmed length statistics: min\tmean\tmedian\tmax")
+    logging.info(
+        "\t".join(
+            (
+                f"                           {histogram.min()}",
+                f"{histogram.mean():.3f}",
+                f"{histogram.median():.3f}",
+                f"{histogram.max()}",
+            )
         )
-        for chunk, cid in IH
     )
+    if percentiles is not None:
+        logging.info(
+            "Trimmed length percentiles: "
+            + "\t".join(f"p{q:g}={histogram.percentile(q):.3f}" for q in percentiles)
+        )
 
-    trimmed_length_list: List[int] = []
-    trimmed_counter = 0
-    parsed_counter = 0
-    for trimmed, untrimmed, trimmed_lengths in output:
-        trimmed_counter += trimmed
-        parsed_counter += untrimmed
-        trimmed_length_list.extend(trimmed_lengths)
+
+def trim_chunks(
+    args: argparse.Namespace,
+    IH: Union[FastxChunkedParser, FastxRangeChunker, FastxSharedMemoryChunker],
+    run_chunk: Callable,
+    setup_context: Callable,
+) -> None:
+    """Trims records by quality, chunk by chunk, and reports on the trimming.
+
+    Arguments:
+        args {argparse.Namespace} -- script arguments
+        IH {Union[FastxChunkedParser, FastxRangeChunker, FastxSharedMemoryChunker]}
+            -- input handler
+        run_chunk {Callable} -- chunk function, returning ChunkDetails
+        setup_context {Callable} -- builds a worker's context from args
+    """
+    logging.info("Trimming...")
+    trimmed_counter, parsed_counter, histogram = scriptio.run_chunks(
+        run_chunk,
+        IH,
+        args,
+        setup_context,
+        fold_chunk_details,
+        (0, 0, LengthHistogram()),
+    )
     parsed_counter += trimmed_counter
     logging.info(
         " ".join(
@@ -175,20 +271,38 @@ def run(args: argparse.Namespace) -> None:
             )
         )
     )
-    logging.info("Trimmed length statistics: min\tmean\tmedian\tmax")
-    logging.info(
-        "\t".join(
-            (
-                f"                           {min(trimmed_length_list)}",
-                f"{np.mean(trimmed_length_list):.3f}",
-                f"{np.median(trimmed_length_list):.3f}",
-                f"{max(trimmed_length_list)}",
-            )
-        )
+    if 0 != histogram.total:
+        log_length_stats(histogram, args.percentiles)
+        if args.length_stats:
+            stats_path = histogram.export(args.output, "trimmed_length")
+            logging.info(f"Trimmed length distribution written to {stats_path}")
+
+    if OutputModes.MERGE == scriptio.get_output_mode(args):
+        logging.info("Merging batch output...")
+        merger = ChunkMerger(args.temp_dir, None)
+        merger.do(args.output, IH.last_chunk_id, "Writing trimmed records")
+
+
+@enable_rich_assert
+def run(args: argparse.Namespace) -> None:
+    logging.info("[bold underline red]General[/]")
+    logging.info(f"Input\t\t{args.input}")
+    side_label = "both ends" if "both" == args.side else f"{args.side}'"
+    logging.info(f"Trimming\tQSCORE < {args.qscore} from {side_label}")
+    logging.info(f"Method\t\t{args.method}")
+    logging.info(f"Threads\t\t{args.threads}")
+    logging.info(f"Chunk size\t{args.chunk_size}")
+
+    fmt, IH = scriptio.get_input_handler(
+        args.input,
+        args.chunk_size,
+        args.parser,
+        args.inflate_threads,
+        args.transport,
     )
+    assert FastxFormats.FASTQ == fmt, "Trimming by quality requires a fastq file."
 
-    logging.info("Merging batch output...")
-    merger = ChunkMerger(args.temp_dir, None)
-    merger.do(args.output, IH.last_chunk_id, "Writing trimmed records")
+    logging.info("[bold underline red]Running[/]")
+    trim_chunks(args, IH, run_chunk, setup_chunk_context)
 
     logging.info("Done. :thumbs_up: :smiley:")
@@ -4,20 +4,25 @@
 """
 
 import argparse
+from collections import Counter
 from fastx_barber import scriptio
 from fastx_barber.exception import enable_rich_assert
-from fastx_barber.const import PATTERN_EXAMPLE
+from fastx_barber.const import (
+    ExecutionBackends,
+    FastxFormats,
+    OutputModes,
+    PATTERN_EXAMPLE,
+)
 from fastx_barber.io import ChunkMerger
 from fastx_barber.match import FastxMatcher
 from fastx_barber.scripts import arguments as ap
-from fastx_barber.seqio import SimpleFastxRecord, get_fastx_format
-from fastx_barber.trim import get_fastx_trimmer
-import joblib  # type: ignore
+from fastx_barber.seqio import get_fastx_format, load_chunk, release_chunk, FastxChunk
+from fastx_barber.trim import get_fastx_trimmer, ABCTrimmer
 import logging
 import regex  # type: ignore
 from rich.logging import RichHandler  # type: ignore
 import sys
-from typing import List
+from typing import NamedTuple, Type
 
 logging.basicConfig(
     level=logging.INFO,
@@ -59,11 +64,22 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 
     advanced = parser.add_argument_group("advanced arguments")
     advanced = ap.add_unmatched_output_option(advanced)
+    advanced = ap.add_match_window_option(advanced)
+    advanced = ap.add_match_timeout_option(advanced)
+    advanced = ap.add_match_cache_option(advanced)
     advanced = ap.add_compress_level_option(advanced)
+    advanced = ap.add_bgzf_option(advanced)
+    advanced = ap.add_compress_threads_option(advanced)
     advanced = ap.add_log_file_option(advanced)
 
     advanced = ap.add_chunk_size_option(advanced)
+    advanced = ap.add_parser_option(advanced)
+    advanced = ap.add_inflate_threads_option(advanced)
+    advanced = ap.add_transport_option(advanced)
+    advanced = ap.add_output_mode_option(advanced)
     advanced = ap.add_threads_option(advanced)
+    advanced = ap.add_backend_option(advanced)
+    advanced = ap.add_max_in_flight_option(advanced)
     advanced = ap.add_tempdir_option(advanced)
 
     parser.set_defaults(parse=parse_arguments, run=run)
@@ -74,6 +90,11 @@ def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentPars
 @enable_rich_assert
 def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     args.threads = ap.check_threads(args.threads)
+    args.inflate_threads = ap.check_threads(args.inflate_threads)
+    args.compress_threads = ap.check_threads(args.compress_threads)
+    args.match_window = ap.check_match_window(args.match_window)
+    args.match_timeout = ap.check_match_timeout(args.match_timeout)
+    args.match_cache = ap.check_match_cache(args.match_cache)
     args = scriptio.set_tempdir(args)
 
     if args.pattern is None:
@@ -89,59 +110,98 @@ def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
     return args
 
 
+class ChunkContext(NamedTuple):
+    fmt: FastxFormats
+    matcher: FastxMatcher
+    trimmer: Type[ABCTrimmer]
+
+
+def setup_chunk_context(args: argparse.Namespace) -> ChunkContext:
+    fmt, _ = get_fastx_format(args.input)
+    return ChunkContext(
+        fmt,
+        FastxMatcher(
+            args.pattern,
+            args.match_window,
+            args.match_timeout,
+            args.match_cache,
+            ExecutionBackends.THREADS == scriptio.get_backend(args),
+        ),
+        get_fastx_trimmer(fmt),
+    )
+
+
 def run_chunk(
-    chunk: List[SimpleFastxRecord],
+    payload: FastxChunk,
     cid: int,
     args: argparse.Namespace,
+    context: ChunkContext,
 ):
-    fmt, _ = get_fastx_format(args.input)
+    chunk = load_chunk(payload)
     OHC = scriptio.get_chunk_handler(
-        cid, fmt, args.output, args.compress_level, args.temp_dir
+        cid,
+        context.fmt,
+        args.output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     assert OHC is not None
     UHC = scriptio.get_chunk_handler(
-        cid, fmt, args.unmatched_output, args.compress_level, args.temp_dir
+        cid,
+        context.fmt,
+        args.unmatched_output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
     )
     foutput = scriptio.get_output_fun(OHC, UHC)
 
-    matcher = FastxMatcher(args.pattern)
-    trimmer = get_fastx_trimmer(fmt)
-
-    for record in chunk:
-        match, matched = matcher.do(record)
-        if matched:
-            record = trimmer.trim_re(record, match)
-        foutput[matched](record)
+    matcher = context.matcher
+    matcher.reset()
+    trimmer = context.trimmer
+
+    if matcher.can_batch:
+        batch_match = matcher.do_batch(chunk)
+        for record, matched in zip(chunk, batch_match.matched.tolist()):
+            if matched:
+                record = trimmer.trim_len(record, batch_match.length, 5)
+            foutput[matched](record)
+    else:
+        for record in chunk:
+            match, matched = matcher.do(record)
+            if matched:
+                record = trimmer.trim_re(record, match)
+            foutput[matched](record)
 
     OHC.close()
     if UHC is not None:
         UHC.close()
 
-    return (matcher.matched_count, len(chunk))
+    release_chunk(payload)
+
+    return (matcher.matched_count, len(chunk), matcher.stats)
 
 
 @enable_rich_assert
 def run(args: argparse.Namespace) -> None:
     ap.log_args(args)
 
-    fmt, IH = scriptio.get_input_handler(args.input, args.chunk_size)
+    fmt, IH = scriptio.get_input_handler(
+        args.input,
+        args.chunk_size,
+        args.parser,
+        args.inflate_threads,
+        args.transport,
+    )
 
     logging.info("[bold underline red]Running[/]")
     logging.info("Trimming...")
-    chunk_details = joblib.Parallel(n_jobs=args.threads, verbose=10)(
-        joblib.delayed(run_chunk)(
-            chunk,
-            cid,
-            args,
-        )
-        for chunk, cid in IH
+    matched_counter, parsed_counter, match_stats = scriptio.run_chunks(
+        run_chunk, IH, args, setup_chunk_context, initial=(0, 0, Counter())
     )
-
-    parsed_counter = 0
-    matched_counter = 0
-    for matched, parsed in chunk_details:
-        matched_counter += matched
-        parsed_counter += parsed
     logging.info(
         " ".join(
             (
@@ -151,11 +211,15 @@ def run(args: argparse.Namespace) -> None:
             )
         )
     )
-
-    logging.info("Merging batch output...")
-    merger = ChunkMerger(args.temp_dir, None)
-    merger.do(args.output, IH.last_chunk_id, "Writing matched records")
-    if args.unmatched_output is not None:
-        merger.do(args.unmatched_output, IH.last_chunk_id, "Writing unmatched records")
+    scriptio.log_match_stats(match_stats)
+
+    if OutputModes.MERGE == scriptio.get_output_mode(args):
+        logging.info("Merging batch output...")
+        merger = ChunkMerger(args.temp_dir, None)
+        merger.do(args.output, IH.last_chunk_id, "Writing matched records")
+        if args.unmatched_output is not None:
+            merger.do(
+                args.unmatched_output, IH.last_chunk_id, "Writing unmatched records"
+            )
 
     logging.info("Done. :thumbs_up: :smiley:")
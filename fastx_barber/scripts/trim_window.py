@@ -0,0 +1,215 @@
+"""
+@author: Gabriele Girelli
+@contact: gigi.ga90@gmail.com
+"""
+
+import argparse
+from fastx_barber import scriptio
+from fastx_barber.exception import enable_rich_assert
+from fastx_barber.const import FastxFormats
+from fastx_barber.qual import QualityIO
+from fastx_barber.scripts import arguments as ap
+from fastx_barber.scripts.trim_qual import ChunkDetails, trim_chunks
+from fastx_barber.seqio import (
+    get_fastx_format,
+    load_chunk,
+    release_chunk,
+    FastxChunk,
+    SimpleFastqRecord,
+)
+from fastx_barber.trim import FastqWindowTrimmer, LengthHistogram
+import logging
+import numpy as np  # type: ignore
+from rich.logging import RichHandler  # type: ignore
+import sys
+from typing import cast, List, NamedTuple
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(message)s",
+    handlers=[RichHandler(markup=True, rich_tracebacks=True)],
+)
+
+
+def init_parser(subparsers: argparse._SubParsersAction) -> argparse.ArgumentParser:
+    parser = subparsers.add_parser(
+        "window",
+        description="""Trim a FASTQ file by quality, with a sliding window.
+        Each read is cut at the first window (from the 5' end) with mean QSCORE
+        below the threshold, as Trimmomatic's SLIDINGWINDOW.""",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        help="Trim a FASTQ file by quality, with a sliding window.",
+    )
+
+    parser.add_argument(
+        "input",
+        type=str,
+        metavar="in.fastq[.gz]",
+        help="""Path to the fastq file to trim.""",
+    )
+    parser.add_argument(
+        "output",
+        type=str,
+        metavar="out.fastq[.gz]",
+        help="""Path to fastq file where to write
+        trimmed records. Format will match the input.""",
+    )
+
+    parser.add_argument(
+        "-w",
+        "--window-size",
+        type=int,
+        default=4,
+        help="Window size, in bases. Default: 4",
+    )
+    parser.add_argument(
+        "-q",
+        "--qscore",
+        type=int,
+        default=0,
+        help="""Mean QSCORE threshold. Reads are cut at the first window with lower
+        mean QSCORE. Default: 0""",
+    )
+    parser.add_argument(
+        "--percentiles",
+        type=float,
+        nargs="+",
+        help="""Space-separated percentiles of trimmed length to report,
+        between 0 and 100. By default, only min, mean, median, and max are
+        reported.""",
+    )
+    parser.add_argument(
+        "--length-stats",
+        action="store_const",
+        const=True,
+        default=False,
+        help="""Export the trimmed length distribution to a tsv file, next to the
+        output file.""",
+    )
+
+    parser = ap.add_version_option(parser)
+
+    advanced = parser.add_argument_group("advanced arguments")
+    advanced = ap.add_phred_offset_option(advanced)
+    advanced = ap.add_compress_level_option(advanced)
+    advanced = ap.add_bgzf_option(advanced)
+    advanced = ap.add_compress_threads_option(advanced)
+    advanced = ap.add_log_file_option(advanced)
+
+    advanced = ap.add_chunk_size_option(advanced)
+    advanced = ap.add_parser_option(advanced)
+    advanced = ap.add_inflate_threads_option(advanced)
+    advanced = ap.add_transport_option(advanced)
+    advanced = ap.add_output_mode_option(advanced)
+    advanced = ap.add_threads_option(advanced)
+    advanced = ap.add_backend_option(advanced)
+    advanced = ap.add_max_in_flight_option(advanced)
+    advanced = ap.add_tempdir_option(advanced)
+
+    parser.set_defaults(parse=parse_arguments, run=run)
+
+    return parser
+
+
+@enable_rich_assert
+def parse_arguments(args: argparse.Namespace) -> argparse.Namespace:
+    args.threads = ap.check_threads(args.threads)
+    args.inflate_threads = ap.check_threads(args.inflate_threads)
+    args.compress_threads = ap.check_threads(args.compress_threads)
+    args = scriptio.set_tempdir(args)
+
+    assert 0 < args.window_size, "window size (-w) must be positive."
+
+    if args.percentiles is not None:
+        assert all(
+            0 <= q <= 100 for q in args.percentiles
+        ), "percentiles must be in the [0, 100] range."
+
+    if 0 == args.qscore:
+        logging.info(
+            "Trimming QSCORE threshold (-q) equal to 0. "
+            + "Nothing to do. :person_shrugging:"
+        )
+        sys.exit()
+
+    if args.log_file is not None:
+        scriptio.add_log_file_handler(args.log_file)
+
+    return args
+
+
+class ChunkContext(NamedTuple):
+    fmt: FastxFormats
+    trimmer: FastqWindowTrimmer
+    qio: QualityIO
+
+
+def setup_chunk_context(args: argparse.Namespace) -> ChunkContext:
+    fmt, _ = get_fastx_format(args.input)
+    return ChunkContext(
+        fmt,
+        FastqWindowTrimmer(args.window_size, args.qscore),
+        QualityIO(args.phred_offset),
+    )
+
+
+def run_chunk(
+    payload: FastxChunk,
+    cid: int,
+    args: argparse.Namespace,
+    context: ChunkContext,
+) -> ChunkDetails:
+    chunk = cast(List[SimpleFastqRecord], load_chunk(payload))
+    OHC = scriptio.get_chunk_handler(
+        cid,
+        context.fmt,
+        args.output,
+        args.compress_level,
+        args.temp_dir,
+        bgzf=args.bgzf,
+        compress_threads=args.compress_threads,
+    )
+    assert OHC is not None
+
+    trimmer = context.trimmer
+
+    qbatch = context.qio.phred_to_qscore_batch([record[2] for record in chunk])
+    kept_lengths = trimmer.find_cuts(qbatch)
+    for record, length in zip(chunk, kept_lengths.tolist()):
+        if 0 < length:
+            OHC.write(trimmer.trim(record, length))
+
+    OHC.close()
+
+    release_chunk(payload)
+
+    trimmed_lengths = qbatch.lengths - kept_lengths
+    histogram = LengthHistogram()
+    histogram.add_all(trimmed_lengths)
+    trimmed_counter = int(np.count_nonzero(trimmed_lengths))
+    return (trimmed_counter, len(chunk) - trimmed_counter, histogram)
+
+
+@enable_rich_assert
+def run(args: argparse.Namespace) -> None:
+    logging.info("[bold underline red]General[/]")
+    logging.info(f"Input\t\t{args.input}")
+    logging.info(
+        f"Trimming\tmean QSCORE < {args.qscore} in {args.window_size} nt windows"
+    )
+    logging.info(f"Threads\t\t{args.threads}")
+    logging.info(f"Chunk size\t{args.chunk_size}")
+
+    fmt, IH = scriptio.get_input_handler(
+        args.input,
+        args.chunk_size,
+        args.parser,
+        args.inflate_threads,
+        args.transport,
+    )
+    assert FastxFormats.FASTQ == fmt, "Trimming by quality requires a fastq file."
+
+    logging.info("[bold underline red]Running[/]")
+    trim_chunks(args, IH, run_chunk, setup_chunk_context)
+
+    logging.info("Done. :thumbs_up: :smiley:")
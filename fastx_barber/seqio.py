@@ -4,22 +4,59 @@
 """
 
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
 from Bio import SeqIO  # type: ignore
 from fastx_barber.const import FlagData
+from fastx_barber.gzio import open_bgzf_text, open_gzip_blocks, open_gzip_text
 from fastx_barber.io import is_gzipped
-from fastx_barber.const import FastxFormats, FastxExtensions
+from fastx_barber.shm import (
+    open_shared_memory,
+    release_shared_memory,
+    SharedMemoryPool,
+)
+from fastx_barber.const import FastxFormats, FastxExtensions, FastxParsers
 import gzip
+import io
+from itertools import chain, repeat
+import mmap
 import os
-from typing import Any, Dict, IO, Iterator, List, Optional, Set, Tuple, Type, Union
+import threading
+from typing import (
+    Any,
+    cast,
+    Dict,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+import weakref
 
 SimpleFastxRecord = Tuple[str, str, Optional[str]]
 SimpleFastaRecord = Tuple[str, str, None]
 SimpleFastqRecord = Tuple[str, str, str]
 
 SimpleFastxParser = Union[
-    SeqIO.QualityIO.FastqGeneralIterator, SeqIO.FastaIO.SimpleFastaParser
+    SeqIO.QualityIO.FastqGeneralIterator,
+    SeqIO.FastaIO.SimpleFastaParser,
+    Iterator[SimpleFastxRecord],
 ]
 
+BytesBuffer = Union[bytes, bytearray, mmap.mmap]
+
+BYTES_BLOCK_SIZE = 4 * 1024 * 1024
+RANGE_SAMPLE_SIZE = 1024 * 1024
+SPLIT_MAX_OPEN_HANDLES = 128
+
+_captured_outputs = threading.local()
+_direct_outputs = threading.local()
+
 
 def get_fastx_format(path: str) -> Tuple[FastxFormats, bool]:
     """
@@ -36,12 +73,268 @@ def get_fastx_format(path: str) -> Tuple[FastxFormats, bool]:
         return (FastxFormats.NONE, False)
 
 
-def get_fastx_parser(path: str) -> Tuple[SimpleFastxParser, FastxFormats]:
-    """Retrieves appropriate simple parser and associated format (fasta or fastq)."""
+class ABCBytesSplitter(metaclass=ABCMeta):
+    """Bytes-level record splitter abstract base class
+
+    Buffers (bytes or mmap) are scanned in blocks: record boundaries are located
+    with bytes-level find, and each block is decoded and split in a single pass.
+
+    Extends:
+        metaclass=ABCMeta
+
+    Variables:
+        _pos {int} -- buffer position after the last complete record
+        _block_size {int} -- number of bytes decoded at once
+    """
+
+    _pos: int = 0
+    _block_size: int = BYTES_BLOCK_SIZE
+
+    @property
+    def pos(self) -> int:
+        return self._pos
+
+    def split(
+        self,
+        buf: Union[BytesBuffer, memoryview],
+        start: int = 0,
+        end: Optional[int] = None,
+        final: bool = True,
+    ) -> Iterator[SimpleFastxRecord]:
+        """Split records from a buffer
+
+        Arguments:
+            buf {Union[BytesBuffer, memoryview]} -- buffer to split
+
+        Keyword Arguments:
+            start {int} -- position of the first record (default: {0})
+            end {Optional[int]} -- position after the last record (default: {None})
+            final {bool} -- whether the buffer ends with a complete record. If False,
+                            splitting stops before a trailing incomplete record,
+                            and self.pos points to its start (default: {True})
+        """
+        return chain.from_iterable(self.split_blocks(buf, start, end, final))
+
+    def split_blocks(
+        self,
+        buf: Union[BytesBuffer, memoryview],
+        start: int = 0,
+        end: Optional[int] = None,
+        final: bool = True,
+    ) -> Iterator[List[SimpleFastxRecord]]:
+        """Split records from a buffer, one list of records per decoded block.
+
+        See split for details on the arguments. Blocks of a memoryview or bytearray
+        are copied one at a time, so that the buffer as a whole is never duplicated.
+        """
+        end = len(buf) if end is None else end
+        self._pos = start
+        block_size = self._block_size
+        while self._pos < end:
+            block_end = min(self._pos + block_size, end)
+            is_last = final and block_end == end
+            block = buf[self._pos : block_end]
+            if not isinstance(block, bytes):
+                block = bytes(block)
+            records, consumed = self._split_block(block, is_last)
+            if 0 == consumed:
+                if block_end == end:
+                    return
+                block_size *= 2
+                continue
+            self._pos += consumed
+            block_size = self._block_size
+            yield records
+
+    @abstractmethod
+    def _split_block(
+        self, block: bytes, is_last: bool
+    ) -> Tuple[List[SimpleFastxRecord], int]:
+        """Split the complete records at the start of a block
+
+        Decorators:
+            abstractmethod
+
+        Arguments:
+            block {bytes} -- block starting with a record
+            is_last {bool} -- whether the block ends with a complete record
+
+        Returns:
+            Tuple[List[SimpleFastxRecord], int] -- records and consumed bytes
+        """
+        pass
+
+    @staticmethod
+    def _decode(block: bytes, end: Optional[int] = None) -> str:
+        """Decodes a block, up to end (excluded), without copying it."""
+        if end is None or end == len(block):
+            text = block.decode()
+        else:
+            with memoryview(block) as view:
+                text = str(view[:end], "utf-8")
+        if "\r" in text:
+            text = text.replace("\r", "")
+        return text
+
+
+class FastaBytesSplitter(ABCBytesSplitter):
+    def _split_block(
+        self, block: bytes, is_last: bool
+    ) -> Tuple[List[SimpleFastxRecord], int]:
+        offset = 0
+        if not block.startswith(b">"):
+            offset = block.find(b"\n>") + 1
+            if 0 == offset:
+                return ([], len(block) if is_last else 0)
+        if is_last:
+            block_end = len(block)
+        else:
+            block_end = block.rfind(b"\n>", offset) + 1
+            if 0 == block_end:
+                return ([], 0)
+        records: List[SimpleFastxRecord] = []
+        for record in self._decode(block[offset + 1 : block_end]).split("\n>"):
+            header, _, seq = record.partition("\n")
+            seq = "".join(map(str.rstrip, seq.split("\n"))).replace(" ", "")
+            records.append((header.rstrip(), seq, None))
+        return (records, block_end)
+
+
+class FastqBytesSplitter(ABCBytesSplitter):
+    def _split_block(
+        self, block: bytes, is_last: bool
+    ) -> Tuple[List[SimpleFastxRecord], int]:
+        block_end = len(block) if is_last else block.rfind(b"\n") + 1
+        if 0 == block_end:
+            return ([], 0)
+        text = self._decode(block, block_end)
+        offset = len(text) - len(text.lstrip("\n"))
+        lines = text[offset:].split("\n")
+        if is_last:
+            while 0 != len(lines) and "" == lines[-1]:
+                lines.pop()
+            if 0 != len(lines) % 4:
+                raise ValueError("End of file without quality information.")
+            n_lines = len(lines)
+        else:
+            n_lines = (len(lines) - 1) // 4 * 4
+            if 0 == n_lines:
+                return ([], 0)
+        headers = lines[0:n_lines:4]
+        seqs = list(map(str.rstrip, lines[1:n_lines:4]))
+        quals = list(map(str.rstrip, lines[3:n_lines:4]))
+        assert all(
+            map(str.startswith, headers, repeat("@"))
+        ), "records should start with '@'."
+        assert all(
+            map(str.startswith, lines[2:n_lines:4], repeat("+"))
+        ), "sequence and quality not separated by '+'."
+        if list(map(len, seqs)) != list(map(len, quals)):
+            raise ValueError("Lengths of sequence and quality values differ.")
+        records: List[SimpleFastxRecord] = list(
+            zip([h[1:].rstrip() for h in headers], seqs, quals)
+        )
+        if is_last:
+            return (records, block_end)
+        if text.isascii() and len(text) == block_end:
+            trailing = lines[n_lines:]
+            consumed = len(text) - sum(map(len, trailing)) - len(trailing) + 1
+        else:
+            offset = len(block) - len(block.lstrip(b"\r\n"))
+            consumed = block_end - len(
+                block[offset:block_end].split(b"\n", n_lines)[-1]
+            )
+        return (records, consumed)
+
+
+def get_bytes_splitter(fmt: FastxFormats) -> Type[ABCBytesSplitter]:
+    """Retrieves appropriate bytes-level record splitter class."""
+    if FastxFormats.FASTA == fmt:
+        return FastaBytesSplitter
+    elif FastxFormats.FASTQ == fmt:
+        return FastqBytesSplitter
+    return ABCBytesSplitter
+
+
+def iter_byte_blocks(
+    handle: IO[bytes], block_size: int = BYTES_BLOCK_SIZE
+) -> Iterator[bytes]:
+    """Reads a binary handle in blocks of (up to) block_size bytes."""
+    block = handle.read(block_size)
+    while 0 != len(block):
+        yield block
+        block = handle.read(block_size)
+
+
+def split_byte_blocks(
+    splitter: ABCBytesSplitter, blocks: Iterable[bytes]
+) -> Iterator[SimpleFastxRecord]:
+    """Splits records from consecutive byte blocks.
+
+    Incomplete trailing records are carried over to the next block.
+    """
+    return chain.from_iterable(_split_byte_blocks(splitter, blocks))
+
+
+def _split_byte_blocks(
+    splitter: ABCBytesSplitter, blocks: Iterable[bytes]
+) -> Iterator[List[SimpleFastxRecord]]:
+    leftover = b""
+    for block in blocks:
+        buf = leftover + block if 0 != len(leftover) else block
+        yield from splitter.split_blocks(buf, final=False)
+        leftover = buf[splitter.pos :]
+    if 0 != len(leftover):
+        yield from splitter.split_blocks(leftover, final=True)
+
+
+def _split_mmap_blocks(
+    path: str, fmt: FastxFormats
+) -> Iterator[List[SimpleFastxRecord]]:
+    with open(path, "rb") as IH:
+        if 0 == os.fstat(IH.fileno()).st_size:
+            return
+        with mmap.mmap(IH.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                buf.madvise(mmap.MADV_SEQUENTIAL)
+            yield from get_bytes_splitter(fmt)().split_blocks(buf)
+
+
+def _split_gzip_blocks(
+    path: str, fmt: FastxFormats, threads: int = 1
+) -> Iterator[List[SimpleFastxRecord]]:
+    yield from _split_byte_blocks(
+        get_bytes_splitter(fmt)(), open_gzip_blocks(path, threads)
+    )
+
+
+def get_bytes_parser(
+    path: str, fmt: FastxFormats, gzipped: bool, inflate_threads: int = 1
+) -> Iterator[SimpleFastxRecord]:
+    """Parses a fastx file with bytes-level scanning.
+
+    Uncompressed files are memory-mapped, gzipped ones are streamed in blocks.
+    """
+    if gzipped:
+        return chain.from_iterable(_split_gzip_blocks(path, fmt, inflate_threads))
+    return chain.from_iterable(_split_mmap_blocks(path, fmt))
+
+
+def get_fastx_parser(
+    path: str,
+    engine: FastxParsers = FastxParsers.BIOPYTHON,
+    inflate_threads: int = 1,
+) -> Tuple[SimpleFastxParser, FastxFormats]:
+    """Retrieves appropriate simple parser and associated format (fasta or fastq).
+
+    Multi-member gzipped input (e.g., BGZF) is inflated by inflate_threads threads.
+    """
     fmt, gzipped = get_fastx_format(path)
+    if FastxParsers.MMAP == engine and FastxFormats.NONE != fmt:
+        return (get_bytes_parser(path, fmt, gzipped, inflate_threads), fmt)
     handle: Union[str, IO] = path
     if gzipped:
-        handle = gzip.open(path, "rt")
+        handle = open_gzip_text(path, inflate_threads)
     else:
         handle = open(path, "r+")
     assert fmt in FastxFormats
@@ -97,6 +390,391 @@ class FastxChunkedParser(object):
         return self
 
 
+class FastxByteRange(NamedTuple):
+    """Record-aligned byte range of an uncompressed fastx file
+
+    Variables:
+        path {str} -- path to fastx file
+        fmt {FastxFormats} -- fastx format
+        start {int} -- position of the first record
+        end {int} -- position after the last record
+    """
+
+    path: str
+    fmt: FastxFormats
+    start: int
+    end: int
+
+    def load(self) -> List[SimpleFastxRecord]:
+        """Parses the records in the range."""
+        with open(self.path, "rb") as IH:
+            with mmap.mmap(IH.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                splitter = get_bytes_splitter(self.fmt)()
+                return list(splitter.split(buf, self.start, self.end))
+
+
+class FastxSharedChunk(NamedTuple):
+    """Raw fastx records stored in a shared memory segment
+
+    Variables:
+        name {str} -- shared memory segment name
+        fmt {FastxFormats} -- fastx format
+        size {int} -- number of stored bytes
+    """
+
+    name: str
+    fmt: FastxFormats
+    size: int
+
+    def load(self) -> List[SimpleFastxRecord]:
+        """Parses the stored records, straight from the shared memory segment."""
+        with open_shared_memory(self.name, self.size) as data:
+            return list(get_bytes_splitter(self.fmt)().split(data))
+
+    def release(self) -> None:
+        """Flags the segment as free for reuse by the reader."""
+        release_shared_memory(self.name)
+
+
+FastxChunk = Union[List[SimpleFastxRecord], FastxByteRange, FastxSharedChunk]
+
+
+def load_chunk(chunk: FastxChunk) -> List[SimpleFastxRecord]:
+    """Retrieves the records of a chunk, parsing them if needed."""
+    if isinstance(chunk, list):
+        return chunk
+    return chunk.load()
+
+
+def release_chunk(chunk: FastxChunk) -> None:
+    """Releases the resources held by a chunk, once its output is written."""
+    if isinstance(chunk, FastxSharedChunk):
+        chunk.release()
+
+
+def find_record_start(buf: BytesBuffer, fmt: FastxFormats, pos: int) -> int:
+    """Finds the start of the first record at or after pos.
+
+    A fastq record starts with a line starting with '@', followed two lines later
+    by a line starting with '+'. A quality line starting with '@' is followed two
+    lines later by a sequence line instead.
+
+    Arguments:
+        buf {BytesBuffer} -- uncompressed fastx buffer
+        fmt {FastxFormats} -- fastx format
+        pos {int} -- search start
+
+    Returns:
+        int -- record start, or buffer length if no record is found
+    """
+    if 0 == pos:
+        return 0
+    line_start = buf.find(b"\n", pos - 1) + 1
+    if FastxFormats.FASTA == fmt:
+        while 0 != line_start and b">" != buf[line_start : line_start + 1]:
+            line_start = buf.find(b"\n", line_start) + 1
+    else:
+        while 0 != line_start:
+            if b"@" == buf[line_start : line_start + 1]:
+                plus_line = buf.find(b"\n", line_start)
+                plus_line = buf.find(b"\n", plus_line + 1) + 1 if -1 != plus_line else 0
+                if 0 != plus_line and b"+" == buf[plus_line : plus_line + 1]:
+                    return line_start
+            line_start = buf.find(b"\n", line_start) + 1
+    return len(buf) if 0 == line_start else line_start
+
+
+def estimate_chunk_stride(
+    buf: BytesBuffer, fmt: FastxFormats, chunk_size: int, final: bool = True
+) -> int:
+    """Estimates the byte size of chunk_size records.
+
+    The average record size is calculated on the first RANGE_SAMPLE_SIZE bytes.
+
+    Arguments:
+        buf {BytesBuffer} -- uncompressed fastx buffer, starting with a record
+        fmt {FastxFormats} -- fastx format
+        chunk_size {int} -- number of records per chunk
+
+    Keyword Arguments:
+        final {bool} -- whether buf ends with a complete record (default: {True})
+
+    Returns:
+        int -- estimated chunk size in bytes
+    """
+    sample_end = min(len(buf), RANGE_SAMPLE_SIZE)
+    splitter = get_bytes_splitter(fmt)()
+    n_records = sum(
+        len(records)
+        for records in splitter.split_blocks(
+            buf, 0, sample_end, final and sample_end == len(buf)
+        )
+    )
+    if 0 == n_records:
+        return max(1, len(buf))
+    return max(1, splitter.pos * chunk_size // n_records)
+
+
+class FastxRangeChunker(object):
+    """Chunker of uncompressed fasta and fastq files in record-aligned byte ranges.
+
+    Ranges are found without parsing the records: the byte size of a chunk is
+    estimated from the average record size at the beginning of the file, so that
+    chunks hold about chunk_size records each.
+
+    Variables:
+        __path {str} -- path to fastx file
+        __fmt {FastxFormats} -- fastx format
+        __chunk_size {int} -- number of records per chunk (approximated)
+        __chunk_counter {int} -- number of chunks yielded
+    """
+
+    __path: str
+    __fmt: FastxFormats
+    __chunk_size: int
+    __chunk_counter: int = 0
+
+    def __init__(self, path: str, fmt: FastxFormats, chunk_size: int):
+        super(FastxRangeChunker, self).__init__()
+        assert fmt in (FastxFormats.FASTA, FastxFormats.FASTQ)
+        assert chunk_size > 0
+        self.__path = path
+        self.__fmt = fmt
+        self.__chunk_size = chunk_size
+
+    @property
+    def chunk_size(self):
+        return self.__chunk_size
+
+    @property
+    def last_chunk_id(self):
+        return self.__chunk_counter
+
+    def __iter__(self) -> Iterator[Tuple[FastxByteRange, int]]:
+        with open(self.__path, "rb") as IH:
+            if 0 == os.fstat(IH.fileno()).st_size:
+                return
+            with mmap.mmap(IH.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                stride = estimate_chunk_stride(buf, self.__fmt, self.__chunk_size)
+                start = 0
+                while start < len(buf):
+                    end = find_record_start(
+                        buf, self.__fmt, min(start + stride, len(buf))
+                    )
+                    self.__chunk_counter += 1
+                    yield (
+                        FastxByteRange(self.__path, self.__fmt, start, end),
+                        self.__chunk_counter,
+                    )
+                    start = end
+
+
+class FastxSharedMemoryChunker(object):
+    """Chunker of fasta and fastq files into shared memory segments.
+
+    The (inflated) input is cut in record-aligned chunks of raw bytes, without
+    parsing the records, and each chunk is copied into a shared memory segment.
+    Segments are reused once released by the workers, and unlinked when the
+    chunker is garbage collected. As for FastxRangeChunker, chunks hold about
+    chunk_size records each.
+
+    Variables:
+        __path {str} -- path to fastx file
+        __fmt {FastxFormats} -- fastx format
+        __gzipped {bool} -- whether the input is gzipped
+        __chunk_size {int} -- number of records per chunk (approximated)
+        __inflate_threads {int} -- inflating threads for gzipped input
+        __chunk_counter {int} -- number of chunks yielded
+        __pool {SharedMemoryPool} -- shared memory segments
+    """
+
+    __path: str
+    __fmt: FastxFormats
+    __gzipped: bool
+    __chunk_size: int
+    __inflate_threads: int
+    __chunk_counter: int = 0
+    __pool: SharedMemoryPool
+
+    def __init__(self, path: str, chunk_size: int, inflate_threads: int = 1):
+        super(FastxSharedMemoryChunker, self).__init__()
+        self.__fmt, self.__gzipped = get_fastx_format(path)
+        assert self.__fmt in (FastxFormats.FASTA, FastxFormats.FASTQ)
+        assert chunk_size > 0
+        self.__path = path
+        self.__chunk_size = chunk_size
+        self.__inflate_threads = inflate_threads
+        self.__pool = SharedMemoryPool()
+        weakref.finalize(self, self.__pool.close)
+
+    @property
+    def chunk_size(self):
+        return self.__chunk_size
+
+    @property
+    def last_chunk_id(self):
+        return self.__chunk_counter
+
+    def close(self) -> None:
+        """Unlinks the shared memory segments, once all chunks are processed."""
+        self.__pool.close()
+
+    def __iter_blocks(self) -> Iterator[bytes]:
+        if self.__gzipped:
+            yield from open_gzip_blocks(self.__path, self.__inflate_threads)
+        else:
+            with open(self.__path, "rb") as IH:
+                yield from iter_byte_blocks(IH)
+
+    def __cut(
+        self, buf: bytearray, stride: int, final: bool
+    ) -> Iterator[Tuple[FastxSharedChunk, int]]:
+        while stride <= len(buf) or (final and 0 != len(buf)):
+            end = find_record_start(buf, self.__fmt, min(stride, len(buf)))
+            if end == len(buf) and not final:
+                return
+            with memoryview(buf) as view:
+                name, size = self.__pool.store(view[:end])
+            del buf[:end]
+            self.__chunk_counter += 1
+            yield (FastxSharedChunk(name, self.__fmt, size), self.__chunk_counter)
+
+    def __iter__(self) -> Iterator[Tuple[FastxSharedChunk, int]]:
+        buf = bytearray()
+        stride = 0
+        for block in self.__iter_blocks():
+            buf += block
+            if 0 == stride:
+                if RANGE_SAMPLE_SIZE > len(buf):
+                    continue
+                stride = estimate_chunk_stride(
+                    bytes(buf[:RANGE_SAMPLE_SIZE]), self.__fmt, self.__chunk_size, False
+                )
+            yield from self.__cut(buf, stride, False)
+        if 0 != len(buf):
+            if 0 == stride:
+                stride = estimate_chunk_stride(
+                    bytes(buf), self.__fmt, self.__chunk_size
+                )
+            yield from self.__cut(buf, stride, True)
+
+
+class CapturedOutput(io.BytesIO):
+    """In-memory binary buffer standing in for an output file
+
+    The buffer is not discarded when closed by its writer, so that it can be
+    re-opened in append mode and its content retrieved later.
+
+    Extends:
+        io.BytesIO
+
+    Variables:
+        name {str} -- path of the output file the buffer stands in for
+    """
+
+    name: str
+
+    def __init__(self, path: str):
+        super(CapturedOutput, self).__init__()
+        self.name = path
+
+    def close(self) -> None:
+        pass
+
+
+def start_output_capture() -> None:
+    """Redirects the outputs opened by this thread's writers to memory."""
+    _captured_outputs.buffers = {}
+
+
+def is_output_captured() -> bool:
+    return getattr(_captured_outputs, "buffers", None) is not None
+
+
+def stop_output_capture() -> Dict[str, bytes]:
+    """Stops capturing outputs in this thread.
+
+    Returns:
+        Dict[str, bytes] -- captured (compressed) content, by output path
+    """
+    buffers = getattr(_captured_outputs, "buffers", None)
+    _captured_outputs.buffers = None
+    if buffers is None:
+        return {}
+    return {path: buffer.getvalue() for path, buffer in buffers.items()}
+
+
+def start_direct_output() -> None:
+    """Makes this thread's writers append to outputs already opened since.
+
+    Outputs are truncated only when first opened, so that the writers of
+    consecutive chunks can write straight to the final output files.
+    """
+    _direct_outputs.opened = set()
+
+
+def is_output_direct() -> bool:
+    return getattr(_direct_outputs, "opened", None) is not None
+
+
+def stop_direct_output() -> Set[str]:
+    """Stops direct output in this thread.
+
+    Returns:
+        Set[str] -- paths of the outputs opened since direct output started
+    """
+    opened = getattr(_direct_outputs, "opened", None)
+    _direct_outputs.opened = None
+    return set() if opened is None else opened
+
+
+def open_output(
+    path: str,
+    mode: str = "w",
+    compress_level: int = 6,
+    bgzf: bool = False,
+    compress_threads: int = 1,
+) -> IO[str]:
+    """Opens an output file in text mode, compressing it if gzipped.
+
+    When output capture is active, writes go to an in-memory buffer instead. With
+    direct output, outputs opened before are appended to instead of truncated.
+
+    Arguments:
+        path {str} -- path to output file
+
+    Keyword Arguments:
+        mode {str} -- either "w" or "a" (default: {"w"})
+        compress_level {int} -- gzip compression level (default: {6})
+        bgzf {bool} -- write gzipped output as BGZF (default: {False})
+        compress_threads {int} -- BGZF compressing threads (default: {1})
+
+    Returns:
+        IO[str] -- text handle
+    """
+    assert mode in ("w", "a"), f"unsupported output mode: '{mode}'."
+    _, _, gzipped = is_gzipped(path)
+    if is_output_direct():
+        if path in _direct_outputs.opened:
+            mode = "a"
+        _direct_outputs.opened.add(path)
+    target: Union[str, IO[bytes]] = path
+    if is_output_captured():
+        buffers = _captured_outputs.buffers
+        if "w" == mode or path not in buffers:
+            buffers[path] = CapturedOutput(path)
+        buffers[path].seek(0, os.SEEK_END)
+        target = buffers[path]
+    if gzipped and bgzf:
+        return open_bgzf_text(target, f"{mode}t", compress_level, compress_threads)
+    elif gzipped:
+        return cast(IO[str], gzip.open(target, f"{mode}t", compress_level))
+    elif isinstance(target, str):
+        return open(target, mode)
+    else:
+        return io.TextIOWrapper(target)
+
+
 class ABCSimpleWriter(metaclass=ABCMeta):
     """Simple record writer abstract base class
 
@@ -109,7 +787,13 @@ class ABCSimpleWriter(metaclass=ABCMeta):
 
     _OH: IO
 
-    def __init__(self, path: str, compress_level: int = 6):
+    def __init__(
+        self,
+        path: str,
+        compress_level: int = 6,
+        bgzf: bool = False,
+        compress_threads: int = 1,
+    ):
         """Initialize simple writer
 
         Arguments:
@@ -117,13 +801,11 @@ class ABCSimpleWriter(metaclass=ABCMeta):
 
         Keyword Arguments:
             compress_level {int} -- gzip compression level (default: {6})
+            bgzf {bool} -- write gzipped output as BGZF (default: {False})
+            compress_threads {int} -- BGZF compressing threads (default: {1})
         """
         super(ABCSimpleWriter, self).__init__()
-        _, _, gzipped = is_gzipped(path)
-        if gzipped:
-            self._OH = gzip.open(path, "wt", compress_level)
-        else:
-            self._OH = open(path, "w+")
+        self._OH = open_output(path, "w", compress_level, bgzf, compress_threads)
 
     @property
     def name(self) -> str:
@@ -147,7 +829,7 @@ class ABCSimpleWriter(metaclass=ABCMeta):
 
     @staticmethod
     def close_handle(self):
-        if isinstance(self, ABCSimpleWriter):
+        if isinstance(self, (ABCSimpleWriter, ABCSimpleSplitWriter)):
             self.close()
 
 
@@ -155,8 +837,16 @@ class SimpleFastxWriter(ABCSimpleWriter):
 
     _fmt: FastxFormats
 
-    def __init__(self, path: str, compress_level: int = 6):
-        super(SimpleFastxWriter, self).__init__(path, compress_level)
+    def __init__(
+        self,
+        path: str,
+        compress_level: int = 6,
+        bgzf: bool = False,
+        compress_threads: int = 1,
+    ):
+        super(SimpleFastxWriter, self).__init__(
+            path, compress_level, bgzf, compress_threads
+        )
         self._fmt, _ = get_fastx_format(path)
         assert self._fmt in FastxFormats
 
@@ -178,8 +868,16 @@ class SimpleFastxWriter(ABCSimpleWriter):
 
 
 class SimpleFastaWriter(SimpleFastxWriter):
-    def __init__(self, path: str, compress_level: int = 6):
-        super(SimpleFastaWriter, self).__init__(path, compress_level)
+    def __init__(
+        self,
+        path: str,
+        compress_level: int = 6,
+        bgzf: bool = False,
+        compress_threads: int = 1,
+    ):
+        super(SimpleFastaWriter, self).__init__(
+            path, compress_level, bgzf, compress_threads
+        )
         assert FastxFormats.FASTA == self.format
 
     def write(self, record: SimpleFastxRecord, *args) -> None:
@@ -187,8 +885,16 @@ class SimpleFastaWriter(SimpleFastxWriter):
 
 
 class SimpleFastqWriter(SimpleFastxWriter):
-    def __init__(self, path: str, compress_level: int = 6):
-        super(SimpleFastqWriter, self).__init__(path, compress_level)
+    def __init__(
+        self,
+        path: str,
+        compress_level: int = 6,
+        bgzf: bool = False,
+        compress_threads: int = 1,
+    ):
+        super(SimpleFastqWriter, self).__init__(
+            path, compress_level, bgzf, compress_threads
+        )
         assert FastxFormats.FASTQ == self.format
 
     def write(self, record: SimpleFastxRecord, *args) -> None:
@@ -205,6 +911,18 @@ def get_fastx_writer(fmt: FastxFormats) -> Type[SimpleFastxWriter]:
 
 
 class ABCSimpleSplitWriter(metaclass=ABCMeta):
+    """Simple split record writer abstract base class
+
+    Output handles are kept open in a least-recently-used pool, which is emptied
+    on close.
+
+    Extends:
+        metaclass=ABCMeta
+
+    Variables:
+        _handles {OrderedDict[str, IO]} -- open handles, by split value
+        _max_open_handles {int} -- maximum number of open handles
+    """
 
     _base_path: str
     _root_path: str
@@ -213,8 +931,19 @@ class ABCSimpleSplitWriter(metaclass=ABCMeta):
     _split_by: Set[str]
     _compress_level: int
     _is_gzipped: bool
-
-    def __init__(self, path: str, split_key: str, compress_level: int = 6):
+    _bgzf: bool
+    _compress_threads: int
+    _handles: "OrderedDict[str, IO]"
+    _max_open_handles: int = SPLIT_MAX_OPEN_HANDLES
+
+    def __init__(
+        self,
+        path: str,
+        split_key: str,
+        compress_level: int = 6,
+        bgzf: bool = False,
+        compress_threads: int = 1,
+    ):
         super(ABCSimpleSplitWriter, self).__init__()
         self._base_path = path
         self._root_path = os.path.dirname(path)
@@ -225,11 +954,25 @@ class ABCSimpleSplitWriter(metaclass=ABCMeta):
         self._split_key = split_key
         self._split_by = set()
         self._compress_level = compress_level
+        self._bgzf = bgzf
+        self._compress_threads = compress_threads
+        self._handles = OrderedDict()
 
     @property
     def split_key(self):
         return self._split_key
 
+    @property
+    def max_open_handles(self) -> int:
+        return self._max_open_handles
+
+    @max_open_handles.setter
+    def max_open_handles(self, max_open_handles: int) -> None:
+        assert 0 < max_open_handles
+        self._max_open_handles = max_open_handles
+        while len(self._handles) > self._max_open_handles:
+            self._handles.popitem(last=False)[1].close()
+
     @property
     def split_by(self):
         return self._split_by
@@ -242,18 +985,29 @@ class ABCSimpleSplitWriter(metaclass=ABCMeta):
             self._root_path,
             f"{self._split_key}_split.{split_value}.{self._basename}",
         )
-        if self._is_gzipped:
-            if self.opened_before(split_value):
-                return gzip.open(path, "at", self._compress_level)
-            else:
-                self._split_by.add(split_value)
-                return gzip.open(path, "wt", self._compress_level)
-        else:
-            if self.opened_before(split_value):
-                return open(path, "a")
-            else:
-                self._split_by.add(split_value)
-                return open(path, "w")
+        mode = "a" if self.opened_before(split_value) else "w"
+        self._split_by.add(split_value)
+        return open_output(
+            path, mode, self._compress_level, self._bgzf, self._compress_threads
+        )
+
+    def get_handle(self, split_value: str) -> IO:
+        """Retrieves an open handle, evicting the least recently used if needed.
+
+        Arguments:
+            split_value {str} -- split flag value
+
+        Returns:
+            IO -- output buffer handle
+        """
+        if split_value in self._handles:
+            self._handles.move_to_end(split_value)
+            return self._handles[split_value]
+        if len(self._handles) >= self._max_open_handles:
+            self._handles.popitem(last=False)[1].close()
+        OH = self.open(split_value)
+        self._handles[split_value] = OH
+        return OH
 
     @abstractmethod
     def write(self, record: Any, flag_data: Dict[str, FlagData], *args) -> None:
@@ -269,15 +1023,26 @@ class ABCSimpleSplitWriter(metaclass=ABCMeta):
         pass
 
     def close(self):
-        pass
+        """Close all open output buffer handles"""
+        while 0 != len(self._handles):
+            self._handles.popitem(last=False)[1].close()
 
 
 class SimpleSplitFastxWriter(ABCSimpleSplitWriter):
 
     _fmt: FastxFormats
 
-    def __init__(self, path: str, split_key: str, compress_level: int = 6):
-        super(SimpleSplitFastxWriter, self).__init__(path, split_key, compress_level)
+    def __init__(
+        self,
+        path: str,
+        split_key: str,
+        compress_level: int = 6,
+        bgzf: bool = False,
+        compress_threads: int = 1,
+    ):
+        super(SimpleSplitFastxWriter, self).__init__(
+            path, split_key, compress_level, bgzf, compress_threads
+        )
         self._fmt, _ = get_fastx_format(path)
         assert self._fmt in FastxFormats
 
@@ -302,8 +1067,17 @@ class SimpleSplitFastxWriter(ABCSimpleSplitWriter):
 
 
 class SimpleSplitFastaWriter(SimpleSplitFastxWriter):
-    def __init__(self, path: str, split_key: str, compress_level: int = 6):
-        super(SimpleSplitFastaWriter, self).__init__(path, split_key, compress_level)
+    def __init__(
+        self,
+        path: str,
+        split_key: str,
+        compress_level: int = 6,
+        bgzf: bool = False,
+        compress_threads: int = 1,
+    ):
+        super(SimpleSplitFastaWriter, self).__init__(
+            path, split_key, compress_level, bgzf, compress_threads
+        )
         assert FastxFormats.FASTA == self.format
 
     def write(
@@ -312,14 +1086,22 @@ class SimpleSplitFastaWriter(SimpleSplitFastxWriter):
         assert (
             self._split_key in flag_data
         ), f"Cannot split by flag '{self._split_key}'. Flag not found."
-        OH = self.open(flag_data[self._split_key][0])
+        OH = self.get_handle(flag_data[self._split_key][0])
         OH.write(f">{record[0]}\n{record[1]}\n")
-        OH.close()
 
 
 class SimpleSplitFastqWriter(SimpleSplitFastxWriter):
-    def __init__(self, path: str, split_key: str, compress_level: int = 6):
-        super(SimpleSplitFastqWriter, self).__init__(path, split_key, compress_level)
+    def __init__(
+        self,
+        path: str,
+        split_key: str,
+        compress_level: int = 6,
+        bgzf: bool = False,
+        compress_threads: int = 1,
+    ):
+        super(SimpleSplitFastqWriter, self).__init__(
+            path, split_key, compress_level, bgzf, compress_threads
+        )
         assert FastxFormats.FASTQ == self.format
 
     def write(
@@ -328,9 +1110,8 @@ class SimpleSplitFastqWriter(SimpleSplitFastxWriter):
         assert (
             self._split_key in flag_data
         ), f"Cannot split by flag '{self._split_key}'. Flag not found."
-        OH = self.open(flag_data[self._split_key][0])
+        OH = self.get_handle(flag_data[self._split_key][0])
         OH.write(f"@{record[0]}\n{record[1]}\n+\n{record[2]}\n")
-        OH.close()
 
 
 def get_split_fastx_writer(fmt: FastxFormats) -> Type[SimpleSplitFastxWriter]:
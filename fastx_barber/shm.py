@@ -0,0 +1,126 @@
+"""
+@author: Gabriele Girelli
+@contact: gigi.ga90@gmail.com
+"""
+
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import sys
+from typing import cast, Iterator, List, Set, Tuple, Union
+
+SHM_FREE = 0
+SHM_BUSY = 1
+
+_owned_segments: Set[str] = set()
+
+
+def attach_shared_memory(name: str) -> SharedMemory:
+    """Attaches to a shared memory segment created by another process.
+
+    The segment is not tracked by this process, so that it is not unlinked when
+    the process exits. Segments created by this same process are attached as-is.
+
+    Arguments:
+        name {str} -- segment name
+
+    Returns:
+        SharedMemory -- attached segment
+    """
+    if name in _owned_segments:
+        return SharedMemory(name)
+    if (3, 13) <= sys.version_info:
+        return SharedMemory(name, track=False)  # type: ignore
+    segment = SharedMemory(name)
+    resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore
+    return segment
+
+
+def get_buffer(segment: SharedMemory) -> memoryview:
+    """Retrieves the buffer of an open shared memory segment."""
+    return cast(memoryview, segment.buf)
+
+
+def release_shared_memory(name: str) -> None:
+    """Flags a shared memory segment as free for reuse."""
+    segment = attach_shared_memory(name)
+    get_buffer(segment)[0] = SHM_FREE
+    segment.close()
+
+
+@contextmanager
+def open_shared_memory(name: str, size: int) -> Iterator[memoryview]:
+    """Exposes the size bytes stored in a shared memory segment, without copying.
+
+    The view is released, and the segment detached, on exiting the context.
+
+    Arguments:
+        name {str} -- segment name
+        size {int} -- number of stored bytes
+
+    Yields:
+        memoryview -- stored bytes
+    """
+    segment = attach_shared_memory(name)
+    try:
+        with get_buffer(segment)[1 : size + 1] as data:
+            yield data
+    finally:
+        segment.close()
+
+
+class SharedMemoryPool(object):
+    """Pool of reusable shared memory segments
+
+    The first byte of each segment flags whether it is in use. Segments are
+    flagged as busy when data is stored, and as free by the consumer process
+    (see release_shared_memory), after which they can store new data.
+    Segments are allocated with some headroom, so that they can be reused for
+    slightly larger data.
+
+    Variables:
+        _segments {List[SharedMemory]} -- allocated segments
+    """
+
+    _segments: List[SharedMemory]
+
+    def __init__(self):
+        super(SharedMemoryPool, self).__init__()
+        self._segments = []
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def acquire(self, size: int) -> SharedMemory:
+        """Retrieves a free segment that fits size bytes, flagging it as busy."""
+        for segment in self._segments:
+            if SHM_FREE == get_buffer(segment)[0] and size < segment.size:
+                get_buffer(segment)[0] = SHM_BUSY
+                return segment
+        segment = SharedMemory(create=True, size=(size + 1) * 5 // 4 + 1)
+        _owned_segments.add(segment.name)
+        self._segments.append(segment)
+        get_buffer(segment)[0] = SHM_BUSY
+        return segment
+
+    def store(self, data: Union[bytes, bytearray, memoryview]) -> Tuple[str, int]:
+        """Stores data in a free segment.
+
+        Arguments:
+            data {Union[bytes, bytearray, memoryview]} -- data to store
+
+        Returns:
+            Tuple[str, int] -- segment name and data size
+        """
+        size = len(data)
+        segment = self.acquire(size)
+        get_buffer(segment)[1 : size + 1] = data
+        return (segment.name, size)
+
+    def close(self) -> None:
+        """Closes and unlinks all segments."""
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+            _owned_segments.discard(segment.name)
+        self._segments = []
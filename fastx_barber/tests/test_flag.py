@@ -112,6 +112,25 @@ def assert_FastqFlagExtractor_update(
     assert record[2] == updated_qual
 
 
+def test_FlagExtractor_extract_all_batch():
+    pattern = match.AlphaNumericPattern("UMI8BC4")
+    matcher = match.FastxMatcher(pattern)
+    generated_records = random.make_fastq_file(
+        const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN
+    )
+    generated_records.append(("short", "ACGT", "AAAA"))
+    for fe in (flag.FastaFlagExtractor(), flag.FastqFlagExtractor()):
+        expected = []
+        for record in generated_records:
+            match_result, matched = matcher.do(record)
+            if matched:
+                expected.append(fe.extract_all(record, match_result))
+        batch_match = matcher.do_batch(generated_records)
+        assert expected == fe.extract_all_batch(generated_records, batch_match)
+    assert 4 * len(expected) == matcher.matched_count
+    assert 4 == matcher.unmatched_count
+
+
 def test_FastqFlagExtractor_noSelectedFlags_noStatFlags():
     matcher = match.FastxMatcher(regex.compile(const.UT_FLAG_PATTERN))
     generated_records = random.make_fastq_file(
@@ -215,6 +234,13 @@ def test_FastxFlagReader_fasta():
             assert k in read_flag_data
             assert read_flag_data[k][0] == v[0]
         assert list(fe.flagstats.items()) == list(fr.flagstats.items())
+    fe.reset_stats()
+    fr.reset_stats()
+    assert 0 == len(fe.flagstats.keys())
+    assert 0 == len(fr.flagstats.keys())
+    assert [const.UT_FLAG_NAME] == fr.flagstats.flags_for_stats
+    fr.read(updated_record)
+    assert 1 == sum(fr.flagstats[const.UT_FLAG_NAME].values())
 
 
 def test_FastxFlagReader_fastq():
@@ -0,0 +1,141 @@
+"""
+@author: Gabriele Girelli
+@contact: gigi.ga90@gmail.com
+"""
+
+from fastx_barber import gzio
+import gzip
+import io
+import os
+import tempfile
+import zlib
+
+
+def write_tmp_gzip(members, padding: bytes = b"", compress_level: int = 9):
+    fd, path = tempfile.mkstemp(suffix=".gz")
+    with os.fdopen(fd, "wb") as OH:
+        for member in members:
+            OH.write(gzip.compress(member, compress_level))
+        OH.write(padding)
+    return path
+
+
+def test_inflate_stream():
+    members = [os.urandom(100000).hex().encode(), b"", b"ACGT\n" * 1000]
+    data = b"".join(gzip.compress(m) for m in members)
+    blocks = gzio.inflate_stream(io.BytesIO(data), 1024)
+    assert b"".join(members) == b"".join(blocks)
+    blocks = gzio.inflate_stream(io.BytesIO(data + b"\x00" * 10), 1024)
+    assert b"".join(members) == b"".join(blocks)
+    try:
+        b"".join(gzio.inflate_stream(io.BytesIO(data[:-10]), 1024))
+        assert False
+    except EOFError:
+        pass
+
+
+def test_open_gzip_blocks():
+    members = [b"@r1\nACGT\n+\nIIII\n" * 1000, b"@r2\nTTTT\n+\nIIII\n" * 1000]
+    path = write_tmp_gzip(members, b"\x00" * 8)
+    assert b"".join(members) == b"".join(gzio.open_gzip_blocks(path))
+    blocks = gzio.open_gzip_blocks(path)
+    next(blocks)
+    blocks.close()
+    with gzio.open_gzip_text(path) as IH:
+        assert b"".join(members).decode() == IH.read()
+    os.remove(path)
+
+
+def test_open_gzip_blocks_truncated():
+    path = write_tmp_gzip([os.urandom(100000)])
+    with open(path, "r+b") as OH:
+        OH.truncate(os.path.getsize(path) - 10)
+    try:
+        b"".join(gzio.open_gzip_blocks(path))
+        assert False
+    except EOFError:
+        pass
+    os.remove(path)
+
+
+def write_bgzf_block(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    cdata = compressor.compress(data) + compressor.flush()
+    header = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+    header += (len(cdata) + 25).to_bytes(2, "little")
+    crc = zlib.crc32(data).to_bytes(4, "little")
+    return header + cdata + crc + len(data).to_bytes(4, "little")
+
+
+def test_iter_member_offsets():
+    blocks = [write_bgzf_block(b"ACGT" * 1000 * i) for i in range(1, 4)]
+    data = b"".join(blocks)
+    assert len(blocks[0]) == gzio.get_bgzf_block_size(data, 0)
+    assert gzio.get_bgzf_block_size(gzip.compress(b"ACGT"), 0) is None
+    offsets = [0, len(blocks[0]), len(blocks[0]) + len(blocks[1])]
+    assert offsets == list(gzio.iter_member_offsets(data))
+    members = [gzip.compress(b"ACGT" * 1000 * i) for i in range(1, 4)]
+    data = b"".join(members)
+    offsets = [0, len(members[0]), len(members[0]) + len(members[1])]
+    assert offsets == list(gzio.iter_member_offsets(data))
+    assert gzio.is_multi_member(data, len(members[0]) + 1)
+    assert not gzio.is_multi_member(data, len(members[0]))
+    assert gzio.is_multi_member(b"".join(blocks), 1)
+
+
+def test_parallel_inflater():
+    data = [os.urandom(10000).hex().encode() for i in range(20)]
+    path = write_tmp_gzip(data)
+    for threads in (1, 3):
+        inflater = gzio.ParallelInflater(path, threads, 10000)
+        assert b"".join(data) == b"".join(inflater)
+    os.remove(path)
+
+    fd, path = tempfile.mkstemp(suffix=".gz")
+    with os.fdopen(fd, "wb") as OH:
+        for block in data:
+            OH.write(write_bgzf_block(block))
+    assert b"".join(data) == b"".join(gzio.open_gzip_blocks(path, 4))
+    os.remove(path)
+
+    # stored members embedding valid gzip streams produce false member starts
+    data = [gzip.compress(os.urandom(5000)) for i in range(10)]
+    path = write_tmp_gzip(data, b"\x00" * 8, compress_level=0)
+    for batch_size in (1, 1000):
+        inflater = gzio.ParallelInflater(path, 2, batch_size)
+        assert b"".join(data) == b"".join(inflater)
+    with open(path, "r+b") as OH:
+        OH.truncate(os.path.getsize(path) - 20)
+    try:
+        b"".join(gzio.ParallelInflater(path, 2, 1))
+        assert False
+    except EOFError:
+        pass
+    os.remove(path)
+
+    path = write_tmp_gzip([os.urandom(10000)])
+    with open(path, "rb") as IH:
+        assert gzip.decompress(IH.read()) == b"".join(gzio.open_gzip_blocks(path, 4))
+    os.remove(path)
+
+
+def test_BgzfWriter():
+    data = os.urandom(100000).hex().encode()
+    for threads in (1, 3):
+        fd, path = tempfile.mkstemp(suffix=".gz")
+        os.close(fd)
+        with gzio.BgzfWriter(path, "wb", 6, threads) as OH:
+            OH.write(data)
+        with gzio.BgzfWriter(path, "ab", 6, threads) as OH:
+            OH.write(b"ACGT")
+        with open(path, "rb") as IH:
+            compressed = IH.read()
+        assert data + b"ACGT" == gzip.decompress(compressed)
+        assert 1 == compressed.count(gzio.BGZF_EOF)
+        assert compressed.endswith(gzio.BGZF_EOF)
+        for offset in gzio.iter_member_offsets(compressed):
+            block_size = gzio.get_bgzf_block_size(compressed, offset)
+            assert block_size is not None and 65536 >= block_size
+        assert gzio.truncate_bgzf_eof(path)
+        assert not gzio.truncate_bgzf_eof(path)
+        os.remove(path)
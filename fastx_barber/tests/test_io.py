@@ -3,7 +3,9 @@
 @contact: gigi.ga90@gmail.com
 """
 
-from fastx_barber import io
+from fastx_barber import gzio, io
+import errno
+import gzip
 import os
 import shutil
 import tempfile
@@ -130,3 +132,107 @@ def test_ChunkMerger_noRemove():
     os.remove(MH.name)
 
     shutil.rmtree(TD.name)
+
+
+def test_ChunkMerger_bgzf():
+    TD = tempfile.TemporaryDirectory()
+
+    for cid in (1, 2):
+        with gzio.BgzfWriter(
+            os.path.join(TD.name, f".tmp.chunk{cid}.test.txt.gz")
+        ) as C:
+            C.write(f"chunk{cid}\n".encode())
+
+    merger = io.ChunkMerger(TD)
+    merger.do("test.txt.gz", 2, "test_description")
+
+    with open("test.txt.gz", "rb") as MH:
+        merged_content = MH.read()
+    assert b"chunk1\nchunk2\n" == gzip.decompress(merged_content)
+    assert 1 == merged_content.count(gzio.BGZF_EOF)
+    assert merged_content.endswith(gzio.BGZF_EOF)
+    os.remove("test.txt.gz")
+
+    shutil.rmtree(TD.name)
+
+
+def test_copy_file_data():
+    TD = tempfile.TemporaryDirectory()
+    data = os.urandom(3 * io.COPY_BUFFER_SIZE + 10)
+    with open(os.path.join(TD.name, "input"), "wb") as IH:
+        IH.write(data)
+
+    copy_funs = [io.copy_file_data, io._copy_stream]
+    if hasattr(os, "sendfile"):
+        copy_funs.append(io._sendfile)
+    for copy_fun in copy_funs:
+        with io.open_append(os.path.join(TD.name, "output")) as OH:
+            OH.write(b"head")
+            with open(os.path.join(TD.name, "input"), "rb", buffering=0) as CH:
+                CH.seek(5)
+                copy_fun(OH, CH, len(data) - 10)
+        with open(os.path.join(TD.name, "output"), "rb") as OH:
+            assert b"head" + data[5:-5] == OH.read()
+        os.remove(os.path.join(TD.name, "output"))
+
+    shutil.rmtree(TD.name)
+
+
+def test_copy_file_data_fallback(monkeypatch):
+    TD = tempfile.TemporaryDirectory()
+    data = os.urandom(3 * io.COPY_BUFFER_SIZE + 10)
+    with open(os.path.join(TD.name, "input"), "wb") as IH:
+        IH.write(data)
+
+    def copy_then_fail(src: int, dst: int) -> int:
+        if 0 != os.lseek(src, 0, os.SEEK_CUR):
+            raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+        return os.write(dst, os.read(src, 100))
+
+    monkeypatch.setattr(
+        os, "copy_file_range", lambda src, dst, n: copy_then_fail(src, dst), False
+    )
+    monkeypatch.setattr(
+        os, "sendfile", lambda dst, src, offset, n: copy_then_fail(src, dst), False
+    )
+    for name in ("copy_file_range", "sendfile"):
+        if "sendfile" == name:
+            monkeypatch.delattr(os, "copy_file_range")
+        with open(os.path.join(TD.name, "output"), "wb", buffering=0) as OH:
+            with open(os.path.join(TD.name, "input"), "rb", buffering=0) as CH:
+                io.copy_file_data(OH, CH, len(data))
+        with open(os.path.join(TD.name, "output"), "rb") as OH:
+            assert data == OH.read()
+
+    shutil.rmtree(TD.name)
+
+
+def test_OrderedChunkWriter():
+    TD = tempfile.TemporaryDirectory()
+    plain_path = os.path.join(TD.name, "test.txt")
+    bgzf_path = os.path.join(TD.name, "test.txt.gz")
+    with open(plain_path, "w") as OH:
+        OH.write("previous content\n")
+
+    def bgzf_chunk(data: bytes) -> bytes:
+        return gzio.compress_bgzf_block(data) + gzio.BGZF_EOF
+
+    writer = io.OrderedChunkWriter()
+    writer.put(3, {plain_path: b"chunk3\n", bgzf_path: bgzf_chunk(b"chunk3\n")})
+    writer.put(2, {plain_path: b"chunk2\n"})
+    assert 1 == writer.next_chunk_id
+    assert 2 == writer.pending
+    writer.put(1, {plain_path: b"chunk1\n", bgzf_path: bgzf_chunk(b"chunk1\n")})
+    assert 4 == writer.next_chunk_id
+    assert 0 == writer.pending
+    writer.close()
+
+    with open(plain_path, "rb") as IH:
+        assert b"chunk1\nchunk2\nchunk3\n" == IH.read()
+    with open(bgzf_path, "rb") as IH:
+        content = IH.read()
+    assert b"chunk1\nchunk3\n" == gzip.decompress(content)
+    assert 1 == content.count(gzio.BGZF_EOF)
+    assert content.endswith(gzio.BGZF_EOF)
+
+    shutil.rmtree(TD.name)
@@ -3,18 +3,138 @@
 @contact: gigi.ga90@gmail.com
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from fastx_barber import match
 import regex as re  # type: ignore
+import time
 
 
 def test_AlphaNumericPattern():
-    pass
+    pattern = match.AlphaNumericPattern("8UMI8BC4X")
+    assert 12 == pattern.length
+    assert [("UMI", (0, 8)), ("BC", (8, 12))] == pattern.groups
+    anp_match = pattern.match("ACGTACGTGATCAAA")
+    assert anp_match is not None
+    assert {"UMI": "ACGTACGT", "BC": "GATC"} == anp_match.groupdict()
+    assert (8, 12) == (anp_match.start(2), anp_match.end(2))
+    assert pattern.match("ACGT") is None
+
+
+def test_AlphaNumericPattern_match_batch():
+    pattern = match.AlphaNumericPattern("UMI8BC4")
+    queries = ["ACGTACGTGATCAAA", "ACGT", "TTTTAAAACCCC"]
+    batch_match = pattern.match_batch(queries)
+    assert 3 == len(batch_match)
+    assert [True, False, True] == batch_match.matched.tolist()
+    assert {
+        "UMI": ["ACGTACGT", "TTTTAAAA"],
+        "BC": ["GATC", "CCCC"],
+    } == batch_match.extract(queries)
+    batch_match = pattern.match_batch(["ACGT"])
+    assert {"UMI": [], "BC": []} == batch_match.extract(["ACGT"])
+
+    matcher = match.FastxMatcher(pattern)
+    matcher.do_batch([("test", q, None) for q in queries])
+    assert 2 == matcher.matched_count
+    assert 1 == matcher.unmatched_count
 
 
 def test_FastxMatcher():
     matcher = match.FastxMatcher(re.compile("GATC.{3}TTT"))
     assert matcher.do(("test", "GATCAAATTT", None))[1]
     assert not matcher.do(("test", "GATAAAATTT", None))[1]
+    assert 1 == matcher.matched_count
+    assert 1 == matcher.unmatched_count
+    matcher.reset()
+    assert 0 == matcher.matched_count
+    assert 0 == matcher.unmatched_count
+
+
+def test_FastxMatcher_concurrent():
+    records = [("test", "AAGATCAAAA", None), ("test", "AAGTTCAAAA", None)] * 50
+    pattern = re.compile("^(?<UMI>.{2})(?<CS>GATC){s<2}")
+
+    def match_records(_):
+        matcher = match.FastxMatcher(pattern, concurrent=True)
+        return [matcher.do(record)[0].groupdict() for record in records]
+
+    with ThreadPoolExecutor(4) as executor:
+        found = list(executor.map(match_records, range(8)))
+    expected = [pattern.match(record[1]).groupdict() for record in records]
+    assert [expected] * 8 == found
+
+
+def test_PrefixIndex():
+    index = match.PrefixIndex(["GATC", "", "GA", "GATC", "AC"])
+    assert [0, 1, 2, 3] == index.select("GATCAAA")
+    assert [1, 2] == index.select("GAAAA")
+    assert [1, 4] == index.select("ACGT")
+    assert [1] == index.select("T")
+
+
+def test_FastxMultiMatcher():
+    patterns = [
+        re.compile("^(?<UMI>.{2})(?<CS>GATC){s<2}"),
+        re.compile("^GA(?<UMI>T.)"),
+        re.compile("^(?<UMI>[AC]{2})"),
+        re.compile("^GAT"),
+    ]
+    matcher = match.get_fastx_matcher(patterns)
+    assert isinstance(matcher, match.FastxMultiMatcher)
+    assert not matcher.can_batch
+    records = [
+        ("test", "AAGTTCAA", None),
+        ("test", "GATTAAAA", None),
+        ("test", "AAGATCAA", None),
+        ("test", "ACAAAAAA", None),
+        ("test", "TTTTTTTT", None),
+    ]
+    pattern_ids = [matcher.dispatch(record)[1] for record in records]
+    assert [0, 1, 0, 2, None] == pattern_ids
+    for record, pattern_id in zip(records, pattern_ids):
+        if pattern_id is not None:
+            expected = patterns[pattern_id].match(record[1])
+            assert expected.groupdict() == matcher.dispatch(record)[0].groupdict()
+    assert 8 == matcher.matched_count
+    assert 1 == matcher.unmatched_count
+    assert 4 == matcher.pattern_stats[(0, "matched")]
+    assert 2 == matcher.pattern_stats[(1, "matched")]
+    assert 0 == matcher.pattern_stats[(3, "matched")]
+    matcher.reset()
+    assert 0 == matcher.matched_count
+    assert 0 == matcher.unmatched_count
+    assert isinstance(match.get_fastx_matcher(patterns[:1]), match.FastxMatcher)
+
+
+def test_FastxMatcher_timeout():
+    record = ("test", "A" * 30 + "G", None)
+    matcher = match.FastxMatcher(re.compile("(?:(?:A|AA)+)+C"), timeout=0.05)
+    assert 0.05 == matcher.timeout
+    start = time.perf_counter()
+    assert (None, False) == matcher.do(record)
+    assert 5 > time.perf_counter() - start
+    assert matcher.timed_out
+    assert 1 == matcher.stats["timeout"]
+    matcher.do(("test", "AAC", None))
+    assert not matcher.timed_out
+    assert 1 == matcher.matched_count
+    assert 0 == len(match.FastxMatcher(re.compile("^AC")).stats)
+    matcher = match.FastxMatcher(
+        re.compile("(?:(?:A|AA){1,40}){1,40}C"), timeout=0.05, cache_size=10
+    )
+    assert 10 == matcher.cache_size
+    for _ in range(2):
+        assert (None, False) == matcher.do(record)
+        assert matcher.timed_out
+    assert 2 == matcher.stats["timeout"]
+    assert 2 == matcher.stats["cache_miss"]
+    matcher = match.get_fastx_matcher(
+        [re.compile("(?:(?:A|AA)+)+C"), re.compile("^A+")], timeout=0.05
+    )
+    assert (None, None) == matcher.dispatch(record)
+    assert 1 == matcher.pattern_stats[(0, "timeout")]
+    assert 0 == matcher.pattern_stats[(1, "matched")]
+    assert 1 == matcher.unmatched_count
 
 
 def test_search_needle():
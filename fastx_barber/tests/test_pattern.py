@@ -0,0 +1,236 @@
+"""
+@author: Gabriele Girelli
+@contact: gigi.ga90@gmail.com
+"""
+
+from fastx_barber import const, match, pattern, random
+import regex as re  # type: ignore
+
+FIXED_PATTERNS = [
+    "^(?<UMI>.{8})(?<BC>.{8})(?<CS>GATC)",
+    "(?<UMI>.{2})A.{2}(?P<BC>T.)",
+    "^.{3}GA",
+    "^(?<BC>..)G$",
+]
+OTHER_PATTERNS = [
+    "^(?<UMI>.{8})(?<CS>GATC){s<2}",
+    "^(?<BC>[ACGT]{2})",
+    "^(A|C)",
+    "^.{2,3}GA",
+    "(?<=A)GA",
+    "(?i)^ga",
+    "^(.)\\1",
+]
+
+
+def test_PatternParser():
+    nodes = pattern.PatternParser("^(?<UMI>.{8})(?:A|C)+[AC]{s<2}$").parse()
+    assert 1 == len(nodes)
+    anchor, group, alternation, char_class, end = nodes[0]
+    assert pattern.NodeKinds.ANCHOR is anchor.kind
+    assert "UMI" == group.name
+    assert (
+        8 == group.alternatives[0][0].min_repeat == group.alternatives[0][0].max_repeat
+    )
+    assert 2 == len(alternation.alternatives)
+    assert (1, None) == (alternation.min_repeat, alternation.max_repeat)
+    assert "[AC]" == char_class.text
+    assert "s<2" == char_class.fuzzy
+    assert (25, 30) == char_class.fuzzy_span
+    assert "$" == end.text
+    assert pattern.parse_pattern("^(.)\\1") is None
+    assert pattern.parse_pattern("(?i)A") is None
+    assert pattern.parse_pattern("(A") is None
+
+
+def test_get_slicing_plan():
+    plan = pattern.get_slicing_plan(FIXED_PATTERNS[0])
+    assert plan is not None
+    assert 20 == plan.length
+    assert [(16, "GATC")] == plan.literals
+    assert [("UMI", (0, 8)), ("BC", (8, 16)), ("CS", (16, 20))] == plan.groups
+    assert not plan.anchored_end
+    plan = pattern.get_slicing_plan("A.GT{2}(?<X>CA)$")
+    assert plan is not None
+    assert [(0, "A"), (2, "GTTCA")] == plan.literals
+    assert plan.anchored_end
+    for p in OTHER_PATTERNS:
+        assert pattern.get_slicing_plan(p) is None
+
+
+def test_FastxMatcher_slicing():
+    records = random.make_fastq_file(const.UT_N_RECORDS, 3)
+    records.extend(random.make_fastq_file(const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN))
+    for p in FIXED_PATTERNS + OTHER_PATTERNS:
+        regex_pattern = re.compile(p)
+        matcher = match.FastxMatcher(regex_pattern)
+        assert (p in FIXED_PATTERNS) == matcher.is_sliced
+        for record in records:
+            expected = regex_pattern.match(record[1])
+            found, matched = matcher.do(record)
+            assert (expected is not None) == matched
+            if matched:
+                assert expected.group(0) == found.group(0)
+                assert expected.groupdict() == found.groupdict()
+                for gid in range(len(expected.groups()) + 1):
+                    assert expected.span(gid) == (found.start(gid), found.end(gid))
+
+
+def test_SlicingPattern_match_batch():
+    records = random.make_fastq_file(const.UT_N_RECORDS, 3)
+    records.extend(random.make_fastq_file(const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN))
+    records.extend([("test", "TTATCGATCA", "AAAAAAAAAA"), ("test", "TTG", "AAA")])
+    for p in FIXED_PATTERNS:
+        regex_pattern = re.compile(p)
+        matcher = match.FastxMatcher(regex_pattern)
+        assert matcher.can_batch
+        expected = [regex_pattern.match(record[1]) for record in records]
+        batch_match = matcher.do_batch(records)
+        assert [m is not None for m in expected] == batch_match.matched.tolist()
+        values = batch_match.extract([record[1] for record in records])
+        for name in regex_pattern.groupindex:
+            assert [m.group(name) for m in expected if m is not None] == values[name]
+    assert not match.FastxMatcher(re.compile(OTHER_PATTERNS[0])).can_batch
+
+
+FUZZY_PATTERNS = [
+    "^(?<UMI>.{8})(?<CS>GATC){s<2}",
+    "^(?<UMI>.{4})(?<CS>GATC){e<=2}(?<BC>.{3})",
+    "^(?<UMI>.{2})(?:GA){i<=1}(?<X>TC)",
+    "^(?<CS>GATC){e<=1}(?<BC>.+)",
+]
+
+
+def test_get_exact_pattern():
+    assert "^(?<UMI>.{8})(?<CS>GATC)" == pattern.get_exact_pattern(FUZZY_PATTERNS[0])
+    assert "^(?<CS>GATC)(?<BC>.+)" == pattern.get_exact_pattern(FUZZY_PATTERNS[3])
+    assert "^(?<X>G(?:AT)C)" == pattern.get_exact_pattern("^(?<X>G(?:AT){i<=1}C){e<1}")
+    assert pattern.get_exact_pattern(FIXED_PATTERNS[0]) is None
+    assert pattern.get_exact_pattern("^(?<A>.*?)(?<B>GATC){e<=1}") is None
+    assert pattern.get_exact_pattern("^(?<A>.{2,5})(?<CS>GATC){d<=1}") is None
+    assert pattern.get_exact_pattern("^(A|C)(?<CS>GATC){s<2}") is None
+    assert pattern.get_exact_pattern("^(?<CS>GA+TC){s<2}") is None
+    assert pattern.get_exact_pattern("(?=GA){e<=1}") is None
+
+
+def make_site_records():
+    records = random.make_fastq_file(const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN)
+    for i, site in enumerate(("GATC", "GTTC", "GAAC", "GTC", "GACTC")):
+        for pos in (0, 2, 4, 8):
+            records.extend(
+                (name, seq[:pos] + site + seq[pos:], "A" * len(site) + qual)
+                for name, seq, qual in records[i : const.UT_N_RECORDS : 5]
+            )
+    return records
+
+
+def test_FastxMatcher_two_stage():
+    records = make_site_records()
+    for p in FUZZY_PATTERNS:
+        regex_pattern = re.compile(p)
+        matcher = match.FastxMatcher(regex_pattern)
+        assert matcher.is_two_stage
+        for record in records:
+            expected = regex_pattern.match(record[1])
+            found, matched = matcher.do(record)
+            assert (expected is not None) == matched
+            if matched:
+                assert expected.groupdict() == found.groupdict()
+                assert expected.span() == found.span()
+        stats = matcher.stats
+        assert len(records) == stats["exact"] + stats["fuzzy"]
+        assert 0 < stats["exact"]
+        matcher.reset()
+        assert 0 == sum(matcher.stats.values())
+    assert not match.FastxMatcher(re.compile(OTHER_PATTERNS[1])).is_two_stage
+    assert 0 == len(match.FastxMatcher(re.compile(OTHER_PATTERNS[1])).stats)
+    assert match.get_exact_version(re.compile(FUZZY_PATTERNS[0], re.BESTMATCH)) is None
+
+
+def test_get_max_insertions():
+    assert 0 == pattern.get_max_insertions("s<2")
+    assert 0 == pattern.get_max_insertions("d<=1,s<=1")
+    assert 2 == pattern.get_max_insertions("e<=2")
+    assert 1 == pattern.get_max_insertions("i<2,e<=3")
+    assert 1 == pattern.get_max_insertions("2i+1s<=3")
+    assert 0 == pattern.get_max_insertions("1s+1d<3")
+    assert pattern.get_max_insertions("1<=e") is None
+
+
+def test_get_max_span():
+    assert 12 == pattern.get_max_span("^.{3}GA.{7}")
+    assert 13 == pattern.get_max_span("^(?<UMI>.{8})(?<CS>GATC){e<=1}")
+    assert 5 == pattern.get_max_span("^(A|CC)[AT]{2,3}")
+    assert 6 == pattern.get_max_span("^(?:AB(?:C){i<=1}){e<=2}")
+    for p in ("^(?<BC>..)G$", "(?<=A)GA", "^GA\\b", "^(?<A>.+)", "^G{1<=e}"):
+        assert pattern.get_max_span(p) is None
+
+
+def test_FastxMatcher_match_window():
+    records = make_site_records()
+    for p in FUZZY_PATTERNS[:3] + ["^(?<A>[AC]{2,4})(?<CS>GA){e<=1}"]:
+        regex_pattern = re.compile(p)
+        matcher = match.FastxMatcher(regex_pattern)
+        assert pattern.get_max_span(p) == matcher.match_window
+        for record in records:
+            expected = regex_pattern.match(record[1])
+            found, matched = matcher.do(record)
+            assert (expected is not None) == matched
+            if matched:
+                assert expected.groupdict() == found.groupdict()
+                assert expected.span() == found.span()
+    regex_pattern = re.compile(FUZZY_PATTERNS[3])
+    assert match.FastxMatcher(regex_pattern).match_window is None
+    assert match.FastxMatcher(regex_pattern, 0).match_window is None
+    matcher = match.FastxMatcher(regex_pattern, 10)
+    for record in records:
+        expected = regex_pattern.match(record[1], endpos=10)
+        found, matched = matcher.do(record)
+        assert (expected is not None) == matched
+        if matched:
+            assert expected.span() == found.span()
+    assert match.FastxMatcher(re.compile(FIXED_PATTERNS[0])).match_window is None
+    assert not match.FastxMatcher(re.compile(FIXED_PATTERNS[0]), 20).is_sliced
+
+
+def test_get_literal_prefix():
+    assert "GATC" == pattern.get_literal_prefix("^GA(?<CS>TC)(?<UMI>.{8})")
+    assert "GAA" == pattern.get_literal_prefix("GA{2,3}T")
+    assert "A" == pattern.get_literal_prefix("^AC?G")
+    assert "" == pattern.get_literal_prefix(FIXED_PATTERNS[0])
+    assert "" == pattern.get_literal_prefix("(?:AC){s<1}G")
+    assert "" == pattern.get_literal_prefix("^A|C")
+    assert "" == match.get_pattern_prefix(re.compile("GATC", re.IGNORECASE))
+
+
+def test_FastxMatcher_cache():
+    records = make_site_records()
+    for p in FUZZY_PATTERNS[:3]:
+        regex_pattern = re.compile(p)
+        matcher = match.FastxMatcher(regex_pattern, cache_size=len(records))
+        assert len(records) == matcher.cache_size
+        for record in records + records:
+            expected = regex_pattern.match(record[1])
+            found, matched = matcher.do(record)
+            assert (expected is not None) == matched
+            if matched:
+                assert expected.groupdict() == found.groupdict()
+                assert expected.span() == found.span()
+                for gid in range(len(expected.groups()) + 1):
+                    assert expected.span(gid) == (found.start(gid), found.end(gid))
+        stats = matcher.stats
+        assert len(records) <= stats["cache_hit"]
+        assert len(records) * 2 == stats["cache_hit"] + stats["cache_miss"]
+        matcher.reset()
+        matcher.do(records[0])
+        assert 1 == matcher.stats["cache_hit"]
+    matcher = match.FastxMatcher(re.compile(FUZZY_PATTERNS[0]), cache_size=1)
+    for record in (records[0], records[1], records[0], records[0]):
+        matcher.do(record)
+    assert 1 == matcher.stats["cache_hit"]
+    assert (
+        0 == match.FastxMatcher(re.compile(FUZZY_PATTERNS[3]), cache_size=8).cache_size
+    )
+    assert (
+        0 == match.FastxMatcher(re.compile(FIXED_PATTERNS[0]), cache_size=8).cache_size
+    )
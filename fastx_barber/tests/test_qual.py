@@ -5,6 +5,7 @@
 
 from fastx_barber import qual
 from fastx_barber.const import DEFAULT_PHRED_OFFSET
+import pytest  # type: ignore
 
 DEFAULT_FILTER_QUAL_FLAGS = ["flag,30,.2", "test,15,.1"]
 
@@ -23,6 +24,23 @@ def test_QualityIO():
     assert [1, 29, 5] == qio.phred_to_qscore("A]E")
 
 
+def test_QualityIO_batch():
+    qio = qual.QualityIO()
+    assert [32, 14, 60, 36] == qio.phred_to_qscore_array("A/]E").tolist()
+    qbatch = qio.phred_to_qscore_batch(["A/]E", "", "AE"])
+    assert 3 == len(qbatch)
+    assert [0, 4, 4, 6] == qbatch.offsets.tolist()
+    assert [4, 0, 2] == qbatch.lengths.tolist()
+    assert [32, 14, 60, 36] == qbatch[0].tolist()
+    assert [] == qbatch[1].tolist()
+    assert [32, 36] == qbatch[2].tolist()
+    assert 0 == len(qio.phred_to_qscore_batch([]))
+    qio = qual.QualityIO(64)
+    assert [1, 29, 5] == qio.phred_to_qscore_batch(["A]E"])[0].tolist()
+    with pytest.raises(AssertionError):
+        qio.phred_to_qscore_batch(["A]E", "/"])
+
+
 def test_QualityFilter():
     qf = qual.QualityFilter(30, 0.2)
     assert qf.qual_pass_filter("AAAA")
@@ -75,6 +93,41 @@ def test_apply_filter_flag():
     )
 
 
+def test_QualityFilter_batch():
+    qf = qual.QualityFilter(30, 0.2)
+    assert [True, False, True, False] == qf.qual_pass_filter_batch(
+        ["AAAA", "/AAA", "AE]]]/", ""]
+    ).tolist()
+    assert 4 == qf.parsed
+    assert 2 == qf.passed
+    assert 0 == len(qf.qual_pass_filter_batch([]))
+
+
+def test_apply_filter_flag_batch():
+    flag_data = [
+        {"qflag": ("AAAA", -1, -1), "qtest": ("AAAAAAAAA", -1, -1)},
+        {"qflag": ("/AAA", -1, -1), "qtest": ("AAAAAAAAA", -1, -1)},
+        {"qflag": ("AAAA", -1, -1), "qtest": ("/AAAAAAAA", -1, -1)},
+        {"qtest": ("/AAAAAAAA", -1, -1), "qflag": ("/AAA", -1, -1)},
+        {"qflag": ("/EEAAAA", -1, -1), "qtest": ("/EEAAAAAAAA", -1, -1)},
+        {"flag": ("/", -1, -1)},
+        {},
+    ]
+    filters = qual.QualityFilter.init_flag_filters(
+        DEFAULT_FILTER_QUAL_FLAGS, DEFAULT_PHRED_OFFSET
+    )
+    expected = [qual.apply_filter_flag(flags, filters) for flags in flag_data]
+    expected_counts = {k: (f.parsed, f.passed) for k, f in filters.items()}
+    filters = qual.QualityFilter.init_flag_filters(
+        DEFAULT_FILTER_QUAL_FLAGS, DEFAULT_PHRED_OFFSET
+    )
+    assert expected == qual.apply_filter_flag_batch(flag_data, filters).tolist()
+    assert expected_counts == {k: (f.parsed, f.passed) for k, f in filters.items()}
+    assert [True, True] == qual.dummy_apply_filter_flag_batch(
+        flag_data[:2], {}
+    ).tolist()
+
+
 def test_setup_qual_filters():
     qff, ff = qual.setup_qual_filters(None, DEFAULT_PHRED_OFFSET)
     assert 0 == len(qff)
@@ -83,3 +136,9 @@ def test_setup_qual_filters():
     assert 2 == len(qff)
     assert qual.apply_filter_flag == ff
     validate_filters(qff)
+    qff, ff = qual.setup_qual_filters(None, DEFAULT_PHRED_OFFSET, batch=True)
+    assert qual.dummy_apply_filter_flag_batch == ff
+    qff, ff = qual.setup_qual_filters(
+        DEFAULT_FILTER_QUAL_FLAGS, DEFAULT_PHRED_OFFSET, batch=True
+    )
+    assert qual.apply_filter_flag_batch == ff
@@ -0,0 +1,80 @@
+"""
+@author: Gabriele Girelli
+@contact: gigi.ga90@gmail.com
+"""
+
+import argparse
+from fastx_barber import const, io, random, scriptio, seqio
+import os
+import shutil
+import threading
+
+
+def setup_chunk_context(args: argparse.Namespace) -> const.FastxFormats:
+    return seqio.get_fastx_format(args.input)[0]
+
+
+def run_chunk(payload, cid: int, args: argparse.Namespace, fmt):
+    OHC = scriptio.get_chunk_handler(
+        cid, fmt, args.output, args.compress_level, args.temp_dir
+    )
+    assert OHC is not None
+    for record in payload:
+        OHC.write(record)
+    OHC.close()
+    return (1, len(payload))
+
+
+def test_run_chunks():
+    tmp_dir = io.check_tmp_dir()
+    generated_records = random.make_fastq_file(
+        const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN
+    )
+    chunks = [
+        (generated_records[i : i + const.UT_CHUNK_SIZE], cid)
+        for cid, i in enumerate(
+            range(0, len(generated_records), const.UT_CHUNK_SIZE), start=1
+        )
+    ]
+    for threads, output_mode, max_in_flight, backend in (
+        (1, "merge", None, "processes"),
+        (2, "stream", 1, "processes"),
+        (2, "stream", None, "processes"),
+        (2, "stream", None, "threads"),
+    ):
+        args = argparse.Namespace(
+            input="input.fastq",
+            output=os.path.join(
+                tmp_dir, f"output.{output_mode}{threads}.{backend}.fastq.gz"
+            ),
+            compress_level=6,
+            temp_dir=None,
+            threads=threads,
+            output_mode=output_mode,
+            max_in_flight=max_in_flight,
+            backend=backend,
+        )
+        assert (len(chunks), len(generated_records)) == scriptio.run_chunks(
+            run_chunk, chunks, args, setup_chunk_context, initial=(0, 0)
+        )
+        assert generated_records == list(seqio.get_fastx_parser(args.output)[0])
+    shutil.rmtree(tmp_dir)
+
+
+def test_init_worker_threads():
+    args = argparse.Namespace(threads=2)
+    scriptio.init_worker(args, lambda args: "main")
+    thread = threading.Thread(
+        target=scriptio.init_worker, args=(args, lambda args: "worker")
+    )
+    thread.start()
+    thread.join()
+    assert "main" == scriptio._worker.context
+
+
+def test_get_pattern_output_paths():
+    assert ["out/a.fq.gz"] == scriptio.get_pattern_output_paths("out/a.fq.gz", 1)
+    assert [
+        "out/pattern1.a.fq.gz",
+        "out/pattern2.a.fq.gz",
+    ] == scriptio.get_pattern_output_paths("out/a.fq.gz", 2)
@@ -3,8 +3,10 @@
 @contact: gigi.ga90@gmail.com
 """
 
-from fastx_barber import const, io, random, seqio
+from fastx_barber import const, gzio, io, random, seqio, shm
+import gzip
 import os
+import pytest
 import shutil
 import tempfile
 
@@ -60,6 +62,135 @@ def test_get_fastx_parser():
     shutil.rmtree(dpath)
 
 
+def test_get_fastx_parser_mmap():
+    for fmt in [const.FastxFormats.FASTA, const.FastxFormats.FASTQ]:
+        for gzipped in [False, True]:
+            fpath, dpath = random.write_tmp_fastx_file(
+                fmt, const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN, gzipped=gzipped
+            )
+            expected = list(seqio.get_fastx_parser(fpath)[0])
+            parser, parsed_fmt = seqio.get_fastx_parser(fpath, const.FastxParsers.MMAP)
+            assert fmt == parsed_fmt
+            assert expected == list(parser)
+            shutil.rmtree(dpath)
+
+
+def test_get_fastx_parser_mmap_whitespace():
+    dpath = tempfile.mkdtemp()
+    fq_records = random.make_fastq_file(const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN)
+    fa_records = random.make_fasta_file(const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN)
+    for fname, data in (
+        (
+            "ws.fastq",
+            "".join(f"@{r[0]} desc \n{r[1]} \n+\n{r[2]}\t\n" for r in fq_records),
+        ),
+        (
+            "ws.fasta",
+            "".join(f">{r[0]} desc\t\n{r[1][:80]} \n{r[1][80:]}\n" for r in fa_records),
+        ),
+    ):
+        for newline in ("\n", "\r\n"):
+            fpath = os.path.join(dpath, fname)
+            with open(fpath, "wb") as OH:
+                OH.write(data.replace("\n", newline).encode())
+            expected = list(seqio.get_fastx_parser(fpath)[0])
+            assert expected == list(
+                seqio.get_fastx_parser(fpath, const.FastxParsers.MMAP)[0]
+            )
+            chunker = seqio.FastxRangeChunker(
+                fpath, seqio.get_fastx_format(fpath)[0], 20
+            )
+            assert expected == [
+                record for chunk, _ in chunker for record in seqio.load_chunk(chunk)
+            ]
+    shutil.rmtree(dpath)
+
+
+def test_split_non_ascii_headers():
+    for splitter_class, template, expected in (
+        (seqio.FastqBytesSplitter, "@r{0} é\nACGT\n+\nIIII\n", "IIII"),
+        (seqio.FastaBytesSplitter, ">r{0} é\nAC\nGT\n", None),
+    ):
+        data = "".join(template.format(i) for i in range(10))
+        for newline in ("\n", "\r\n"):
+            for block_size in (1, 3, 7):
+                splitter = splitter_class()
+                splitter._block_size = block_size
+                assert [(f"r{i} é", "ACGT", expected) for i in range(10)] == list(
+                    splitter.split(data.replace("\n", newline).encode())
+                )
+
+
+def test_split_byte_blocks():
+    records = random.make_fastq_file(const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN)
+    data = "".join(f"@{r[0]}\n{r[1]}\n+\n{r[2]}\n" for r in records).encode()
+    blocks = [data[i : i + 100] for i in range(0, len(data), 100)]
+    splitter = seqio.FastqBytesSplitter()
+    assert records == list(seqio.split_byte_blocks(splitter, blocks))
+    data = data.replace(b"\n", b"\r\n")
+    blocks = [data[i : i + 100] for i in range(0, len(data), 100)]
+    assert records == list(seqio.split_byte_blocks(splitter, blocks))
+    records = random.make_fasta_file(const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN)
+    data = "".join(f">{r[0]}\n{r[1][:80]}\n{r[1][80:]}\n" for r in records).encode()
+    blocks = [data[i : i + 100] for i in range(0, len(data), 100)]
+    splitter = seqio.FastaBytesSplitter()
+    assert records == list(seqio.split_byte_blocks(splitter, blocks))
+
+
+def test_find_record_start():
+    buf = b"@r1\nACGT\n+\n@III\n@r2\nACGT\n+\nIIII\n"
+    assert 0 == seqio.find_record_start(buf, const.FastxFormats.FASTQ, 0)
+    for pos in range(1, 17):
+        assert 16 == seqio.find_record_start(buf, const.FastxFormats.FASTQ, pos)
+    assert len(buf) == seqio.find_record_start(buf, const.FastxFormats.FASTQ, 17)
+    buf = b">r1\nAC\nGT\n>r2\nACGT\n"
+    assert 0 == seqio.find_record_start(buf, const.FastxFormats.FASTA, 0)
+    assert 10 == seqio.find_record_start(buf, const.FastxFormats.FASTA, 1)
+    assert 10 == seqio.find_record_start(buf, const.FastxFormats.FASTA, 10)
+    assert len(buf) == seqio.find_record_start(buf, const.FastxFormats.FASTA, 11)
+
+
+def test_FastxRangeChunker():
+    for fmt in (const.FastxFormats.FASTA, const.FastxFormats.FASTQ):
+        fpath, dpath = random.write_tmp_fastx_file(
+            fmt, const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN
+        )
+        parsed_records = list(seqio.get_fastx_parser(fpath)[0])
+        chunker = seqio.FastxRangeChunker(fpath, fmt, 20)
+        chunks = list(chunker)
+        assert len(chunks) == chunker.last_chunk_id
+        assert 1 < chunker.last_chunk_id
+        chunked_records = []
+        for chunk, cid in chunks:
+            chunked_records.extend(seqio.load_chunk(chunk))
+        assert parsed_records == chunked_records
+        shutil.rmtree(dpath)
+
+
+def test_FastxSharedMemoryChunker():
+    for fmt in (const.FastxFormats.FASTA, const.FastxFormats.FASTQ):
+        for gzipped in (False, True):
+            fpath, dpath = random.write_tmp_fastx_file(
+                fmt, const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN, gzipped=gzipped
+            )
+            parsed_records = list(seqio.get_fastx_parser(fpath)[0])
+            chunker = seqio.FastxSharedMemoryChunker(fpath, 20)
+            chunked_records = []
+            segment_names = set()
+            for chunk, cid in chunker:
+                chunked_records.extend(seqio.load_chunk(chunk))
+                segment_names.add(chunk.name)
+                seqio.release_chunk(chunk)
+            assert 1 < chunker.last_chunk_id
+            assert 2 >= len(segment_names)
+            assert parsed_records == chunked_records
+            chunker.close()
+            for name in segment_names:
+                with pytest.raises(FileNotFoundError):
+                    shm.attach_shared_memory(name)
+            shutil.rmtree(dpath)
+
+
 def test_FastxChunkedParser():
     fapath, dpath = random.write_tmp_fastx_file(
         const.FastxFormats.FASTA, const.UT_N_RECORDS, const.UT_RECORD_SEQ_LEN
@@ -144,6 +275,92 @@ def test_SimpleFastqWriter():
     shutil.rmtree(tmp_dir)
 
 
+def test_SimpleFastqWriter_bgzf():
+    tmp_dir = io.check_tmp_dir()
+    generated_records = random.make_fastq_file(const.UT_RECORD_SEQ_LEN, 2000)
+    for compress_threads in (1, 3):
+        _, fpath = tempfile.mkstemp(
+            dir=tmp_dir, suffix=random.mk_suffix(const.FastxFormats.FASTQ, True)
+        )
+        OH = seqio.SimpleFastqWriter(
+            fpath, bgzf=True, compress_threads=compress_threads
+        )
+        for record in generated_records:
+            OH.write(record)
+        OH.close()
+        with open(fpath, "rb") as IH:
+            assert IH.read().endswith(gzio.BGZF_EOF)
+        assert 1 < len(list(gzio.iter_member_offsets(open(fpath, "rb").read())))
+        written_records = [r for r in seqio.get_fastx_parser(fpath)[0]]
+        assert generated_records == written_records
+    shutil.rmtree(tmp_dir)
+
+
+def test_output_capture():
+    generated_records = random.make_fastq_file(const.UT_RECORD_SEQ_LEN, 200)
+    seqio.start_output_capture()
+    assert seqio.is_output_captured()
+    try:
+        for path in ("captured.fastq", "captured.fastq.gz"):
+            OH = seqio.SimpleFastqWriter(path, bgzf=True)
+            for record in generated_records[:100]:
+                OH.write(record)
+            OH.close()
+        OH = seqio.SimpleSplitFastqWriter("captured.fastq.gz", "first", bgzf=True)
+        OH.max_open_handles = 1
+        for record in generated_records[:100]:
+            OH.write(record, {"first": (record[1][0], 0, 1)})
+        OH.close()
+    finally:
+        outputs = seqio.stop_output_capture()
+    assert not seqio.is_output_captured()
+    assert not os.path.isfile("captured.fastq")
+    assert not os.path.isfile("captured.fastq.gz")
+
+    assert (
+        "".join(
+            f"@{name}\n{seq}\n+\n{qual}\n"
+            for name, seq, qual in generated_records[:100]
+        )
+        == outputs["captured.fastq"].decode()
+    )
+    assert outputs["captured.fastq.gz"].endswith(gzio.BGZF_EOF)
+    for base in set(record[1][0] for record in generated_records[:100]):
+        content = outputs[f"first_split.{base}.captured.fastq.gz"]
+        assert 1 == content.count(gzio.BGZF_EOF)
+        assert (
+            "".join(
+                f"@{name}\n{seq}\n+\n{qual}\n"
+                for name, seq, qual in generated_records[:100]
+                if seq[0] == base
+            )
+            == gzip.decompress(content).decode()
+        )
+
+
+def test_direct_output():
+    tmp_dir = io.check_tmp_dir()
+    generated_records = random.make_fastq_file(const.UT_RECORD_SEQ_LEN, 200)
+    fpath = os.path.join(tmp_dir, "direct.fastq.gz")
+    with open(fpath, "w") as OH:
+        OH.write("previous content\n")
+    seqio.start_direct_output()
+    assert seqio.is_output_direct()
+    try:
+        for i in range(0, 200, 50):
+            OH = seqio.SimpleFastqWriter(fpath, bgzf=True)
+            for record in generated_records[i : i + 50]:
+                OH.write(record)
+            OH.close()
+    finally:
+        assert {fpath} == seqio.stop_direct_output()
+    assert not seqio.is_output_direct()
+    with open(fpath, "rb") as IH:
+        assert 1 == IH.read().count(gzio.BGZF_EOF)
+    assert generated_records == [r for r in seqio.get_fastx_parser(fpath)[0]]
+    shutil.rmtree(tmp_dir)
+
+
 def test_get_fastx_writer():
     assert seqio.get_fastx_writer(const.FastxFormats.FASTA) is seqio.SimpleFastaWriter
     assert seqio.get_fastx_writer(const.FastxFormats.FASTQ) is seqio.SimpleFastqWriter
@@ -159,6 +376,7 @@ def test_SimpleSplitFastaWriter():
     OH = seqio.SimpleSplitFastaWriter(fpath, "first")
     for record in generated_records:
         OH.write(record, {"first": (record[1][0], 0, 0)})
+    OH.close()
     for c in random.DNA_ALPHABET:
         parser, _ = seqio.get_fastx_parser(
             os.path.join(tmp_dir, f"first_split.{c}.{os.path.basename(fpath)}")
@@ -177,6 +395,7 @@ def test_SimpleSplitFastqWriter():
     OH = seqio.SimpleSplitFastqWriter(fpath, "first")
     for record in generated_records:
         OH.write(record, {"first": (record[1][0], 0, 0)})
+    OH.close()
     for c in random.DNA_ALPHABET:
         parser, _ = seqio.get_fastx_parser(
             os.path.join(tmp_dir, f"first_split.{c}.{os.path.basename(fpath)}")
@@ -186,6 +405,26 @@ def test_SimpleSplitFastqWriter():
     shutil.rmtree(tmp_dir)
 
 
+def test_SimpleSplitFastqWriter_handles():
+    tmp_dir = io.check_tmp_dir()
+    generated_records = random.make_fastq_file(const.UT_RECORD_SEQ_LEN, 200)
+    _, fpath = tempfile.mkstemp(
+        dir=tmp_dir, suffix=random.mk_suffix(const.FastxFormats.FASTQ, True)
+    )
+    OH = seqio.SimpleSplitFastqWriter(fpath, "first")
+    OH.max_open_handles = 2
+    for record in generated_records:
+        OH.write(record, {"first": (record[1][0], 0, 0)})
+    OH.close()
+    for c in random.DNA_ALPHABET:
+        parser, _ = seqio.get_fastx_parser(
+            os.path.join(tmp_dir, f"first_split.{c}.{os.path.basename(fpath)}")
+        )
+        expected_records = [r for r in generated_records if c == r[1][0]]
+        assert expected_records == list(parser)
+    shutil.rmtree(tmp_dir)
+
+
 def test_get_split_fastx_writer():
     assert (
         seqio.get_split_fastx_writer(const.FastxFormats.FASTA)
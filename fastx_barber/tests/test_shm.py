@@ -0,0 +1,25 @@
+"""
+@author: Gabriele Girelli
+@contact: gigi.ga90@gmail.com
+"""
+
+from fastx_barber import shm
+
+
+def test_SharedMemoryPool():
+    pool = shm.SharedMemoryPool()
+    name, size = pool.store(b"ACGT" * 100)
+    assert 400 == size
+    with shm.open_shared_memory(name, size) as data:
+        assert b"ACGT" * 100 == data
+    other_name, _ = pool.store(b"TTTT")
+    assert name != other_name
+    shm.release_shared_memory(name)
+    assert name == pool.store(b"GGGG")[0]
+    with shm.open_shared_memory(name, 4) as data:
+        assert b"GGGG" == data
+    shm.release_shared_memory(name)
+    assert name != pool.store(b"A" * 1000)[0]
+    assert 3 == len(pool)
+    pool.close()
+    assert 0 == len(pool)
@@ -4,8 +4,12 @@
 """
 
 from fastx_barber import match, qual, trim
-from fastx_barber.const import FastxFormats
+from fastx_barber.const import FastxFormats, QualityTrimMethods
+import numpy as np  # type: ignore
+import os
+import pytest  # type: ignore
 import regex as re  # type: ignore
+import tempfile
 
 
 def test_FastaTrimmer_trim_len():
@@ -99,6 +103,85 @@ def test_FastqTrimmer_trim_qual():
     assert "ATCGATCGATCGATCGA" == trimmed_record[1]
     assert "////A/A/A/A/A/A/A" == trimmed_record[2]
 
+    trimmed_record, trimmed_len = trimmer.trim_qual(record, 30, "both", qio)
+    assert 9 == trimmed_len
+    assert "ATCGATCGATCGA" == trimmed_record[1]
+    assert "A/A/A/A/A/A/A" == trimmed_record[2]
+
+    bases_qscores = qio.phred_to_qscore_array(record[2])
+    assert (record, 0) == trimmer.trim_qual(record, 10, "both", qio, bases_qscores)
+    trimmed_record, trimmed_len = trimmer.trim_qual(record, 40, 5, qio)
+    assert 22 == trimmed_len
+    assert "" == trimmed_record[1]
+
+    with pytest.raises(Exception):
+        trimmer.trim_qual(record, 30, 4, qio)
+
+
+def test_FastqTrimmer_trim_qual_bwa():
+    trimmer = trim.FastqTrimmer()
+    qio = qual.QualityIO()
+    record = ("test", "ATCGATCGATCGATCGATGCAT", "////A/A/A/A/A/A/A/////")
+    bwa = QualityTrimMethods.BWA
+
+    trimmed_record, trimmed_len = trimmer.trim_qual(record, 30, 5, qio, method=bwa)
+    assert 22 == trimmed_len
+    assert "" == trimmed_record[1]
+
+    trimmed_record, trimmed_len = trimmer.trim_qual(record, 20, 3, qio, method=bwa)
+    assert 5 == trimmed_len
+    assert "////A/A/A/A/A/A/A" == trimmed_record[2]
+
+    record = ("test", "ATCGATCGAT", "IIIIII/I//")
+    trimmed_record, trimmed_len = trimmer.trim_qual(record, 30, 3, qio, method=bwa)
+    assert 4 == trimmed_len
+    assert "IIIIII" == trimmed_record[2]
+    trimmed_record, trimmed_len = trimmer.trim_qual(record, 30, 3, qio)
+    assert 2 == trimmed_len
+
+    trimmed_record, trimmed_len = trimmer.trim_qual(record, 30, "both", qio, method=bwa)
+    assert 4 == trimmed_len
+    assert (record, 0) == trimmer.trim_qual(record, 10, 3, qio, method=bwa)
+
+
+def window_trim_length(qscores, window_size, qscore_thr):
+    for start in range(len(qscores) - window_size + 1):
+        if sum(qscores[start : start + window_size]) < qscore_thr * window_size:
+            length = start
+            while qscores[length] >= qscore_thr:
+                length += 1
+            return length
+    return len(qscores)
+
+
+def test_FastqWindowTrimmer():
+    qio = qual.QualityIO()
+    trimmer = trim.FastqWindowTrimmer(4, 30)
+    records = [
+        ("a", "ATCGATCGATCGATCGATGCAT", "IIIIIIIII/I/I///IIIIII"),
+        ("b", "ATCGATCGAT", "IIIIIIIIII"),
+        ("c", "", ""),
+        ("d", "ATC", "///"),
+        ("e", "ATCGATCGAT", "////IIIIII"),
+        ("f", "ATCGATCGAT", "IIIIIII/II"),
+    ]
+    qbatch = qio.phred_to_qscore_batch([record[2] for record in records])
+    assert [9, 10, 0, 3, 0, 10] == trimmer.find_cuts(qbatch).tolist()
+    assert ("a", "ATCGATCGA", "IIIIIIIII") == trimmer.trim(records[0], 9)
+    assert records[1] == trimmer.trim(records[1], 10)
+
+    np.random.seed(1)
+    quals = [
+        "".join(chr(33 + q) for q in np.random.randint(0, 41, n))
+        for n in np.random.randint(0, 60, 200)
+    ]
+    qbatch = qio.phred_to_qscore_batch(quals)
+    for window_size in (1, 4, 10):
+        trimmer = trim.FastqWindowTrimmer(window_size, 20)
+        assert [
+            window_trim_length(qio.phred_to_qscore(q), window_size, 20) for q in quals
+        ] == trimmer.find_cuts(qbatch).tolist()
+
 
 def test_get_fastx_trimmer():
     assert isinstance(
@@ -108,3 +191,27 @@ def test_get_fastx_trimmer():
         trim.get_fastx_trimmer(FastxFormats.FASTQ), type(trim.FastqTrimmer)
     )
     assert isinstance(trim.get_fastx_trimmer(FastxFormats.NONE), type(trim.ABCTrimmer))
+
+
+def test_LengthHistogram():
+    lengths = np.random.default_rng(0).integers(0, 40, 1001)
+    histogram = trim.LengthHistogram(8)
+    for length in lengths[:500]:
+        histogram.add(length)
+    other = trim.LengthHistogram()
+    other.add_all(lengths[500:])
+    histogram.update(other)
+    assert len(lengths) == histogram.total
+    assert lengths.min() == histogram.min()
+    assert lengths.max() == histogram.max()
+    assert np.isclose(lengths.mean(), histogram.mean())
+    assert np.median(lengths) == histogram.median()
+    for q in (0, 5, 33.3, 75, 99, 100):
+        assert np.isclose(np.percentile(lengths, q), histogram.percentile(q))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stats_path = histogram.export(os.path.join(tmp_dir, "out.fastq.gz"), "trim")
+        assert os.path.join(tmp_dir, "out.trim.stats.tsv") == stats_path
+        with open(stats_path) as IH:
+            assert "length\tcounts\tperc\tcum_perc" == IH.readline().strip()
+            assert lengths.max() + 1 == len(IH.readlines())
@@ -4,11 +4,17 @@
 """
 
 from abc import ABCMeta, abstractmethod
-from fastx_barber.const import FastxFormats
-from fastx_barber.match import ANPMatch
-from fastx_barber.qual import QualityIO
+from fastx_barber.const import FastxFormats, LENGTH_HISTOGRAM_SIZE, QualityTrimMethods
+from fastx_barber.io import is_gzipped
+from fastx_barber.match import RecordMatch
+from fastx_barber.qual import QualityBatch, QualityIO
 from fastx_barber.seqio import SimpleFastxRecord, SimpleFastqRecord
-from typing import Any, List, Match, Tuple, Type, Union
+import numpy as np  # type: ignore
+import os
+import pandas as pd  # type: ignore
+from typing import Any, Iterable, List, Optional, Tuple, Type, Union
+
+QScores = Union[List[int], np.ndarray]
 
 
 class ABCTrimmer(metaclass=ABCMeta):
@@ -20,7 +26,7 @@ class ABCTrimmer(metaclass=ABCMeta):
 
     @staticmethod
     @abstractmethod
-    def trim_re(record: Any, match: Union[ANPMatch, Match, None]) -> Any:
+    def trim_re(record: Any, match: Optional[RecordMatch]) -> Any:
         """Trim record using regexp match
 
         Decorators:
@@ -62,7 +68,7 @@ class FastaTrimmer(ABCTrimmer):
 
     @staticmethod
     def trim_re(
-        record: SimpleFastxRecord, match: Union[ANPMatch, Match, None]
+        record: SimpleFastxRecord, match: Optional[RecordMatch]
     ) -> SimpleFastxRecord:
         assert match is not None
         name, seq, _ = record
@@ -87,7 +93,7 @@ class FastqTrimmer(ABCTrimmer):
 
     @staticmethod
     def trim_re(
-        record: SimpleFastxRecord, match: Union[ANPMatch, Match, None]
+        record: SimpleFastxRecord, match: Optional[RecordMatch]
     ) -> SimpleFastxRecord:
         assert match is not None
         name, seq, qual = record
@@ -108,59 +114,152 @@ class FastqTrimmer(ABCTrimmer):
             raise Exception("Can trim only from 5' or 3' end.")
 
     @staticmethod
-    def __trim_qual_5(
-        record: SimpleFastqRecord, qscore_thr: int, bases_qscores: List[int]
-    ) -> Tuple[SimpleFastqRecord, int]:
-        trimmed_length = 0
-        while 0 < len(bases_qscores):
-            if bases_qscores[0] < qscore_thr:
-                record = (record[0], record[1][1:], record[2][1:])
-                bases_qscores = bases_qscores[1:]
-                trimmed_length += 1
-            else:
-                break
-        return (record, trimmed_length)
+    def __find_cut_scan(bases_qscores: np.ndarray, qscore_thr: int) -> int:
+        """Number of leading bases with qscore below threshold."""
+        passing = np.flatnonzero(bases_qscores >= qscore_thr)
+        return int(passing[0]) if 0 < len(passing) else len(bases_qscores)
 
     @staticmethod
-    def __trim_qual_3(
-        record: SimpleFastqRecord, qscore_thr: int, bases_qscores: List[int]
-    ) -> Tuple[SimpleFastqRecord, int]:
-        trimmed_length = 0
-        while 0 < len(bases_qscores):
-            if bases_qscores[-1] < qscore_thr:
-                record = (record[0], record[1][:-1], record[2][:-1])
-                bases_qscores = bases_qscores[:-1]
-                trimmed_length += 1
-            else:
-                break
-        return (record, trimmed_length)
+    def __find_cut_bwa(bases_qscores: np.ndarray, qscore_thr: int) -> int:
+        """Number of leading bases to trim, BWA-style.
+
+        The cut is where the cumulative sum of (qscore_thr - qscore) is maximal,
+        only considering the bases before the sum first drops below zero.
+        """
+        score = np.cumsum(qscore_thr - bases_qscores.astype(np.int64))
+        negative = np.flatnonzero(score < 0)
+        if 0 < len(negative):
+            score = score[: negative[0]]
+        if 0 == len(score) or 0 >= score.max():
+            return 0
+        return int(score.argmax()) + 1
 
     @staticmethod
     def trim_qual(
-        record: SimpleFastqRecord, qscore_thr: int, side: int, qio: QualityIO
+        record: SimpleFastqRecord,
+        qscore_thr: int,
+        side: Union[int, str],
+        qio: QualityIO,
+        bases_qscores: Optional[QScores] = None,
+        method: QualityTrimMethods = QualityTrimMethods.SCAN,
     ) -> Tuple[SimpleFastqRecord, int]:
-        """Trim record by length
+        """Trim record by quality
+
+        The cut positions are found with a single pass over the qscores,
+        and the record is sliced once.
 
         Decorators:
             staticmethod
-            abstractmethod
 
         Arguments:
             record {SimpleFastqRecord} -- record to be trimmed
             qscore_thr {int} -- qscore threshold, bases with lower qscore are trimmed
-            side {int} -- side to trim (5/3')
+            side {Union[int, str]} -- side to trim (5/3', or "both")
             qio {QualityIO} -- QualityIO instance for qscore calculation
 
+        Keyword Arguments:
+            bases_qscores {Optional[QScores]} -- pre-computed qscores of the record,
+                                                 e.g., from a QualityBatch
+                                                 (default: {None})
+            method {QualityTrimMethods} -- how to find the low quality end
+                                           (default: {QualityTrimMethods.SCAN})
+
         Returns:
-            SimpleFastqRecord -- trimmed record
+            Tuple[SimpleFastqRecord, int] -- trimmed record and trimmed length
         """
-        bases_qscores = qio.phred_to_qscore(record[2])
-        if 5 == side:
-            return FastqTrimmer.__trim_qual_5(record, qscore_thr, bases_qscores)
-        elif 3 == side:
-            return FastqTrimmer.__trim_qual_3(record, qscore_thr, bases_qscores)
-        else:
-            raise Exception("Can trim only from 5' or 3' end.")
+        if side not in (5, 3, "both"):
+            raise Exception("Can trim only from 5' or 3' end, or both.")
+        if bases_qscores is None:
+            bases_qscores = qio.phred_to_qscore_array(record[2])
+        bases_qscores = np.asarray(bases_qscores)
+        find_cut = (
+            FastqTrimmer.__find_cut_bwa
+            if QualityTrimMethods.BWA == method
+            else FastqTrimmer.__find_cut_scan
+        )
+
+        start, end = 0, len(bases_qscores)
+        if 3 != side:
+            start = find_cut(bases_qscores, qscore_thr)
+        if 5 != side:
+            end -= find_cut(bases_qscores[start:][::-1], qscore_thr)
+        if 0 == start and len(bases_qscores) == end:
+            return (record, 0)
+        return (
+            (record[0], record[1][start:end], record[2][start:end]),
+            start + len(bases_qscores) - end,
+        )
+
+
+class FastqWindowTrimmer(object):
+    """Sliding window quality trimmer, as Trimmomatic's SLIDINGWINDOW
+
+    Windows are scanned from the 5' end, and each read is cut at the first window
+    with mean qscore below the threshold. Bases of that window up to the first one
+    with qscore below the threshold are kept. Reads shorter than the window are
+    not trimmed. The windows of a whole batch of reads are evaluated at once.
+
+    Variables:
+        _window_size {int} -- window size
+        _qscore_thr {int} -- mean qscore threshold
+    """
+
+    _window_size: int
+    _qscore_thr: int
+
+    def __init__(self, window_size: int, qscore_thr: int):
+        super(FastqWindowTrimmer, self).__init__()
+        assert 0 < window_size, "window size must be positive."
+        self._window_size = window_size
+        self._qscore_thr = qscore_thr
+
+    @property
+    def window_size(self) -> int:
+        return self._window_size
+
+    @property
+    def qscore_thr(self) -> int:
+        return self._qscore_thr
+
+    def find_cuts(self, qbatch: QualityBatch) -> np.ndarray:
+        """Finds how many bases to keep for each read of a batch.
+
+        Arguments:
+            qbatch {QualityBatch} -- qscores of the reads
+
+        Returns:
+            np.ndarray -- number of (5') bases to keep for each read
+        """
+        keep = qbatch.lengths.copy()
+        qscores = qbatch.qscores
+        if len(qscores) < self._window_size:
+            return keep
+
+        qscore_cumsum = np.zeros(len(qscores) + 1, dtype=np.int64)
+        np.cumsum(qscores, out=qscore_cumsum[1:])
+        window_sums = (
+            qscore_cumsum[self._window_size :] - qscore_cumsum[: -self._window_size]
+        )
+        read_ends = np.repeat(qbatch.offsets[1:], qbatch.lengths)[: len(window_sums)]
+        failing = np.logical_and(
+            window_sums < self._qscore_thr * self._window_size,
+            np.arange(len(window_sums)) + self._window_size <= read_ends,
+        )
+
+        window_starts = np.flatnonzero(failing)
+        read_ids = np.searchsorted(qbatch.offsets, window_starts, side="right") - 1
+        read_ids, first_window = np.unique(read_ids, return_index=True)
+        low_quality = np.flatnonzero(qscores < self._qscore_thr)
+        cuts = low_quality[np.searchsorted(low_quality, window_starts[first_window])]
+        keep[read_ids] = cuts - qbatch.offsets[read_ids]
+        return keep
+
+    @staticmethod
+    def trim(record: SimpleFastqRecord, length: int) -> SimpleFastqRecord:
+        """Keeps the first length bases of a record."""
+        if length == len(record[1]):
+            return record
+        return (record[0], record[1][:length], record[2][:length])
 
 
 def get_fastx_trimmer(fmt: FastxFormats) -> Type[ABCTrimmer]:
@@ -171,3 +270,113 @@ def get_fastx_trimmer(fmt: FastxFormats) -> Type[ABCTrimmer]:
         return FastqTrimmer
     else:
         return ABCTrimmer
+
+
+class LengthHistogram(object):
+    """Histogram of (trimmed) lengths
+
+    Counts are stored in an array with one bin per length, starting from 0, of
+    fixed size unless longer lengths are added. Histograms can be merged exactly,
+    and summary statistics computed as on the full list of lengths.
+
+    Variables:
+        _counts {np.ndarray} -- count of each length
+    """
+
+    _counts: np.ndarray
+
+    def __init__(self, size: int = LENGTH_HISTOGRAM_SIZE):
+        super(LengthHistogram, self).__init__()
+        assert 0 < size
+        self._counts = np.zeros(size, dtype=np.int64)
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts
+
+    @property
+    def total(self) -> int:
+        return int(self._counts.sum())
+
+    def __grow(self, size: int) -> None:
+        if size > len(self._counts):
+            self._counts = np.pad(self._counts, (0, size - len(self._counts)))
+
+    def add(self, length: int) -> None:
+        if length >= len(self._counts):
+            self.__grow(max(length + 1, 2 * len(self._counts)))
+        self._counts[length] += 1
+
+    def add_all(self, lengths: Iterable[int]) -> None:
+        counts = np.bincount(np.fromiter(lengths, dtype=np.int64))
+        self.__grow(len(counts))
+        self._counts[: len(counts)] += counts
+
+    def update(self, other: "LengthHistogram") -> "LengthHistogram":
+        """Adds the counts of another histogram.
+
+        Arguments:
+            other {LengthHistogram} -- histogram to merge
+
+        Returns:
+            LengthHistogram -- self, updated
+        """
+        self.__grow(len(other.counts))
+        self._counts[: len(other.counts)] += other.counts
+        return self
+
+    def min(self) -> int:
+        return int(np.flatnonzero(self._counts)[0])
+
+    def max(self) -> int:
+        return int(np.flatnonzero(self._counts)[-1])
+
+    def mean(self) -> float:
+        return float(np.average(np.arange(len(self._counts)), weights=self._counts))
+
+    def __value_at(self, rank: int) -> int:
+        """Length at a given rank, as in the sorted list of lengths."""
+        return int(np.searchsorted(np.cumsum(self._counts), rank, side="right"))
+
+    def percentile(self, q: float) -> float:
+        """Computes a percentile, interpolating linearly as numpy.percentile.
+
+        Arguments:
+            q {float} -- percentile, between 0 and 100 (inclusive)
+
+        Returns:
+            float -- length percentile
+        """
+        assert 0 <= q <= 100, "percentiles must be in the [0, 100] range."
+        position = q / 100 * (self.total - 1)
+        lower = self.__value_at(int(np.floor(position)))
+        upper = self.__value_at(int(np.ceil(position)))
+        return lower + (upper - lower) * (position - np.floor(position))
+
+    def median(self) -> float:
+        return self.percentile(50)
+
+    def get_dataframe(self) -> pd.DataFrame:
+        df = pd.DataFrame()
+        df["length"] = np.arange(self.max() + 1)
+        df["counts"] = self._counts[: self.max() + 1]
+        df["perc"] = round(df["counts"] / df["counts"].sum() * 100, 2)
+        df["cum_perc"] = round(df["counts"].cumsum() / df["counts"].sum() * 100, 2)
+        return df
+
+    def export(self, output_path: str, label: str = "length") -> str:
+        """Exports the length distribution to a tsv file next to an output file.
+
+        Arguments:
+            output_path {str} -- path to output file
+
+        Keyword Arguments:
+            label {str} -- tsv file label (default: {"length"})
+
+        Returns:
+            str -- path to the tsv file
+        """
+        base, _, _ = is_gzipped(os.path.basename(output_path))
+        path = os.path.join(os.path.dirname(output_path), f"{base}.{label}.stats.tsv")
+        self.get_dataframe().to_csv(path, sep="\t", index=False)
+        return path